@@ -0,0 +1,107 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+Measurement helpers shared by the benchmarks, independent of Pixelle settings
+"""
+
+import asyncio
+from dataclasses import dataclass, asdict, field
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class ResourceSampler:
+    """Sample peak RSS of this process and peak number of TCP sockets to a port"""
+
+    def __init__(self, port: int, interval: float = 0.02):
+        self.port = port
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_sockets = 0
+        self._process = psutil.Process()
+        self._task: Optional[asyncio.Task] = None
+
+    def _sample(self):
+        self.peak_rss = max(self.peak_rss, self._process.memory_info().rss)
+        sockets = sum(
+            1 for conn in self._process.net_connections(kind="tcp")
+            if conn.raddr and conn.raddr.port == self.port
+        )
+        self.peak_sockets = max(self.peak_sockets, sockets)
+
+    async def _run(self):
+        while True:
+            self._sample()
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._sample()
+        self._task.cancel()
+
+
+@dataclass
+class LevelResult:
+    name: str
+    concurrency: int
+    requests: int
+    errors: int
+    seconds: float
+    # Per request, seconds above the fake GPU time
+    overheads: List[float] = field(default_factory=list, repr=False)
+    peak_sockets: int = 0
+    peak_rss: int = 0
+    bytes: int = 0
+
+    @property
+    def throughput(self) -> float:
+        return (self.requests - self.errors) / self.seconds if self.seconds else 0.0
+
+    def row(self) -> List[str]:
+        return [
+            self.name,
+            str(self.concurrency),
+            str(self.requests),
+            str(self.errors),
+            f"{self.throughput:.1f}",
+            f"{percentile(self.overheads, 50) * 1000:.1f}",
+            f"{percentile(self.overheads, 99) * 1000:.1f}",
+            f"{self.bytes / self.seconds / 1024 / 1024:.1f}" if self.bytes else "-",
+            str(self.peak_sockets),
+            f"{self.peak_rss / 1024 / 1024:.0f}",
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop("overheads")
+        data.update({
+            "throughput": round(self.throughput, 2),
+            "overhead_p50_ms": round(percentile(self.overheads, 50) * 1000, 2),
+            "overhead_p99_ms": round(percentile(self.overheads, 99) * 1000, 2),
+        })
+        return data
+
+
+HEADER = ["benchmark", "conc", "requests", "errors", "req/s", "p50 ms", "p99 ms", "MB/s", "sockets", "RSS MB"]
+
+
+def print_table(results: List[LevelResult]):
+    rows = [HEADER] + [result.row() for result in results]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(HEADER))]
+    for index, row in enumerate(rows):
+        print("  ".join(cell.rjust(width) for cell, width in zip(row, widths)))
+        if index == 0:
+            print("  ".join("-" * width for width in widths))
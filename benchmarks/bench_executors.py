@@ -0,0 +1,211 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+Executor benchmark against the stand-in ComfyUI server
+
+Measures Pixelle's own overhead, end-to-end latency minus the (fake) GPU time, of
+`HttpExecutor` and `WebSocketExecutor` at increasing concurrency, and the throughput of
+`transfer_result_files`. Reports throughput, p50/p99 overhead, peak number of sockets
+open to ComfyUI and peak RSS of this process.
+
+The fake server runs in a child process with unlimited workers, so prompts never
+queue and all latency above `--exec-time` is overhead.
+
+    python -m benchmarks.bench_executors --concurrency 1,8,32,128 --exec-time 0.5
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+# Keep benchmark artifacts (data folder, transferred files) out of the working directory,
+# must happen before pixelle reads its settings
+WORK_DIR = tempfile.mkdtemp(prefix="pixelle-bench-")
+os.chdir(WORK_DIR)
+os.environ.setdefault("LOCAL_STORAGE_PATH", os.path.join(WORK_DIR, "files"))
+os.environ.setdefault("EXECUTION_JOURNAL_ENABLED", "false")
+os.environ.setdefault("RESULT_CACHE_TTL", "0")
+
+from pixelle.logger import logger  # noqa: E402
+from pixelle.comfyui.models import ExecuteResult  # noqa: E402
+from pixelle.comfyui.http_executor import HttpExecutor  # noqa: E402
+from pixelle.comfyui.websocket_executor import WebSocketExecutor  # noqa: E402
+from benchmarks.fake_comfyui import make_workflow  # noqa: E402
+from benchmarks.bench_common import LevelResult, ResourceSampler, print_table  # noqa: E402
+
+EXECUTORS = {
+    "http": HttpExecutor,
+    "websocket": WebSocketExecutor,
+}
+
+
+async def run_level(name: str, port: int, concurrency: int, requests: int,
+                    call: Callable[[int], Any], baseline: float) -> LevelResult:
+    """Run `requests` calls with at most `concurrency` at a time"""
+    semaphore = asyncio.Semaphore(concurrency)
+    overheads: List[float] = []
+    errors = 0
+    transferred = 0
+
+    async def one(index: int):
+        nonlocal errors, transferred
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                ok, size = await call(index)
+            except Exception as e:
+                logger.debug(f"Benchmark call failed: {e}")
+                ok, size = False, 0
+            if ok:
+                overheads.append(max(0.0, time.perf_counter() - start - baseline))
+                transferred += size
+            else:
+                errors += 1
+
+    with ResourceSampler(port) as sampler:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(requests)))
+        seconds = time.perf_counter() - start
+
+    return LevelResult(
+        name=name,
+        concurrency=concurrency,
+        requests=requests,
+        errors=errors,
+        seconds=seconds,
+        overheads=overheads,
+        peak_sockets=sampler.peak_sockets,
+        peak_rss=sampler.peak_rss,
+        bytes=transferred,
+    )
+
+
+async def bench_executor(executor_type: str, url: str, port: int, workflow_file: str,
+                         levels: List[int], requests_per_level: int, exec_time: float) -> List[LevelResult]:
+    results = []
+    for concurrency in levels:
+        executor = EXECUTORS[executor_type](url)
+
+        async def call(index: int):
+            result = await executor.execute_workflow(workflow_file, {"prompt": f"benchmark {index}"})
+            return result.status == "completed", 0
+
+        try:
+            # Warm up: connection, websocket, compiled workflow template
+            await call(-1)
+            requests = max(requests_per_level, concurrency)
+            results.append(await run_level(executor_type, port, concurrency, requests, call, exec_time))
+        finally:
+            await executor.close()
+        print_table(results[-1:])
+    return results
+
+
+async def bench_transfer(url: str, port: int, levels: List[int], requests_per_level: int,
+                         files_per_result: int, output_size: int) -> List[LevelResult]:
+    results = []
+    for concurrency in levels:
+        executor = HttpExecutor(url)
+
+        async def call(index: int):
+            urls = [f"{url}/view?filename=bench_{index}_{n}.png&subfolder=&type=output" for n in range(files_per_result)]
+            result = ExecuteResult(status="completed", images=list(urls), images_by_var={"images": list(urls)})
+            result = await executor.transfer_result_files(result)
+            return result.status == "completed", files_per_result * output_size
+
+        try:
+            await call(-1)
+            requests = max(requests_per_level, concurrency)
+            results.append(await run_level("transfer", port, concurrency, requests, call, 0.0))
+        finally:
+            await executor.close()
+        print_table(results[-1:])
+    return results
+
+
+async def start_fake_server(port: int, args) -> asyncio.subprocess.Process:
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "benchmarks.fake_comfyui",
+        "--port", str(port),
+        "--workers", "0",
+        "--exec-time", str(args.exec_time),
+        "--output-size", str(args.output_size),
+        "--request-latency", str(args.request_latency),
+        "--failure-rate", str(args.failure_rate),
+        cwd=str(REPO_ROOT),
+        stdout=asyncio.subprocess.PIPE,
+    )
+    line = await asyncio.wait_for(process.stdout.readline(), timeout=30)
+    if b"listening" not in line:
+        process.kill()
+        raise RuntimeError(f"Fake ComfyUI did not start: {line!r}")
+    return process
+
+
+async def main_async(args):
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    workflow_file = os.path.join(WORK_DIR, "benchmark_workflow.json")
+    make_workflow(workflow_file, n_outputs=args.outputs)
+
+    process = None
+    url = args.url
+    if url is None:
+        process = await start_fake_server(args.port, args)
+        url = f"http://127.0.0.1:{args.port}"
+    port = int(url.rsplit(":", 1)[-1].split("/")[0])
+
+    print(f"ComfyUI: {url}, exec time {args.exec_time}s, {args.outputs} outputs of {args.output_size} bytes per prompt\n")
+    results: List[LevelResult] = []
+    try:
+        for executor_type in args.executors.split(","):
+            results += await bench_executor(executor_type, url, port, workflow_file, levels, args.requests, args.exec_time)
+        if args.files_per_result > 0:
+            results += await bench_transfer(url, port, levels, args.requests, args.files_per_result, args.output_size)
+    finally:
+        if process is not None:
+            process.terminate()
+            await process.wait()
+
+    print()
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([result.to_dict() for result in results], f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Pixelle executors against a stand-in ComfyUI server")
+    parser.add_argument("--url", default=None, help="Use a running (fake) ComfyUI instead of starting one")
+    parser.add_argument("--port", type=int, default=18188, help="Port of the fake ComfyUI started by the benchmark")
+    parser.add_argument("--executors", default="http,websocket")
+    parser.add_argument("--concurrency", default="1,8,32,128", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=64, help="Requests per level, at least the concurrency")
+    parser.add_argument("--exec-time", type=float, default=0.5, help="Fake GPU seconds per prompt")
+    parser.add_argument("--outputs", type=int, default=2, help="Output files per prompt")
+    parser.add_argument("--output-size", type=int, default=256 * 1024, help="Bytes per output file")
+    parser.add_argument("--files-per-result", type=int, default=4, help="Files per transfer_result_files call, 0 skips it")
+    parser.add_argument("--request-latency", type=float, default=0.0, help="Seconds the fake adds to every HTTP request")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability of an injected execution error")
+    parser.add_argument("--json", default=None, help="Also write results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Keep Pixelle's INFO logs")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logger.setLevel(logging.ERROR)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
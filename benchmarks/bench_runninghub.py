@@ -0,0 +1,245 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+RunningHub client benchmark against the stand-in RunningHub server
+
+Runs tasks through `RunningHubExecutor` at increasing concurrency, up to hundreds of
+tasks at once, and uploads through `RunningHubClient.upload_file`. Reports throughput,
+p50/p99 overhead (latency minus the fake task duration), API requests per completed
+task, rate-limited and `code != 0` answers, peak sockets and peak RSS.
+
+    python -m benchmarks.bench_runninghub --concurrency 1,50,200 --task-duration 3 --rate-limit 50
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List
+
+import aiohttp
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.bench_common import LevelResult, ResourceSampler, print_table  # noqa: E402
+
+WORK_DIR = os.getcwd()
+
+
+async def get_server_stats(url: str) -> Dict[str, Any]:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{url}/_stats") as response:
+            return await response.json()
+
+
+def count(stats: Dict[str, Any], key: str) -> int:
+    return sum(stats[key].values())
+
+
+async def run_level(name: str, url: str, port: int, concurrency: int, requests: int,
+                    call, baseline: float, size: int = 0) -> Dict[str, Any]:
+    """Run `requests` calls with at most `concurrency` at a time, with server side counters"""
+    semaphore = asyncio.Semaphore(concurrency)
+    overheads: List[float] = []
+    errors = 0
+
+    async def one(index: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                ok = await call(index)
+            except Exception:
+                ok = False
+            if ok:
+                overheads.append(max(0.0, time.perf_counter() - start - baseline))
+            else:
+                errors += 1
+
+    before = await get_server_stats(url)
+    with ResourceSampler(port) as sampler:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(requests)))
+        seconds = time.perf_counter() - start
+    after = await get_server_stats(url)
+
+    result = LevelResult(
+        name=name,
+        concurrency=concurrency,
+        requests=requests,
+        errors=errors,
+        seconds=seconds,
+        overheads=overheads,
+        peak_sockets=sampler.peak_sockets,
+        peak_rss=sampler.peak_rss,
+        bytes=size * len(overheads),
+    )
+    completed = requests - errors
+    api_requests = count(after, "requests") - count(before, "requests")
+    return {
+        "result": result,
+        "api_requests": api_requests,
+        "api_requests_per_completed": api_requests / completed if completed else 0.0,
+        "api_errors": count(after, "errors") - count(before, "errors"),
+        "requests_by_endpoint": {
+            endpoint: calls - before["requests"].get(endpoint, 0)
+            for endpoint, calls in after["requests"].items()
+            if calls - before["requests"].get(endpoint, 0) > 0
+        },
+    }
+
+
+def print_levels(levels: List[Dict[str, Any]]):
+    print_table([level["result"] for level in levels])
+    print()
+    for level in levels:
+        result = level["result"]
+        endpoints = ", ".join(f"{endpoint.rsplit('/', 1)[-1]}={calls}" for endpoint, calls in sorted(level["requests_by_endpoint"].items()))
+        print(f"{result.name:>9} x{result.concurrency:<4} API requests: {level['api_requests']} "
+              f"({level['api_requests_per_completed']:.1f} per completed, {level['api_errors']} rejected) [{endpoints}]")
+
+
+async def bench_tasks(url: str, port: int, workflow_file: str, levels: List[int], requests_per_level: int,
+                      task_duration: float) -> List[Dict[str, Any]]:
+    from pixelle.comfyui.runninghub_executor import RunningHubExecutor
+
+    results = []
+    for concurrency in levels:
+        executor = RunningHubExecutor(url)
+
+        async def call(index: int):
+            result = await executor.execute_workflow(workflow_file, {"prompt": f"benchmark {index}"})
+            return result.status == "completed"
+
+        try:
+            requests = max(requests_per_level, concurrency)
+            results.append(await run_level("task", url, port, concurrency, requests, call, task_duration))
+        finally:
+            await executor.close()
+        print_levels(results[-1:])
+    return results
+
+
+async def bench_upload(url: str, port: int, levels: List[int], requests_per_level: int, upload_size: int) -> List[Dict[str, Any]]:
+    from pixelle.comfyui.runninghub_client import get_runninghub_client
+
+    client = get_runninghub_client()
+    upload_file = os.path.join(WORK_DIR, "upload.png")
+    with open(upload_file, "wb") as f:
+        f.write(os.urandom(upload_size))
+
+    async def call(index: int):
+        return bool(await client.upload_file(upload_file))
+
+    results = []
+    for concurrency in levels:
+        requests = max(requests_per_level, concurrency)
+        results.append(await run_level("upload", url, port, concurrency, requests, call, 0.0, size=upload_size))
+        print_levels(results[-1:])
+    return results
+
+
+async def start_fake_server(port: int, args) -> asyncio.subprocess.Process:
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "benchmarks.fake_runninghub",
+        "--port", str(port),
+        "--task-duration", str(args.task_duration),
+        "--workers", str(args.workers),
+        "--max-tasks", str(args.max_tasks),
+        "--rate-limit", str(args.rate_limit),
+        "--request-latency", str(args.request_latency),
+        "--error-rate", str(args.error_rate),
+        "--task-failure-rate", str(args.task_failure_rate),
+        cwd=str(REPO_ROOT),
+        stdout=asyncio.subprocess.PIPE,
+    )
+    line = await asyncio.wait_for(process.stdout.readline(), timeout=30)
+    if b"listening" not in line:
+        process.kill()
+        raise RuntimeError(f"Fake RunningHub did not start: {line!r}")
+    return process
+
+
+async def main_async(args, url: str):
+    from pixelle.utils.runninghub_util import create_runninghub_workflow_file
+
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    port = int(url.rsplit(":", 1)[-1].split("/")[0])
+    workflow_file = create_runninghub_workflow_file("1000000000000000001", "benchmark_workflow", output_dir=WORK_DIR)
+
+    process = None
+    if args.url is None:
+        process = await start_fake_server(port, args)
+
+    print(f"RunningHub: {url}, task duration {args.task_duration}s, rate limit {args.rate_limit or 'none'}, "
+          f"error rate {args.error_rate}\n")
+    results: List[Dict[str, Any]] = []
+    try:
+        results += await bench_tasks(url, port, workflow_file, levels, args.requests, args.task_duration)
+        if args.upload_size > 0:
+            results += await bench_upload(url, port, levels, args.requests, args.upload_size)
+    finally:
+        if process is not None:
+            process.terminate()
+            await process.wait()
+
+    print()
+    print_levels(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([
+                {**level["result"].to_dict(), **{key: value for key, value in level.items() if key != "result"}}
+                for level in results
+            ], f, indent=2)
+
+
+def main():
+    global WORK_DIR
+
+    parser = argparse.ArgumentParser(description="Benchmark the RunningHub client against a stand-in RunningHub server")
+    parser.add_argument("--url", default=None, help="Use a running (fake) RunningHub instead of starting one")
+    parser.add_argument("--port", type=int, default=18190, help="Port of the fake RunningHub started by the benchmark")
+    parser.add_argument("--concurrency", default="1,50,200", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=0, help="Tasks per level, at least the concurrency")
+    parser.add_argument("--task-duration", type=float, default=3.0, help="Seconds each fake task runs")
+    parser.add_argument("--workers", type=int, default=0, help="Fake tasks running at the same time, 0 for unlimited")
+    parser.add_argument("--max-tasks", type=int, default=0, help="Max queued + running fake tasks, 0 for unlimited")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requests per second the fake accepts, 0 for unlimited")
+    parser.add_argument("--request-latency", type=float, default=0.0, help="Seconds the fake adds to every request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a `code != 0` answer")
+    parser.add_argument("--task-failure-rate", type=float, default=0.0, help="Probability of a FAILED task")
+    parser.add_argument("--retry-count", type=int, default=None, help="RUNNINGHUB_RETRY_COUNT of the client")
+    parser.add_argument("--upload-size", type=int, default=512 * 1024, help="Bytes per upload, 0 skips the upload benchmark")
+    parser.add_argument("--json", default=None, help="Also write results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Keep Pixelle's INFO logs")
+    args = parser.parse_args()
+
+    url = (args.url or f"http://127.0.0.1:{args.port}").rstrip("/")
+
+    # Pixelle reads its settings on import: point it to the fake server, keep artifacts out of the working directory
+    WORK_DIR = tempfile.mkdtemp(prefix="pixelle-bench-")
+    os.chdir(WORK_DIR)
+    os.environ["RUNNINGHUB_BASE_URL"] = url
+    os.environ.setdefault("RUNNINGHUB_API_KEY", "benchmark")
+    os.environ.setdefault("LOCAL_STORAGE_PATH", os.path.join(WORK_DIR, "files"))
+    os.environ.setdefault("EXECUTION_JOURNAL_ENABLED", "false")
+    os.environ.setdefault("RESULT_CACHE_TTL", "0")
+    if args.retry_count is not None:
+        os.environ["RUNNINGHUB_RETRY_COUNT"] = str(args.retry_count)
+
+    from pixelle.logger import logger
+    if not args.verbose:
+        logger.setLevel(logging.CRITICAL)
+    asyncio.run(main_async(args, url))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+Workflow loading benchmark over thousands of synthetic workflows
+
+Registers the tools of `--workflows` parsed workflows in a fresh MCP server, once with the
+former registration (tool function generated as Python source, `exec`ed, signature
+introspected by FastMCP) and once with `WorkflowTool` (schema built from the parameters,
+one shared handler). Reports seconds, tools per second and memory per tool (tracemalloc).
+Then times `WorkflowManager.load_all_workflows` on the same files, without and with the
+workflow manifest.
+
+    python -m benchmarks.bench_workflow_loading --workflows 5000 --params 6
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+WORK_DIR = os.getcwd()
+
+PARAM_VALUES = ["text", 20, 7.5, True]
+
+
+def build_workflow(index: int, n_params: int) -> Dict[str, Any]:
+    """Workflow in ComfyUI API format with `n_params` parameters of mixed types, some required"""
+    rng = random.Random(index)
+    workflow = {
+        "1": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": "model.safetensors"}, "_meta": {"title": "Load Checkpoint"}},
+        "9": {"class_type": "SaveImage", "inputs": {"images": ["1", 0]}, "_meta": {"title": "$output.image"}},
+    }
+    for n in range(n_params):
+        value = rng.choice(PARAM_VALUES)
+        required = "!" if n % 3 == 0 else ""
+        workflow[str(100 + n)] = {
+            "class_type": "PrimitiveNode",
+            "inputs": {"value": value},
+            "_meta": {"title": f"$param_{n}.value{required}:Parameter {n} of workflow {index}"},
+        }
+    return workflow
+
+
+def register_exec(mcp, metadata, workflow_path: str):
+    """Former registration: generated tool function, kept here as the baseline"""
+    from pydantic import Field
+
+    required_params, optional_params = [], []
+    for param_name, param in metadata.params.items():
+        field_args = [f"description={repr(param.description or '')}"]
+        if param.default is not None:
+            field_args.append(f"default={repr(param.default)}")
+        param_str = f"{param_name}: {param.type} = Field({', '.join(field_args)})"
+        (optional_params if param.default is not None else required_params).append(param_str)
+
+    function_code = (
+        f"async def {metadata.title}({', '.join(required_params + optional_params)}):\n"
+        f"    params = {{k: v for k, v in locals().items() if not k.startswith('_')}}\n"
+        f"    return await run_workflow({metadata.title!r}, WORKFLOW_PATH, params)\n"
+    )
+    exec_locals = {}
+    exec(function_code, {"Field": Field, "run_workflow": None, "WORKFLOW_PATH": workflow_path}, exec_locals)
+    function = exec_locals[metadata.title]
+    function.__doc__ = metadata.description
+    mcp.tool(function)
+
+
+def register_schema(mcp, metadata, workflow_path: str):
+    from pixelle.manager.workflow_tool import WorkflowTool
+
+    mcp.add_tool(WorkflowTool.from_params(metadata.title, metadata.description, workflow_path, metadata.params))
+
+
+REGISTRATIONS: Dict[str, Callable] = {
+    "exec": register_exec,
+    "schema": register_schema,
+}
+
+
+def bench_registration(name: str, metadata_list: List[Any], workflows_dir: str) -> Dict[str, Any]:
+    from fastmcp import FastMCP
+
+    register = REGISTRATIONS[name]
+
+    def register_all(mcp):
+        for metadata in metadata_list:
+            register(mcp, metadata, os.path.join(workflows_dir, f"{metadata.title}.json"))
+
+    # Time without tracing, then memory of another server with tracing
+    gc.collect()
+    mcp = FastMCP(name=f"bench-{name}", on_duplicate_tools="replace")
+    start = time.perf_counter()
+    register_all(mcp)
+    seconds = time.perf_counter() - start
+    del mcp
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    mcp = FastMCP(name=f"bench-{name}-memory", on_duplicate_tools="replace")
+    register_all(mcp)
+    gc.collect()
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del mcp
+
+    count = len(metadata_list)
+    return {
+        "name": f"register:{name}",
+        "workflows": count,
+        "seconds": round(seconds, 3),
+        "per_second": round(count / seconds, 1) if seconds else 0.0,
+        "bytes_per_tool": allocated // count if count else 0,
+    }
+
+
+async def bench_load_all(workflows_dir: str, manifest_path: str, warm: bool) -> Dict[str, Any]:
+    from pixelle.manager.workflow_manager import WorkflowManager
+    from pixelle.manager.workflow_manifest import WorkflowManifest
+
+    manager = WorkflowManager(workflows_dir, manifest=WorkflowManifest(manifest_path, enabled=True))
+    start = time.perf_counter()
+    results = await manager.load_all_workflows()
+    seconds = time.perf_counter() - start
+    count = len(results["success"])
+    return {
+        "name": f"load_all:{'warm' if warm else 'cold'}",
+        "workflows": count,
+        "seconds": round(seconds, 3),
+        "per_second": round(count / seconds, 1) if seconds else 0.0,
+        "failed": len(results["failed"]),
+        "manifest_hits": manager.manifest.hits,
+    }
+
+
+def print_results(results: List[Dict[str, Any]]):
+    print(f"{'benchmark':>16} {'workflows':>10} {'seconds':>9} {'per second':>11} {'bytes/tool':>11}")
+    for result in results:
+        bytes_per_tool = result.get("bytes_per_tool")
+        print(f"{result['name']:>16} {result['workflows']:>10} {result['seconds']:>9.3f} {result['per_second']:>11.1f} "
+              f"{bytes_per_tool if bytes_per_tool is not None else '-':>11}")
+
+
+async def main_async(args):
+    from pixelle.comfyui.workflow_parser import WorkflowParser
+
+    workflows_dir = os.path.join(WORK_DIR, "custom_workflows")
+    os.makedirs(workflows_dir, exist_ok=True)
+    metadata_list = []
+    parser = WorkflowParser()
+    for index in range(args.workflows):
+        workflow = build_workflow(index, args.params)
+        title = f"synthetic_{index}"
+        with open(os.path.join(workflows_dir, f"{title}.json"), "w", encoding="utf-8") as f:
+            json.dump(workflow, f)
+        metadata_list.append(parser.parse_workflow(workflow, title))
+
+    print(f"{args.workflows} synthetic workflows with {args.params} parameters each\n")
+    results = []
+    for name in args.registrations.split(","):
+        results.append(bench_registration(name, metadata_list, workflows_dir))
+        print_results(results[-1:])
+
+    if not args.skip_load_all:
+        manifest_path = os.path.join(WORK_DIR, "workflow_manifest.json")
+        for warm in (False, True):
+            results.append(await bench_load_all(workflows_dir, manifest_path, warm))
+            print_results(results[-1:])
+
+    print()
+    print_results(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+def main():
+    global WORK_DIR
+
+    parser = argparse.ArgumentParser(description="Benchmark workflow tool registration and loading")
+    parser.add_argument("--workflows", type=int, default=5000, help="Number of synthetic workflows")
+    parser.add_argument("--params", type=int, default=6, help="Parameters per workflow")
+    parser.add_argument("--registrations", default="exec,schema", help="Comma-separated registrations to compare")
+    parser.add_argument("--skip-load-all", action="store_true", help="Only benchmark tool registration")
+    parser.add_argument("--json", default=None, help="Also write results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Keep Pixelle's INFO logs")
+    args = parser.parse_args()
+    if args.json:
+        args.json = os.path.abspath(args.json)
+
+    # Keep the data folder and the synthetic workflows out of the working directory, before pixelle reads its settings
+    WORK_DIR = tempfile.mkdtemp(prefix="pixelle-bench-")
+    os.chdir(WORK_DIR)
+    os.environ.setdefault("WORKFLOW_WATCH_ENABLED", "false")
+
+    from pixelle.logger import logger
+    if not args.verbose:
+        logger.setLevel(logging.ERROR)
+        logging.getLogger("FastMCP").setLevel(logging.ERROR)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+Stand-in ComfyUI server for benchmarks, no GPU involved
+
+Implements the part of the ComfyUI API Pixelle uses: `/prompt`, `/ws`, `/history`,
+`/history/{prompt_id}`, `/view`, `/upload/image`, `/queue` and `/interrupt`, with
+configurable execution time, output sizes and failure injection.
+
+Output nodes are the usual save nodes of the submitted graph (SaveImage,
+VHS_VideoCombine, SaveAudio), each one produces one file of `output_size` bytes.
+
+Run it standalone:
+    python -m benchmarks.fake_comfyui --port 8188 --exec-time 2 --output-size 1048576
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web, WSMsgType
+
+# Output node type -> (output key, file extension)
+OUTPUT_NODE_TYPES = {
+    "SaveImage": ("images", ".png"),
+    "VHS_VideoCombine": ("gifs", ".mp4"),
+    "SaveAudio": ("audio", ".flac"),
+}
+CONTENT_TYPES = {
+    ".png": "image/png",
+    ".mp4": "video/mp4",
+    ".flac": "audio/flac",
+}
+
+
+@dataclass
+class FakeComfyUIConfig:
+    # Seconds each prompt "runs" on the GPU
+    exec_time: float = 1.0
+    # Number of prompts executed at the same time, 0 for unlimited (real ComfyUI runs one)
+    workers: int = 1
+    # Size in bytes of each output file
+    output_size: int = 256 * 1024
+    # Extra latency in seconds added to every HTTP request
+    request_latency: float = 0.0
+    # Probability that a prompt fails with an execution error
+    failure_rate: float = 0.0
+    # Probability that POST /prompt answers HTTP 500
+    submit_failure_rate: float = 0.0
+
+
+@dataclass
+class _Prompt:
+    prompt_id: str
+    number: int
+    graph: Dict[str, Any]
+    client_id: Optional[str]
+    interrupted: bool = False
+
+
+class FakeComfyUI:
+    """In-memory ComfyUI stand-in"""
+
+    def __init__(self, config: Optional[FakeComfyUIConfig] = None):
+        self.config = config or FakeComfyUIConfig()
+        self.pending: List[_Prompt] = []
+        self.running: Dict[str, _Prompt] = {}
+        self.history: Dict[str, Any] = {}
+        self.uploads: Dict[str, int] = {}
+        self.request_counts: Dict[str, int] = {}
+        self._sockets: Dict[str, web.WebSocketResponse] = {}
+        self._number = 0
+        self._wakeup = asyncio.Event()
+        self._payloads: Dict[str, bytes] = {}
+        self._runner: Optional[web.AppRunner] = None
+        self._scheduler: Optional[asyncio.Task] = None
+        self._tasks: set = set()
+
+        self.app = web.Application(middlewares=[self._middleware], client_max_size=1024 ** 3)
+        router = self.app.router
+        router.add_post("/prompt", self._post_prompt)
+        router.add_get("/prompt", self._get_prompt)
+        router.add_get("/ws", self._ws)
+        router.add_get("/history", self._get_histories)
+        router.add_get("/history/{prompt_id}", self._get_history)
+        router.add_get("/queue", self._get_queue)
+        router.add_post("/queue", self._post_queue)
+        router.add_post("/interrupt", self._interrupt)
+        router.add_get("/view", self._view)
+        router.add_post("/upload/image", self._upload)
+
+    # Server lifecycle
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8188):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        self._scheduler = asyncio.create_task(self._schedule())
+
+    async def stop(self):
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    @property
+    def queue_remaining(self) -> int:
+        return len(self.pending) + len(self.running)
+
+    # Execution
+
+    async def _schedule(self):
+        while True:
+            while self.pending and (self.config.workers <= 0 or len(self.running) < self.config.workers):
+                prompt = self.pending.pop(0)
+                self.running[prompt.prompt_id] = prompt
+                task = asyncio.create_task(self._execute(prompt))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+    async def _execute(self, prompt: _Prompt):
+        prompt_id = prompt.prompt_id
+        messages = [["execution_start", {"prompt_id": prompt_id, "timestamp": int(time.time() * 1000)}]]
+        await self._send(prompt.client_id, "execution_start", {"prompt_id": prompt_id})
+        await self._send(prompt.client_id, "execution_cached", {"nodes": [], "prompt_id": prompt_id})
+
+        node_ids = list(prompt.graph.keys())
+        step = self.config.exec_time / max(1, len(node_ids))
+        fail_at = random.randrange(len(node_ids)) if node_ids and random.random() < self.config.failure_rate else None
+        outputs: Dict[str, Any] = {}
+        status_str = "success"
+        try:
+            for index, node_id in enumerate(node_ids):
+                if prompt.interrupted:
+                    messages.append(["execution_interrupted", {"prompt_id": prompt_id, "node_id": node_id}])
+                    await self._send(prompt.client_id, "execution_interrupted", {"prompt_id": prompt_id, "node_id": node_id})
+                    status_str = "error"
+                    return
+                await self._send(prompt.client_id, "executing", {"node": node_id, "prompt_id": prompt_id})
+                await asyncio.sleep(step)
+                if index == fail_at:
+                    error = {"prompt_id": prompt_id, "node_id": node_id, "exception_message": "Injected failure"}
+                    messages.append(["execution_error", error])
+                    await self._send(prompt.client_id, "execution_error", error)
+                    status_str = "error"
+                    return
+
+                node = prompt.graph[node_id]
+                output_type = OUTPUT_NODE_TYPES.get(node.get("class_type")) if isinstance(node, dict) else None
+                if output_type:
+                    key, ext = output_type
+                    output = {key: [{"filename": f"{prompt_id}_{node_id}{ext}", "subfolder": "", "type": "output"}]}
+                    outputs[node_id] = output
+                    await self._send(prompt.client_id, "executed", {"node": node_id, "output": output, "prompt_id": prompt_id})
+
+            success = {"prompt_id": prompt_id, "timestamp": int(time.time() * 1000)}
+            messages.append(["execution_success", success])
+            await self._send(prompt.client_id, "executing", {"node": None, "prompt_id": prompt_id})
+            await self._send(prompt.client_id, "execution_success", success)
+        finally:
+            self.history[prompt_id] = {
+                "prompt": [prompt.number, prompt_id, prompt.graph, {}, list(outputs.keys())],
+                "outputs": outputs if status_str == "success" else {},
+                "status": {"status_str": status_str, "completed": status_str == "success", "messages": messages},
+            }
+            self.running.pop(prompt_id, None)
+            self._wakeup.set()
+            await self._broadcast_status()
+
+    async def _send(self, client_id: Optional[str], msg_type: str, data: Dict[str, Any]):
+        ws = self._sockets.get(client_id) if client_id else None
+        if ws is None or ws.closed:
+            return
+        try:
+            await ws.send_str(json.dumps({"type": msg_type, "data": data}))
+        except Exception:
+            pass
+
+    async def _broadcast_status(self):
+        for client_id in list(self._sockets.keys()):
+            await self._send(client_id, "status", {"status": {"exec_info": {"queue_remaining": self.queue_remaining}}})
+
+    # HTTP handlers
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        resource = request.match_info.route.resource
+        key = f"{request.method} {resource.canonical if resource else request.path}"
+        self.request_counts[key] = self.request_counts.get(key, 0) + 1
+        if self.config.request_latency > 0 and request.path != "/ws":
+            await asyncio.sleep(self.config.request_latency)
+        return await handler(request)
+
+    async def _post_prompt(self, request: web.Request):
+        if random.random() < self.config.submit_failure_rate:
+            return web.json_response({"error": "Injected submit failure"}, status=500)
+        data = await request.json()
+        graph = data.get("prompt")
+        if not isinstance(graph, dict) or not graph:
+            return web.json_response({"error": {"type": "invalid_prompt", "message": "Empty prompt"}}, status=400)
+        self._number += 1
+        prompt = _Prompt(
+            prompt_id=data.get("prompt_id") or str(uuid.uuid4()),
+            number=self._number,
+            graph=graph,
+            client_id=data.get("client_id"),
+        )
+        self.pending.append(prompt)
+        self._wakeup.set()
+        await self._broadcast_status()
+        return web.json_response({"prompt_id": prompt.prompt_id, "number": prompt.number, "node_errors": {}})
+
+    async def _get_prompt(self, request: web.Request):
+        return web.json_response({"exec_info": {"queue_remaining": self.queue_remaining}})
+
+    async def _ws(self, request: web.Request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        client_id = request.query.get("clientId") or uuid.uuid4().hex
+        self._sockets[client_id] = ws
+        await ws.send_str(json.dumps({
+            "type": "status",
+            "data": {"status": {"exec_info": {"queue_remaining": self.queue_remaining}}, "sid": client_id},
+        }))
+        try:
+            async for message in ws:
+                if message.type == WSMsgType.ERROR:
+                    break
+        finally:
+            if self._sockets.get(client_id) is ws:
+                del self._sockets[client_id]
+        return ws
+
+    async def _get_histories(self, request: web.Request):
+        max_items = int(request.query.get("max_items", len(self.history) or 1))
+        items = list(self.history.items())[-max_items:]
+        return web.json_response(dict(items))
+
+    async def _get_history(self, request: web.Request):
+        prompt_id = request.match_info["prompt_id"]
+        if prompt_id not in self.history:
+            return web.json_response({})
+        return web.json_response({prompt_id: self.history[prompt_id]})
+
+    async def _get_queue(self, request: web.Request):
+        def item(prompt: _Prompt):
+            return [prompt.number, prompt.prompt_id, {}, {"client_id": prompt.client_id}, []]
+        return web.json_response({
+            "queue_running": [item(prompt) for prompt in self.running.values()],
+            "queue_pending": [item(prompt) for prompt in self.pending],
+        })
+
+    async def _post_queue(self, request: web.Request):
+        data = await request.json()
+        if data.get("clear"):
+            self.pending.clear()
+        delete = set(data.get("delete") or [])
+        if delete:
+            self.pending = [prompt for prompt in self.pending if prompt.prompt_id not in delete]
+        await self._broadcast_status()
+        return web.Response(status=200)
+
+    async def _interrupt(self, request: web.Request):
+        data = {}
+        if request.can_read_body:
+            try:
+                data = await request.json()
+            except Exception:
+                data = {}
+        prompt_id = data.get("prompt_id")
+        for prompt in self.running.values():
+            if prompt_id is None or prompt.prompt_id == prompt_id:
+                prompt.interrupted = True
+        return web.Response(status=200)
+
+    async def _view(self, request: web.Request):
+        filename = request.query.get("filename", "")
+        ext = os.path.splitext(filename)[1] or ".png"
+        payload = self._payloads.get(ext)
+        if payload is None:
+            payload = os.urandom(min(self.config.output_size, 64 * 1024))
+            payload = (payload * (self.config.output_size // max(1, len(payload)) + 1))[:self.config.output_size]
+            self._payloads[ext] = payload
+        return web.Response(body=payload, content_type=CONTENT_TYPES.get(ext, "application/octet-stream"))
+
+    async def _upload(self, request: web.Request):
+        reader = await request.multipart()
+        name, size = None, 0
+        async for part in reader:
+            if part.name == "image":
+                name = part.filename
+                while chunk := await part.read_chunk():
+                    size += len(chunk)
+        if not name:
+            return web.json_response({"error": "No image"}, status=400)
+        self.uploads[name] = size
+        return web.json_response({"name": name, "subfolder": "", "type": "input"})
+
+
+def build_workflow(n_outputs: int = 1, output_type: str = "SaveImage") -> Dict[str, Any]:
+    """Build a minimal workflow in ComfyUI API format with Pixelle parameter titles"""
+    workflow = {
+        "1": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": "model.safetensors"}, "_meta": {"title": "Load Checkpoint"}},
+        "2": {"class_type": "CLIPTextEncode", "inputs": {"text": "", "clip": ["1", 1]}, "_meta": {"title": "$prompt.text!:Prompt"}},
+        "3": {"class_type": "KSampler", "inputs": {"seed": 0, "steps": 4, "model": ["1", 0], "positive": ["2", 0]}, "_meta": {"title": "KSampler"}},
+    }
+    for index in range(n_outputs):
+        workflow[str(10 + index)] = {
+            "class_type": output_type,
+            "inputs": {"images": ["3", 0]},
+            "_meta": {"title": f"$output.output{index}"},
+        }
+    return workflow
+
+
+def make_workflow(path: str, n_outputs: int = 1, output_type: str = "SaveImage"):
+    """Write a minimal workflow in ComfyUI API format with Pixelle parameter titles"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(build_workflow(n_outputs, output_type), f)
+
+
+async def _serve(args):
+    server = FakeComfyUI(FakeComfyUIConfig(
+        exec_time=args.exec_time,
+        workers=args.workers,
+        output_size=args.output_size,
+        request_latency=args.request_latency,
+        failure_rate=args.failure_rate,
+        submit_failure_rate=args.submit_failure_rate,
+    ))
+    await server.start(args.host, args.port)
+    print(f"Fake ComfyUI listening on http://{args.host}:{args.port}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in ComfyUI server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8188)
+    parser.add_argument("--exec-time", type=float, default=1.0, help="Seconds each prompt runs")
+    parser.add_argument("--workers", type=int, default=1, help="Prompts executed at the same time, 0 for unlimited")
+    parser.add_argument("--output-size", type=int, default=256 * 1024, help="Bytes of each output file")
+    parser.add_argument("--request-latency", type=float, default=0.0, help="Seconds added to every HTTP request")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability of an execution error")
+    parser.add_argument("--submit-failure-rate", type=float, default=0.0, help="Probability of HTTP 500 on POST /prompt")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
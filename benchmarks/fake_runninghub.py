@@ -0,0 +1,370 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+Stand-in RunningHub OpenAPI server for benchmarks
+
+Implements the endpoints Pixelle uses: `/api/openapi/getJsonApiFormat` and
+`/task/openapi/create|status|outputs|upload|cancel`, plus `/files/{name}` serving the
+task outputs. Task duration, concurrency, `code != 0` errors and rate limits are
+configurable.
+
+Every workflow id is known, it returns the benchmark workflow of `fake_comfyui`, one
+output file per SaveImage node. Request counters are exposed at `GET /_stats`.
+
+Run it standalone:
+    python -m benchmarks.fake_runninghub --port 8190 --task-duration 5 --rate-limit 20
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import hashlib
+import asyncio
+import argparse
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+from benchmarks.fake_comfyui import build_workflow
+
+# RunningHub response codes
+CODE_OK = 0
+CODE_INVALID_KEY = 412
+CODE_QUEUE_MAXED = 421
+CODE_TASK_NOT_FOUND = 807
+CODE_TASK_RUNNING = 804
+CODE_TASK_FAILED = 805
+CODE_TASK_QUEUED = 813
+CODE_INJECTED = 1001
+
+
+@dataclass
+class FakeRunningHubConfig:
+    # Seconds each task runs once it left the queue
+    task_duration: float = 5.0
+    # Tasks running at the same time, 0 for unlimited
+    workers: int = 0
+    # Max queued + running tasks, creating more answers code 421, 0 for unlimited
+    max_tasks: int = 0
+    # Requests per second accepted per client address, above that HTTP 429, 0 for unlimited
+    rate_limit: float = 0.0
+    # Extra latency in seconds added to every request
+    request_latency: float = 0.0
+    # Probability that any API request answers a `code != 0` error
+    error_rate: float = 0.0
+    # Probability that a task ends FAILED
+    task_failure_rate: float = 0.0
+    # Output files (SaveImage nodes) of the served workflow, and their size in bytes
+    outputs: int = 1
+    output_size: int = 256 * 1024
+    # Accepted API key, empty accepts any
+    api_key: str = ""
+
+
+@dataclass
+class _Task:
+    task_id: str
+    workflow_id: str
+    node_info_list: List[Dict[str, Any]]
+    status: str = "QUEUED"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    runner: Optional[asyncio.Task] = None
+
+
+class _RateLimiter:
+    """Token bucket of `rate` requests per second, with a burst of one second"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class FakeRunningHub:
+    """In-memory RunningHub stand-in"""
+
+    def __init__(self, config: Optional[FakeRunningHubConfig] = None):
+        self.config = config or FakeRunningHubConfig()
+        self.tasks: Dict[str, _Task] = {}
+        self.pending: List[_Task] = []
+        self.uploads: Dict[str, int] = {}
+        self.request_counts: Dict[str, int] = {}
+        self.error_counts: Dict[str, int] = {}
+        self._limiters: Dict[str, _RateLimiter] = {}
+        self._running = 0
+        self._payload: Optional[bytes] = None
+        self._runner: Optional[web.AppRunner] = None
+
+        self.app = web.Application(middlewares=[self._middleware], client_max_size=1024 ** 3)
+        router = self.app.router
+        router.add_post("/api/openapi/getJsonApiFormat", self._get_json_api_format)
+        router.add_post("/task/openapi/create", self._create)
+        router.add_post("/task/openapi/status", self._status)
+        router.add_post("/task/openapi/outputs", self._outputs)
+        router.add_post("/task/openapi/upload", self._upload)
+        router.add_post("/task/openapi/cancel", self._cancel)
+        router.add_get("/files/{name}", self._file)
+        router.add_get("/_stats", self._stats)
+
+    # Server lifecycle
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8190):
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def stop(self):
+        for task in self.tasks.values():
+            if task.runner is not None:
+                task.runner.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def get_stats(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for task in self.tasks.values():
+            statuses[task.status] = statuses.get(task.status, 0) + 1
+        return {
+            "requests": dict(self.request_counts),
+            "errors": dict(self.error_counts),
+            "tasks": statuses,
+            "uploads": len(self.uploads),
+        }
+
+    # Task execution
+
+    def _schedule(self):
+        while self.pending and (self.config.workers <= 0 or self._running < self.config.workers):
+            task = self.pending.pop(0)
+            self._running += 1
+            task.runner = asyncio.create_task(self._run(task))
+
+    async def _run(self, task: _Task):
+        task.status = "RUNNING"
+        task.started_at = time.time()
+        try:
+            await asyncio.sleep(self.config.task_duration)
+            task.status = "FAILED" if random.random() < self.config.task_failure_rate else "SUCCESS"
+        except asyncio.CancelledError:
+            task.status = "FAILED"
+        finally:
+            task.finished_at = time.time()
+            task.runner = None
+            self._running -= 1
+            self._schedule()
+
+    def _get_payload(self) -> bytes:
+        if self._payload is None:
+            chunk = os.urandom(min(self.config.output_size, 64 * 1024))
+            self._payload = (chunk * (self.config.output_size // max(1, len(chunk)) + 1))[:self.config.output_size]
+        return self._payload
+
+    # HTTP handlers
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        resource = request.match_info.route.resource
+        endpoint = resource.canonical if resource else request.path
+        if endpoint == "/_stats":
+            return await handler(request)
+        self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+        if self.config.request_latency > 0:
+            await asyncio.sleep(self.config.request_latency)
+        if request.method == "POST":
+            if self.config.rate_limit > 0:
+                key = request.remote or ""
+                limiter = self._limiters.setdefault(key, _RateLimiter(self.config.rate_limit))
+                if not limiter.allow():
+                    return self._error(endpoint, 429, "Too many requests", http_status=429)
+            if random.random() < self.config.error_rate:
+                return self._error(endpoint, CODE_INJECTED, "Injected error")
+        return await handler(request)
+
+    def _error(self, endpoint: str, code: int, msg: str, http_status: int = 200, data: Any = None) -> web.Response:
+        self.error_counts[endpoint] = self.error_counts.get(endpoint, 0) + 1
+        return web.json_response({"code": code, "msg": msg, "data": data}, status=http_status)
+
+    @staticmethod
+    def _ok(data: Any) -> web.Response:
+        return web.json_response({"code": CODE_OK, "msg": "success", "data": data})
+
+    async def _read_json(self, request: web.Request) -> Optional[Dict[str, Any]]:
+        try:
+            data = await request.json()
+        except Exception:
+            return None
+        if not isinstance(data, dict):
+            return None
+        if self.config.api_key and data.get("apiKey") != self.config.api_key:
+            return None
+        return data
+
+    async def _get_json_api_format(self, request: web.Request):
+        data = await self._read_json(request)
+        if data is None:
+            return self._error(request.path, CODE_INVALID_KEY, "TOKEN_INVALID")
+        workflow = build_workflow(self.config.outputs)
+        return self._ok({"prompt": json.dumps(workflow)})
+
+    async def _create(self, request: web.Request):
+        data = await self._read_json(request)
+        if data is None:
+            return self._error(request.path, CODE_INVALID_KEY, "TOKEN_INVALID")
+        active = len(self.pending) + self._running
+        if self.config.max_tasks > 0 and active >= self.config.max_tasks:
+            return self._error(request.path, CODE_QUEUE_MAXED, "TASK_QUEUE_MAXED")
+        task = _Task(
+            task_id=str(random.randrange(10 ** 18, 10 ** 19)),
+            workflow_id=str(data.get("workflowId")),
+            node_info_list=data.get("nodeInfoList") or [],
+        )
+        self.tasks[task.task_id] = task
+        self.pending.append(task)
+        self._schedule()
+        return self._ok({
+            "netWssUrl": None,
+            "taskId": task.task_id,
+            "clientId": uuid.uuid4().hex,
+            "taskStatus": task.status,
+            "promptTips": json.dumps({"node_errors": {}}),
+        })
+
+    def _get_task(self, data: Optional[Dict[str, Any]]) -> Optional[_Task]:
+        return self.tasks.get(str(data.get("taskId"))) if data else None
+
+    async def _status(self, request: web.Request):
+        data = await self._read_json(request)
+        if data is None:
+            return self._error(request.path, CODE_INVALID_KEY, "TOKEN_INVALID")
+        task = self._get_task(data)
+        if task is None:
+            return self._error(request.path, CODE_TASK_NOT_FOUND, "TASK_NOT_FOUND")
+        return self._ok(task.status)
+
+    async def _outputs(self, request: web.Request):
+        data = await self._read_json(request)
+        if data is None:
+            return self._error(request.path, CODE_INVALID_KEY, "TOKEN_INVALID")
+        task = self._get_task(data)
+        if task is None:
+            return self._error(request.path, CODE_TASK_NOT_FOUND, "TASK_NOT_FOUND")
+        if task.status == "QUEUED":
+            return self._error(request.path, CODE_TASK_QUEUED, "APIKEY_TASK_IS_QUEUED")
+        if task.status == "RUNNING":
+            return self._error(request.path, CODE_TASK_RUNNING, "APIKEY_TASK_IS_RUNNING")
+        if task.status == "FAILED":
+            return self._error(request.path, CODE_TASK_FAILED, "APIKEY_TASK_STATUS_ERROR",
+                               data={"failedReason": {"exception_message": "Injected task failure"}})
+
+        base_url = f"{request.scheme}://{request.host}"
+        cost_time = str(round(task.finished_at - task.started_at))
+        workflow = build_workflow(self.config.outputs)
+        return self._ok([
+            {
+                "fileUrl": f"{base_url}/files/{task.task_id}_{node_id}.png",
+                "fileType": "png",
+                "taskCostTime": cost_time,
+                "nodeId": node_id,
+            }
+            for node_id, node in workflow.items() if node["class_type"] == "SaveImage"
+        ])
+
+    async def _upload(self, request: web.Request):
+        reader = await request.multipart()
+        api_key, file_name, size, digest = None, None, 0, hashlib.sha256()
+        async for part in reader:
+            if part.name == "apiKey":
+                api_key = (await part.read()).decode()
+            elif part.name == "file":
+                ext = os.path.splitext(part.filename or "")[1] or ".png"
+                while chunk := await part.read_chunk():
+                    size += len(chunk)
+                    digest.update(chunk)
+                file_name = f"api/{digest.hexdigest()}{ext}"
+        if self.config.api_key and api_key != self.config.api_key:
+            return self._error(request.path, CODE_INVALID_KEY, "TOKEN_INVALID")
+        if not file_name:
+            return self._error(request.path, 1, "No file")
+        self.uploads[file_name] = size
+        return self._ok({"fileName": file_name, "fileType": "input"})
+
+    async def _cancel(self, request: web.Request):
+        data = await self._read_json(request)
+        if data is None:
+            return self._error(request.path, CODE_INVALID_KEY, "TOKEN_INVALID")
+        task = self._get_task(data)
+        if task is None:
+            return self._error(request.path, CODE_TASK_NOT_FOUND, "TASK_NOT_FOUND")
+        if task.status == "QUEUED":
+            self.pending.remove(task)
+            task.status = "FAILED"
+            task.finished_at = time.time()
+        elif task.runner is not None:
+            task.runner.cancel()
+        return self._ok(None)
+
+    async def _file(self, request: web.Request):
+        return web.Response(body=self._get_payload(), content_type="image/png")
+
+    async def _stats(self, request: web.Request):
+        return web.json_response(self.get_stats())
+
+
+async def _serve(args):
+    server = FakeRunningHub(FakeRunningHubConfig(
+        task_duration=args.task_duration,
+        workers=args.workers,
+        max_tasks=args.max_tasks,
+        rate_limit=args.rate_limit,
+        request_latency=args.request_latency,
+        error_rate=args.error_rate,
+        task_failure_rate=args.task_failure_rate,
+        outputs=args.outputs,
+        output_size=args.output_size,
+        api_key=args.api_key,
+    ))
+    await server.start(args.host, args.port)
+    print(f"Fake RunningHub listening on http://{args.host}:{args.port}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in RunningHub OpenAPI server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8190)
+    parser.add_argument("--task-duration", type=float, default=5.0, help="Seconds each task runs")
+    parser.add_argument("--workers", type=int, default=0, help="Tasks running at the same time, 0 for unlimited")
+    parser.add_argument("--max-tasks", type=int, default=0, help="Max queued + running tasks (code 421 above), 0 for unlimited")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requests per second per client (HTTP 429 above), 0 for unlimited")
+    parser.add_argument("--request-latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a `code != 0` answer")
+    parser.add_argument("--task-failure-rate", type=float, default=0.0, help="Probability of a FAILED task")
+    parser.add_argument("--outputs", type=int, default=1, help="Output files per task")
+    parser.add_argument("--output-size", type=int, default=256 * 1024, help="Bytes of each output file")
+    parser.add_argument("--api-key", default="", help="Accepted API key, empty accepts any")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
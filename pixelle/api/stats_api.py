@@ -0,0 +1,59 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from pixelle.comfyui.facade import default_client
+from pixelle.comfyui.workflow_cache import workflow_template_cache
+from pixelle.comfyui.result_cache import execution_result_cache
+from pixelle.comfyui.runninghub_metadata_cache import runninghub_metadata_cache
+from pixelle.manager.job_manager import job_manager
+from pixelle.manager.workflow_manager import workflow_manager
+
+# Create router
+router = APIRouter(
+    tags=["stats"],
+)
+
+
+@router.get("/comfyui")
+async def get_comfyui_stats():
+    """
+    Get ComfyUI client statistics
+    
+    Returns:
+        Connection pool statistics of each executor, routing statistics of each backend, model-locality routing, single-flight and execution journal statistics, workflow template cache, RunningHub metadata cache, execution result cache and job statistics
+    """
+    return {
+        "pools": default_client.get_pool_stats(),
+        "backends": default_client.get_backend_stats(),
+        "affinity": default_client.get_affinity_stats(),
+        "single_flight": default_client.get_single_flight_stats(),
+        "journal": await default_client.get_journal_stats(),
+        "workflow_templates": workflow_template_cache.get_stats(),
+        "runninghub_metadata": runninghub_metadata_cache.get_stats(),
+        "workflow_manifest": workflow_manager.manifest.get_stats(),
+        "execution_results": execution_result_cache.get_stats(),
+        "jobs": job_manager.get_stats(),
+    }
+
+
+@router.get("/workflows")
+async def get_workflow_stats():
+    """
+    Get workflow loading statistics
+    
+    Returns:
+        Whether startup loading is finished, number of workflow files, loaded and failed workflows, and loading time
+    """
+    return workflow_manager.get_loading_status()
+
+
+@router.get("/ready")
+async def get_readiness():
+    """
+    Readiness probe: 200 once all workflows are loaded as MCP tools, 503 while they are still loading
+    """
+    status = workflow_manager.get_loading_status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
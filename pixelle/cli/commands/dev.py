@@ -198,6 +198,7 @@ def dev_command():
     try:
         from pixelle.utils.os_util import get_data_path
         from pixelle.manager.workflow_manager import workflow_manager
+        workflow_manager.load_all_workflows_sync()
         
         # Get basic workflow stats
         custom_workflows_dir = Path(get_data_path("custom_workflows"))
@@ -29,6 +29,41 @@ def workflow_command():
     workflow_app()
 
 
+def _read_workflows(custom_workflows_dir: Path) -> dict:
+    """Metadata of each workflow file by tool name, from the workflow manifest
+    
+    New or modified local files are parsed (not recorded, the server updates the manifest),
+    RunningHub workflows missing from the manifest are read from the RunningHub metadata cache.
+    """
+    from pixelle.comfyui.workflow_parser import WorkflowParser
+    from pixelle.comfyui.runninghub_metadata_cache import runninghub_metadata_cache
+    from pixelle.manager.workflow_manifest import workflow_manifest
+    
+    workflows = {}
+    for workflow_file in sorted(custom_workflows_dir.glob("*.json")):
+        tool_name = workflow_file.stem
+        try:
+            entry = workflow_manifest.get(workflow_file)
+            if entry is not None:
+                workflows[tool_name] = {"metadata": entry["metadata"]}
+                continue
+            
+            with open(workflow_file, 'r', encoding='utf-8') as f:
+                workflow_data = json.load(f)
+            if workflow_data.get("_source") == "runninghub":
+                metadata = runninghub_metadata_cache.get(workflow_data.get("workflow_id", ""), tool_name)
+                if metadata is None:
+                    workflows[tool_name] = {"metadata": {"is_runninghub": True}, "pending": True}
+                    continue
+            else:
+                metadata = WorkflowParser().parse_workflow(workflow_data, tool_name)
+            if metadata is not None:
+                workflows[tool_name] = {"metadata": metadata.model_dump()}
+        except Exception as e:
+            console.print(f"⚠️  Failed to read workflow {workflow_file.name}: {e}")
+    return workflows
+
+
 @workflow_app.command("list")
 def list_workflows(
     source: Optional[str] = typer.Option(None, "--source", "-s", help="Filter by workflow source: 'local', 'runninghub', or 'all'")
@@ -53,19 +88,12 @@ def list_workflows(
         border_style="cyan"
     ))
     
-    # Get loaded workflow manager info
-    try:
-        from pixelle.manager.workflow_manager import workflow_manager
-        loaded_workflows = workflow_manager.loaded_workflows
-        total_loaded = len(loaded_workflows)
-    except Exception as e:
-        console.print(f"⚠️  Cannot access workflow manager: {e}")
-        loaded_workflows = {}
-        total_loaded = 0
+    # Read the workflows from the manifest kept by the server, without importing the workflow manager
+    loaded_workflows = _read_workflows(custom_workflows_dir)
     
     # Loaded Tools Details Table
     if loaded_workflows:
-        loaded_table = Table(title="⚡ Currently Loaded MCP Tools", show_header=True, header_style="bold blue")
+        loaded_table = Table(title="⚡ MCP Tools", show_header=True, header_style="bold blue")
         loaded_table.add_column("Tool Name", style="cyan", width=16)
         loaded_table.add_column("Source", style="magenta", width=10)
         loaded_table.add_column("Parameters", style="yellow", width=20)
@@ -77,14 +105,16 @@ def list_workflows(
             metadata = tool_info.get("metadata", {})
             
             # Filter by source if specified
-            workflow_source = metadata.get("source", "local")
+            workflow_source = "runninghub" if metadata.get("is_runninghub") else "local"
             if source and source != "all":
                 if source == "local" and workflow_source not in ["local", "comfyui"]:
                     continue
                 elif source == "runninghub" and workflow_source != "runninghub":
                     continue
             description = metadata.get("description", "No description")
-            if not description or description == "No description":
+            if tool_info.get("pending"):
+                description = "[dim]Not fetched from RunningHub yet, run pixelle start or refresh-runninghub[/dim]"
+            elif not description or description == "No description":
                 description = "[dim]No description[/dim]"
             else:
                 # Limit description length to avoid overly tall rows
@@ -106,7 +136,6 @@ def list_workflows(
                 param_display = "No params"
             
             # Determine workflow source display
-            workflow_source = metadata.get("source", "local")
             if workflow_source == "runninghub":
                 source_display = "🌐 Cloud"
             else:
@@ -130,7 +159,7 @@ def list_workflows(
         active_tools = len(loaded_workflows)
         console.print(f"\n📊 [bold]Total Active MCP Tools:[/bold] {active_tools}")
     else:
-        console.print("⚡ [yellow]No MCP tools are currently loaded[/yellow]")
+        console.print("⚡ [yellow]No MCP tools found[/yellow]")
 
 
 @workflow_app.command("install")
@@ -368,6 +397,58 @@ def add_runninghub_workflow(
         raise typer.Exit(1)
 
 
+@workflow_app.command("refresh-runninghub")
+def refresh_runninghub_workflows(
+    tool_name: Optional[str] = typer.Argument(None, help="Tool name of the RunningHub workflow to refresh, all if omitted")
+):
+    """🔄 Fetch RunningHub workflows again and update their cached metadata"""
+    
+    from pixelle.cli.utils.display import show_header_info
+    show_header_info()
+    
+    import asyncio
+    from pixelle.utils.os_util import get_data_path
+    from pixelle.utils.runninghub_util import is_runninghub_workflow, is_runninghub_configured, fetch_runninghub_workflow_metadata
+    
+    if not is_runninghub_configured():
+        console.print("❌ [bold red]RunningHub API key is not configured[/bold red]")
+        raise typer.Exit(1)
+    
+    custom_workflows_dir = Path(get_data_path("custom_workflows"))
+    workflow_files = [custom_workflows_dir / f"{tool_name}.json"] if tool_name else sorted(custom_workflows_dir.glob("*.json"))
+    workflow_files = [workflow_file for workflow_file in workflow_files if is_runninghub_workflow(workflow_file)]
+    if not workflow_files:
+        console.print(f"⚠️  [yellow]No RunningHub workflow {'named ' + tool_name + ' ' if tool_name else ''}found in {custom_workflows_dir}[/yellow]")
+        raise typer.Exit(1 if tool_name else 0)
+    
+    async def refresh_all():
+        return await asyncio.gather(*(
+            fetch_runninghub_workflow_metadata(workflow_file, workflow_file.stem, refresh=True)
+            for workflow_file in workflow_files
+        ))
+    
+    results = asyncio.run(refresh_all())
+    
+    table = Table(title="🔄 RunningHub Workflows", show_header=True, header_style="bold blue")
+    table.add_column("Tool Name", style="cyan")
+    table.add_column("Workflow ID", style="magenta")
+    table.add_column("Parameters", style="yellow")
+    table.add_column("Status", style="green")
+    failed = 0
+    for workflow_file, metadata in zip(workflow_files, results):
+        if metadata is None:
+            failed += 1
+            table.add_row(workflow_file.stem, "-", "-", "[red]Failed[/red]")
+        else:
+            table.add_row(workflow_file.stem, metadata.workflow_id, ", ".join(metadata.params.keys()) or "No params", "Refreshed")
+    console.print(table)
+    
+    if failed:
+        console.print(f"❌ [bold red]{failed} workflow(s) could not be fetched, see the logs for details[/bold red]")
+        raise typer.Exit(1)
+    console.print("💡 Restart Pixelle or call reload_workflows_tool to apply changed parameters")
+
+
 def show_workflow_menu():
     """Show interactive workflow management menu"""
     from pixelle.cli.utils.display import show_header_info
@@ -0,0 +1,217 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+Multi-backend ComfyUI pool with queue-depth-aware routing
+"""
+
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, List, Optional
+
+from pixelle.logger import logger
+from pixelle.settings import settings
+from pixelle.comfyui.base_executor import ComfyUIExecutor
+
+QUEUE_PROBE_INTERVAL = settings.comfyui_queue_probe_interval
+BACKEND_RETRY_INTERVAL = settings.comfyui_backend_retry_interval
+AFFINITY_MAX_QUEUE = settings.comfyui_affinity_max_queue
+# Number of recent workflows / model files remembered per backend
+AFFINITY_MAX_WORKFLOWS = 8
+AFFINITY_MAX_MODELS = 16
+
+
+class ComfyUIBackend:
+    """One ComfyUI service and the executor bound to it
+
+    Everything of a prompt (uploads, submit, history, /view) goes through the
+    backend's own executor, so it stays pinned to the service that ran it.
+    """
+
+    def __init__(self, base_url: str, executor: ComfyUIExecutor):
+        self.base_url = base_url
+        self.executor = executor
+        self.inflight = 0
+        self.queue_remaining: Optional[int] = None
+        self.queue_checked_at = 0.0
+        self.healthy = True
+        self.unhealthy_until = 0.0
+        self.routed = 0
+        self.failures = 0
+        self.affinity_hits = 0
+        self._probe_task: Optional[asyncio.Task] = None
+        # Most recently used last
+        self._recent_workflows: "OrderedDict[str, None]" = OrderedDict()
+        self._recent_models: "OrderedDict[str, None]" = OrderedDict()
+
+    @property
+    def load(self) -> int:
+        """Estimated load: remote queue depth, at least our own in-flight prompts"""
+        queue_remaining = self.executor.get_live_queue_remaining()
+        if queue_remaining is None:
+            queue_remaining = self.queue_remaining or 0
+        return max(queue_remaining, self.inflight)
+
+    def needs_probe(self, now: float) -> bool:
+        if not self.healthy:
+            return now >= self.unhealthy_until
+        if self.executor.get_live_queue_remaining() is not None:
+            return False
+        return now - self.queue_checked_at >= QUEUE_PROBE_INTERVAL
+
+    def warmth(self, workflow_key: Optional[str], model_names: FrozenSet[str]) -> int:
+        """How many of the prompt's models this backend loaded recently, 0 means cold
+
+        Workflows without loader nodes only match by workflow.
+        """
+        if model_names:
+            return sum(1 for name in model_names if name in self._recent_models)
+        return 1 if workflow_key is not None and workflow_key in self._recent_workflows else 0
+
+    def remember(self, workflow_key: Optional[str], model_names: FrozenSet[str]):
+        """Record the workflow and models of a prompt routed to this backend"""
+        if workflow_key is not None:
+            self._remember(self._recent_workflows, [workflow_key], AFFINITY_MAX_WORKFLOWS)
+        self._remember(self._recent_models, sorted(model_names), AFFINITY_MAX_MODELS)
+
+    @staticmethod
+    def _remember(recent: "OrderedDict[str, None]", keys: List[str], max_size: int):
+        for key in keys:
+            recent[key] = None
+            recent.move_to_end(key)
+        while len(recent) > max_size:
+            recent.popitem(last=False)
+
+    async def probe(self):
+        """Refresh queue depth and health, concurrent callers share one request"""
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.create_task(self._probe())
+        await asyncio.shield(self._probe_task)
+
+    async def _probe(self):
+        now = time.monotonic()
+        try:
+            self.queue_remaining = await self.executor.fetch_queue_remaining()
+            self.queue_checked_at = now
+            if not self.healthy:
+                logger.info(f"ComfyUI backend is back: {self.base_url}")
+            self.healthy = True
+        except Exception as e:
+            if self.healthy:
+                logger.warning(f"ComfyUI backend is unreachable: {self.base_url} ({e})")
+            self.healthy = False
+            self.unhealthy_until = now + BACKEND_RETRY_INTERVAL
+            self.failures += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "healthy": self.healthy,
+            "load": self.load,
+            "inflight": self.inflight,
+            "queue_remaining": self.queue_remaining,
+            "routed": self.routed,
+            "failures": self.failures,
+            "affinity_hits": self.affinity_hits,
+            "recent_models": list(self._recent_models.keys()),
+        }
+
+
+class ComfyUIBackendPool:
+    """Route each prompt to a healthy backend
+
+    A backend that recently ran the prompt's models (or workflow) is preferred while its
+    load is below AFFINITY_MAX_QUEUE, since switching checkpoints costs a model reload.
+    Otherwise the least-loaded backend wins.
+    """
+
+    def __init__(self, base_urls: List[str], executor_factory: Callable[[str], ComfyUIExecutor]):
+        if not base_urls:
+            raise ValueError("At least one ComfyUI backend is required")
+        self.backends = [ComfyUIBackend(url, executor_factory(url)) for url in base_urls]
+        self.affinity_stats: Dict[str, int] = {
+            "hits": 0,        # Routed to a warm backend
+            "saturated": 0,   # Warm backends existed but were too busy, routed by load
+            "cold": 0,        # No backend ran these models recently
+        }
+
+    async def _refresh(self):
+        """Probe backends whose queue depth is stale, and unhealthy backends due for a retry"""
+        if len(self.backends) == 1:
+            return
+        now = time.monotonic()
+        stale = [backend for backend in self.backends if backend.needs_probe(now)]
+        if stale:
+            await asyncio.gather(*(backend.probe() for backend in stale))
+
+    def _rank(self, candidates: List[ComfyUIBackend]) -> List[ComfyUIBackend]:
+        """Order candidates by load, spread ties by routed count"""
+        return sorted(candidates, key=lambda backend: (backend.load, backend.routed))
+
+    def _pick_warm(self, candidates: List[ComfyUIBackend], workflow_key: Optional[str], model_names: FrozenSet[str]) -> Optional[ComfyUIBackend]:
+        """Pick the warmest non-saturated backend, None if there is none"""
+        if AFFINITY_MAX_QUEUE <= 0 or (workflow_key is None and not model_names):
+            return None
+
+        warmth = {id(backend): backend.warmth(workflow_key, model_names) for backend in candidates}
+        warm = [backend for backend in candidates if warmth[id(backend)] > 0]
+        if not warm:
+            self.affinity_stats["cold"] += 1
+            return None
+
+        available = [backend for backend in warm if backend.load < AFFINITY_MAX_QUEUE]
+        if not available:
+            self.affinity_stats["saturated"] += 1
+            return None
+
+        self.affinity_stats["hits"] += 1
+        return min(available, key=lambda backend: (-warmth[id(backend)], backend.load, backend.routed))
+
+    async def acquire(self, workflow_key: Optional[str] = None, model_names: FrozenSet[str] = frozenset()) -> ComfyUIBackend:
+        """Pick a backend for a new prompt, must be paired with `release()`
+
+        Args:
+            workflow_key: Identifies the workflow, used for affinity when it has no loader nodes
+            model_names: Model files loaded by the prompt
+        """
+        await self._refresh()
+        candidates = [backend for backend in self.backends if backend.healthy]
+        if not candidates:
+            # Nothing reachable, let the request fail (or succeed) on the least recently failed one
+            candidates = [min(self.backends, key=lambda backend: backend.unhealthy_until)]
+
+        backend = self._pick_warm(candidates, workflow_key, model_names)
+        if backend is not None:
+            backend.affinity_hits += 1
+        else:
+            backend = self._rank(candidates)[0]
+        backend.inflight += 1
+        backend.routed += 1
+        backend.remember(workflow_key, model_names)
+        logger.debug(f"Routed prompt to ComfyUI backend {backend.base_url} (load={backend.load})")
+        return backend
+
+    def release(self, backend: ComfyUIBackend, submitted: bool = True):
+        """Release a backend acquired by `acquire()`
+
+        submitted=False means the prompt never reached the backend, its queue depth
+        is probed again on next routing.
+        """
+        backend.inflight = max(0, backend.inflight - 1)
+        if not submitted:
+            backend.queue_checked_at = 0.0
+
+    async def close(self):
+        for backend in self.backends:
+            await backend.executor.close()
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        return [backend.get_stats() for backend in self.backends]
+
+    def get_affinity_stats(self) -> Dict[str, Any]:
+        total = sum(self.affinity_stats.values())
+        return {
+            **self.affinity_stats,
+            "hit_rate": round(self.affinity_stats["hits"] / total, 4) if total else None,
+        }
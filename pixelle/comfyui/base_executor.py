@@ -4,28 +4,50 @@
 import os
 import json
 import copy
+import time
+import uuid
+import hashlib
 import tempfile
 import mimetypes
 from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
 from urllib.parse import urlparse
-from typing import Any, Optional, Dict, List, Tuple
+from typing import Any, Optional, Dict, List, Set, Tuple
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 import aiohttp
+import asyncio
 import random
 
 from pixelle.logger import logger
-from pixelle.utils.file_util import download_files
-from pixelle.utils.file_uploader import upload
-from pixelle.comfyui.workflow_parser import WorkflowParser, WorkflowMetadata
+from pixelle.utils.file_util import get_ext_from_content_type
+from pixelle.comfyui.workflow_parser import WorkflowMetadata
+from pixelle.comfyui.workflow_cache import CompiledWorkflow, workflow_template_cache
+from pixelle.comfyui.upload_cache import UploadCache, sha256_of_bytes
+from pixelle.comfyui.result_transfer import ResultTransferPipeline, TransferTiming
+from pixelle.comfyui.history_poller import HistoryPoller
 from pixelle.comfyui.models import ExecuteResult
+from pixelle.comfyui.result_cache import execution_result_cache, hash_workflow_graph
+from pixelle.comfyui.execution_journal import execution_journal
 from pixelle.utils.os_util import get_data_path
+from pixelle.utils.network_util import release_stale_session
 from pixelle.settings import settings
 
 # Configuration variables
 COMFYUI_BASE_URL = settings.comfyui_base_url
 COMFYUI_API_KEY = settings.comfyui_api_key
 COMFYUI_COOKIES = settings.comfyui_cookies
+COMFYUI_POOL_LIMIT = settings.comfyui_pool_limit
+COMFYUI_POOL_LIMIT_PER_HOST = settings.comfyui_pool_limit_per_host
+COMFYUI_KEEPALIVE_TIMEOUT = settings.comfyui_keepalive_timeout
+COMFYUI_DNS_CACHE_TTL = settings.comfyui_dns_cache_ttl
+COMFYUI_UPLOAD_REQUIRE_CONTENT_LENGTH = settings.comfyui_upload_require_content_length
+
+# Media relay: chunk size, and max size of sources buffered in memory (content hash known before uploading)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_BUFFER_LIMIT = 8 * 1024 * 1024
+# Weight of the latest run in the per-workflow execution time estimate
+EXECUTION_ESTIMATE_ALPHA = 0.3
 
 # Node types that need special media upload handling
 MEDIA_UPLOAD_NODE_TYPES = {
@@ -37,15 +59,82 @@ MEDIA_UPLOAD_NODE_TYPES = {
 TEMP_DIR = get_data_path("temp")
 os.makedirs(TEMP_DIR, exist_ok=True)
 
+@dataclass
+class PromptSubmission:
+    """A workflow request submitted to a backend"""
+    workflow_file: str
+    workflow_name: str = ""
+    prompt_id: Optional[str] = None
+    output_id_2_var: Dict[str, str] = field(default_factory=dict)
+    # Hash of the patched graph, None if the result must not be cached (randomized seed)
+    graph_hash: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    # Known without waiting: submit error or cached result
+    result: Optional[ExecuteResult] = None
+    # Executor specific state
+    context: Dict[str, Any] = field(default_factory=dict)
+
+
 class ComfyUIExecutor(ABC):
     """ComfyUI executor abstract base class"""
     
     def __init__(self, base_url: str = None):
         self.base_url = (base_url or COMFYUI_BASE_URL).rstrip('/')
         
-    @abstractmethod
+        # Shared session (owned by this executor), created lazily on first use
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session_lock: Optional[asyncio.Lock] = None
+        self._pool_stats: Dict[str, int] = {
+            "sessions_created": 0,
+            "requests": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "connections_queued": 0,
+        }
+        
+        # Input media already uploaded to this backend
+        self._upload_cache = UploadCache()
+        self._transfer_stats: Dict[str, Any] = {
+            "files": 0,
+            "bytes": 0,
+            "seconds": 0.0,
+        }
+        
+        # Execution time per workflow and start time of running prompts, to estimate the GPU time reclaimed by cancellation
+        self._execution_estimates: Dict[str, float] = {}
+        self._prompt_started_at: Dict[str, float] = {}
+        self._cancel_stats: Dict[str, Any] = {
+            "deleted": 0,        # Removed from the queue before running
+            "interrupted": 0,    # Stopped while running
+            "finished": 0,       # Nothing left to stop
+            "failed": 0,
+            "reclaimed_gpu_seconds": 0.0,
+        }
+        self._cancel_tasks: Set[asyncio.Task] = set()
+        
+        # Polls /queue and /history for prompts that are not followed otherwise, created lazily
+        self._history_poller: Optional[HistoryPoller] = None
+        # Set on shutdown: prompts left running are re-attached from the journal on next start, not cancelled
+        self._closed = False
+        
     async def execute_workflow(self, workflow_file: str, params: Dict[str, Any] = None) -> ExecuteResult:
-        """Abstract method to execute a workflow"""
+        """Execute a workflow: submit it, then wait for its result"""
+        submission = await self.submit_workflow(workflow_file, params)
+        return await self.wait_for_result(submission)
+    
+    @abstractmethod
+    async def submit_workflow(self, workflow_file: str, params: Dict[str, Any] = None) -> PromptSubmission:
+        """Abstract method to submit a workflow without waiting for it
+        
+        Never raises, failures are returned as `submission.result`. The submission must
+        be passed to `wait_for_result()`.
+        """
+        pass
+    
+    @abstractmethod
+    async def wait_for_result(self, submission: PromptSubmission, timeout: Optional[float] = None) -> ExecuteResult:
+        """Abstract method to wait for a submitted workflow and get its (transferred) result"""
         pass
     
     async def _parse_comfyui_cookies(self) -> Optional[Dict[str, str]]:
@@ -85,64 +174,166 @@ class ComfyUIExecutor(ABC):
             logger.warning(f"Failed to parse COMFYUI_COOKIES: {e}")
             return None
 
+    def _create_trace_config(self) -> aiohttp.TraceConfig:
+        """Trace config that counts requests and connection pool usage"""
+        stats = self._pool_stats
+        
+        async def on_request_start(session, ctx, params):
+            stats["requests"] += 1
+        
+        async def on_connection_create_end(session, ctx, params):
+            stats["connections_created"] += 1
+        
+        async def on_connection_reuseconn(session, ctx, params):
+            stats["connections_reused"] += 1
+        
+        async def on_connection_queued_start(session, ctx, params):
+            stats["connections_queued"] += 1
+        
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        return trace_config
+
+    async def _get_shared_session(self) -> aiohttp.ClientSession:
+        """Get the shared session of this executor, create it if needed
+        
+        The session is bound to the event loop it was created in, a new one is
+        created if the executor is used from another loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed and self._session_loop is loop:
+            return self._session
+        
+        if self._session_lock is None or self._session_loop is not loop:
+            # The previous session belongs to another (usually closed) loop, e.g. an earlier `asyncio.run`
+            release_stale_session(self._session, self._session_loop)
+            self._session = None
+            self._session_lock = asyncio.Lock()
+            self._session_loop = loop
+        
+        async with self._session_lock:
+            if self._session is not None and not self._session.closed and self._session_loop is loop:
+                return self._session
+            
+            cookies = await self._parse_comfyui_cookies()
+            connector = aiohttp.TCPConnector(
+                limit=COMFYUI_POOL_LIMIT,
+                limit_per_host=COMFYUI_POOL_LIMIT_PER_HOST,
+                keepalive_timeout=COMFYUI_KEEPALIVE_TIMEOUT,
+                use_dns_cache=True,
+                ttl_dns_cache=COMFYUI_DNS_CACHE_TTL,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                cookies=cookies,
+                trace_configs=[self._create_trace_config()],
+            )
+            self._session_loop = loop
+            self._pool_stats["sessions_created"] += 1
+            logger.info(f"Created pooled ComfyUI session for {self.base_url} "
+                        f"(limit={COMFYUI_POOL_LIMIT}, limit_per_host={COMFYUI_POOL_LIMIT_PER_HOST})")
+            return self._session
+
     @asynccontextmanager
     async def get_comfyui_session(self) -> AsyncGenerator[aiohttp.ClientSession, None]:
-        """aiohttp session with cookies, automatically loaded if COMFYUI_COOKIES exists"""
-        cookies = await self._parse_comfyui_cookies()
-        async with aiohttp.ClientSession(cookies=cookies) as session:
-            yield session
-
-    async def transfer_result_files(self, result: ExecuteResult) -> ExecuteResult:
-        """Transfer result files to new URLs"""
-        url_cache: Dict[str, str] = {}
-        
-        # Parse ComfyUI cookies, for downloading files that need authentication
-        cookies = await self._parse_comfyui_cookies()
-
-        async def transfer_urls(urls: List[str]) -> List[str]:
-            # Remove duplicates, preserve order
-            unique_urls = []
-            seen = set()
-            for url in urls:
-                if url not in seen:
-                    unique_urls.append(url)
-                    seen.add(url)
-            
-            # Download and upload uncached URLs
-            uncached_urls = [url for url in unique_urls if url not in url_cache]
-            if uncached_urls:
-                async with download_files(uncached_urls, cookies=cookies) as temp_files:
-                    for temp_file, url in zip(temp_files, uncached_urls):
-                        new_url = upload(temp_file)
-                        url_cache[url] = new_url
-            
-            return [url_cache.get(url, url) for url in urls]
+        """Shared aiohttp session with cookies, automatically loaded if COMFYUI_COOKIES exists
+        
+        The session is pooled and long-lived, it is NOT closed when the context exits.
+        Call `close()` on shutdown to release the connections.
+        """
+        session = await self._get_shared_session()
+        yield session
+
+    def _get_history_poller(self) -> HistoryPoller:
+        """Get the shared history poller of this backend"""
+        if self._history_poller is None:
+            self._history_poller = HistoryPoller(self)
+        return self._history_poller
+
+    async def close(self):
+        """Stop the history poller, close the shared session and release pooled connections"""
+        self._closed = True
+        if self._history_poller is not None:
+            await self._history_poller.close()
+        session = self._session
+        self._session = None
+        if session is not None and not session.closed:
+            await session.close()
+            logger.info(f"Closed pooled ComfyUI session for {self.base_url}")
+
+    def get_live_queue_remaining(self) -> Optional[int]:
+        """Queue depth of the backend as pushed/polled by this executor, None if not known live"""
+        return None
 
-        async def transfer_dict_urls(d: Dict[str, List[str]]) -> Dict[str, List[str]]:
-            if d:
-                result = {}
-                for k, v in d.items():
-                    result[k] = await transfer_urls(v)
-                return result
-            return d
+    async def fetch_queue_remaining(self, timeout: float = 2.0) -> int:
+        """Query the queue depth (running + pending prompts) of the backend"""
+        async with self.get_comfyui_session() as session:
+            async with session.get(f"{self.base_url}/prompt", timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                if response.status != 200:
+                    raise Exception(f"Get queue status failed: HTTP {response.status}")
+                data = await response.json()
+                return int(data.get("exec_info", {}).get("queue_remaining", 0))
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get connection pool statistics of this executor"""
+        session_open = self._session is not None and not self._session.closed
+        return {
+            "base_url": self.base_url,
+            "session_open": session_open,
+            "limit": COMFYUI_POOL_LIMIT,
+            "limit_per_host": COMFYUI_POOL_LIMIT_PER_HOST,
+            "keepalive_timeout": COMFYUI_KEEPALIVE_TIMEOUT,
+            "dns_cache_ttl": COMFYUI_DNS_CACHE_TTL,
+            **self._pool_stats,
+            "upload_cache": self._upload_cache.get_stats(),
+            "result_transfer": {**self._transfer_stats, "seconds": round(self._transfer_stats["seconds"], 3)},
+            "cancellation": {**self._cancel_stats, "reclaimed_gpu_seconds": round(self._cancel_stats["reclaimed_gpu_seconds"], 1)},
+            **({"history_poller": self._history_poller.get_stats()} if self._history_poller is not None else {}),
+        }
+
+    def _record_transfer(self, timing: TransferTiming):
+        self._transfer_stats["files"] += 1
+        self._transfer_stats["bytes"] += timing.size
+        self._transfer_stats["seconds"] += timing.seconds
 
-        # Construct new data
+    async def transfer_result_files(self, result: ExecuteResult, pipeline: Optional[ResultTransferPipeline] = None) -> ExecuteResult:
+        """Transfer result files to new URLs
+        
+        Args:
+            result: Execution result with ComfyUI URLs
+            pipeline: Transfer pipeline of this execution, files it already started are not transferred again
+        """
+        pipeline = pipeline or ResultTransferPipeline(self)
+        start_time = time.perf_counter()
+        
+        # Collect URLs of flat lists and per-variable dicts in one pass, each URL is transferred once
         data = result.model_dump()
-        for field in ["images", "audios", "videos"]:
-            if data.get(field):
-                data[field] = await transfer_urls(data[field])
-        for field in ["images_by_var", "audios_by_var", "videos_by_var"]:
-            if data.get(field):
-                data[field] = await transfer_dict_urls(data[field])
-        
-        # texts is native string, no need to transfer
-        for field in ["texts"]:
-            if data.get(field):
-                data[field] = data[field]
-        for field in ["texts_by_var"]:
-            if data.get(field):
-                data[field] = data[field]
+        urls: Dict[str, None] = {}
+        for result_field in ["images", "audios", "videos"]:
+            urls.update(dict.fromkeys(data.get(result_field) or []))
+        for result_field in ["images_by_var", "audios_by_var", "videos_by_var"]:
+            for var_urls in (data.get(result_field) or {}).values():
+                urls.update(dict.fromkeys(var_urls))
+        if not urls:
+            return result
         
+        url_map = await pipeline.transfer(urls.keys())
+        
+        # Construct new data, texts are native strings and are kept as is
+        for result_field in ["images", "audios", "videos"]:
+            if data.get(result_field):
+                data[result_field] = [url_map.get(url, url) for url in data[result_field]]
+        for result_field in ["images_by_var", "audios_by_var", "videos_by_var"]:
+            if data.get(result_field):
+                data[result_field] = {
+                    var: [url_map.get(url, url) for url in var_urls]
+                    for var, var_urls in data[result_field].items()
+                }
+        
+        logger.info(f"Transferred result files in {time.perf_counter() - start_time:.2f} seconds: {pipeline.summary()}")
         return ExecuteResult(**data)
 
     def _generate_63bit_seed(self) -> int:
@@ -235,43 +426,83 @@ class ComfyUIExecutor(ABC):
         node_data["inputs"][input_field] = param_value
 
     async def _upload_media_from_source(self, media_url: str) -> str:
-        """Upload media from URL"""
+        """Relay media from URL to ComfyUI, media already uploaded (same URL or same content) is reused
+        
+        Small sources with a known length are buffered in memory, so their content hash is
+        checked before uploading. Larger sources are piped straight into the multipart upload
+        with bounded memory, or spilled to a temporary file when COMFYUI_UPLOAD_REQUIRE_CONTENT_LENGTH
+        is set (upstream rejects chunked requests).
+        """
+        cached_name = self._upload_cache.get_by_url(media_url)
+        if cached_name is not None:
+            logger.info(f"Media already uploaded, reuse: {cached_name}")
+            return cached_name
+        
         async with self.get_comfyui_session() as session:
             async with session.get(media_url) as response:
                 if response.status != 200:
                     raise Exception(f"Download media failed: HTTP {response.status}")
                 
-                # Extract filename from URL
-                parsed_url = urlparse(media_url)
-                filename = os.path.basename(parsed_url.path)
-                if not filename:
-                    filename = f"temp_media_{hash(media_url)}.jpg"
-                
-                # Get media data
-                media_data = await response.read()
+                # Extract file suffix from URL, then from Content-Type
+                suffix = os.path.splitext(urlparse(media_url).path)[1]
+                if not suffix:
+                    suffix = get_ext_from_content_type(response.headers.get('Content-Type', '')) or ".jpg"
+                filename = f"{uuid.uuid4().hex}{suffix}"
                 
-                # Save to temporary file
-                suffix = os.path.splitext(filename)[1] or ".jpg"
-                with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=TEMP_DIR) as tmp:
-                    tmp.write(media_data)
-                    temp_path = tmp.name
+                content_length = response.content_length
+                if content_length is not None and content_length <= UPLOAD_BUFFER_LIMIT:
+                    media_data = await response.read()
+                    content_hash = sha256_of_bytes(media_data)
+                    cached_name = self._upload_cache.get_by_hash(content_hash, media_url)
+                    if cached_name is not None:
+                        logger.info(f"Media content already uploaded, reuse: {cached_name}")
+                        return cached_name
+                    uploaded_name = await self._upload_media_data(media_data, filename)
+                elif COMFYUI_UPLOAD_REQUIRE_CONTENT_LENGTH:
+                    # Spill to disk chunk by chunk, the file is uploaded with a known length
+                    digest = hashlib.sha256()
+                    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=TEMP_DIR) as tmp:
+                        temp_path = tmp.name
+                        async for chunk in response.content.iter_chunked(UPLOAD_CHUNK_SIZE):
+                            digest.update(chunk)
+                            tmp.write(chunk)
+                    try:
+                        content_hash = digest.hexdigest()
+                        cached_name = self._upload_cache.get_by_hash(content_hash, media_url)
+                        if cached_name is not None:
+                            logger.info(f"Media content already uploaded, reuse: {cached_name}")
+                            return cached_name
+                        uploaded_name = await self._upload_media(temp_path)
+                    finally:
+                        # Delete temporary file
+                        os.unlink(temp_path)
+                else:
+                    # Pipe the source body into the upload, hash it on the way
+                    digest = hashlib.sha256()
+                    
+                    async def relay_chunks():
+                        async for chunk in response.content.iter_chunked(UPLOAD_CHUNK_SIZE):
+                            digest.update(chunk)
+                            yield chunk
+                    
+                    uploaded_name = await self._upload_media_data(relay_chunks(), filename)
+                    content_hash = digest.hexdigest()
         
-        try:
-            # Upload temporary file to ComfyUI
-            return await self._upload_media(temp_path)
-        finally:
-            # Delete temporary file
-            os.unlink(temp_path)
+        self._upload_cache.put(content_hash, uploaded_name, media_url)
+        return uploaded_name
 
     async def _upload_media(self, media_path: str) -> str:
-        """Upload media to ComfyUI"""
-        # Read media data
+        """Upload media file to ComfyUI, the file is streamed from disk"""
         with open(media_path, 'rb') as f:
-            media_data = f.read()
-        
-        # Extract filename
-        filename = os.path.basename(media_path)
+            return await self._upload_media_data(f, os.path.basename(media_path))
+
+    async def _upload_media_data(self, media_data: Any, filename: str) -> str:
+        """Upload media to ComfyUI
         
+        Args:
+            media_data: bytes, a binary file object or an async iterable of bytes chunks
+            filename: File name sent to ComfyUI
+        """
         # Automatically detect file MIME type
         mime_type = mimetypes.guess_type(filename)[0]
         if mime_type is None:
@@ -294,9 +525,14 @@ class ComfyUIExecutor(ABC):
                 result = await response.json()
                 return result.get('name', '')
 
-    async def _apply_params_to_workflow(self, workflow_data: Dict[str, Any], metadata: WorkflowMetadata, params: Dict[str, Any]) -> Dict[str, Any]:
-        """Apply parameters to workflow using new parser"""
-        workflow_data = copy.deepcopy(workflow_data)
+    async def _apply_params_to_workflow(self, workflow_data: Dict[str, Any], metadata: WorkflowMetadata, params: Dict[str, Any], copy_workflow: bool = True) -> Dict[str, Any]:
+        """Apply parameters to workflow using new parser
+        
+        Pass copy_workflow=False when workflow_data is already a per-request copy,
+        e.g. from `CompiledWorkflow.instantiate()`.
+        """
+        if copy_workflow:
+            workflow_data = copy.deepcopy(workflow_data)
         
         # Iterate through all parameter mappings
         for mapping in metadata.mapping_info.param_mappings:
@@ -326,10 +562,275 @@ class ComfyUIExecutor(ABC):
         
         return output_id_2_var
 
+    def _get_prompt_ext_params(self) -> Dict[str, Any]:
+        """Extra parameters submitted with each prompt"""
+        if COMFYUI_API_KEY:
+            return {
+                "extra_data": {
+                    "api_key_comfy_org": COMFYUI_API_KEY
+                }
+            }
+        logger.warning("COMFYUI_API_KEY is not set")
+        return {}
+
+    async def _prepare_prompt(self, workflow_file: str, params: Dict[str, Any] = None) -> Tuple[Optional[Dict[str, Any]], PromptSubmission]:
+        """Build the patched workflow graph of a request
+        
+        Returns:
+            (workflow_data, submission), workflow_data is None when `submission.result`
+            is already known (invalid workflow or cached result)
+        """
+        submission = PromptSubmission(workflow_file=workflow_file)
+        if not os.path.exists(workflow_file):
+            logger.error(f"Workflow file does not exist: {workflow_file}")
+            submission.result = ExecuteResult(status="error", msg=f"Workflow file does not exist: {workflow_file}")
+            return None, submission
+        
+        # Get compiled workflow template (metadata and graph are cached until the file changes)
+        compiled = self.get_compiled_workflow(workflow_file)
+        metadata = compiled.metadata
+        if not metadata:
+            submission.result = ExecuteResult(status="error", msg="Cannot parse workflow metadata")
+            return None, submission
+        
+        if not compiled.graph:
+            submission.result = ExecuteResult(status="error", msg="Workflow data is missing")
+            return None, submission
+        submission.workflow_name = metadata.title
+        
+        # Use new parameter mapping logic, only the patched nodes are copied from the template.
+        # Even if no parameters are passed, default values need to be applied
+        workflow_data = await self._apply_params_to_workflow(
+            compiled.instantiate(), metadata, params or {}, copy_workflow=False
+        )
+        
+        # Hash the patched graph before seeds are randomized, an identical graph gives an identical result
+        graph_hash = hash_workflow_graph(workflow_data)
+        
+        # Replace any seed == 0 with a random 63-bit seed before submission
+        workflow_data, seed_changes = self._randomize_seed_in_workflow(workflow_data)
+        if seed_changes:
+            execution_result_cache.skip(metadata.title)
+        else:
+            cached_result = execution_result_cache.get(graph_hash, metadata.title)
+            if cached_result is None:
+                # Outputs of an identical graph re-attached after a restart are handed out instead of recomputed
+                cached_result = await execution_journal.claim_recovered(graph_hash)
+                if cached_result is not None:
+                    logger.info(f"Use the result re-attached after restart of an identical graph: {metadata.title} (prompt_id={cached_result.prompt_id})")
+            if cached_result is not None:
+                submission.result = cached_result
+                return None, submission
+            submission.graph_hash = graph_hash
+        
+        # Extract output node information from metadata
+        submission.output_id_2_var = self._extract_output_nodes(metadata)
+        return workflow_data, submission
+
+    def _cache_result(self, submission: PromptSubmission, result: ExecuteResult):
+        """Store the result of a deterministic execution"""
+        if submission.graph_hash:
+            execution_result_cache.put(submission.graph_hash, result, submission.workflow_name)
+
+    def _mark_running(self, prompt_id: str):
+        """Record when a prompt started running on the backend"""
+        self._prompt_started_at.setdefault(prompt_id, time.time())
+
+    def _record_execution(self, submission: PromptSubmission, completed: bool):
+        """Update the execution time estimate of the workflow with a finished prompt"""
+        started_at = self._prompt_started_at.pop(submission.prompt_id, None)
+        if not completed or started_at is None:
+            return
+        seconds = time.time() - started_at
+        estimate = self._execution_estimates.get(submission.workflow_name)
+        if estimate is not None:
+            seconds = estimate + EXECUTION_ESTIMATE_ALPHA * (seconds - estimate)
+        self._execution_estimates[submission.workflow_name] = seconds
+
+    async def _stop_prompt(self, prompt_id: str) -> str:
+        """Delete a pending prompt from the queue, or interrupt it if running
+
+        Returns:
+            "deleted", "interrupted", or "finished" if there was nothing to stop
+        """
+        async with self.get_comfyui_session() as session:
+            async with session.get(f"{self.base_url}/queue") as response:
+                if response.status != 200:
+                    raise Exception(f"Get queue failed: HTTP {response.status}")
+                queue_data = await response.json()
+
+            # Queue items are [number, prompt_id, prompt, extra_data, outputs_to_execute]
+            running = {item[1] for item in queue_data.get("queue_running", []) if len(item) > 1}
+            pending = {item[1] for item in queue_data.get("queue_pending", []) if len(item) > 1}
+
+            if prompt_id in pending:
+                async with session.post(f"{self.base_url}/queue", json={"delete": [prompt_id]}) as response:
+                    if response.status != 200:
+                        raise Exception(f"Delete from queue failed: HTTP {response.status}")
+                return "deleted"
+            if prompt_id in running:
+                # Recent ComfyUI only interrupts the given prompt, older versions ignore the body
+                async with session.post(f"{self.base_url}/interrupt", json={"prompt_id": prompt_id}) as response:
+                    if response.status != 200:
+                        raise Exception(f"Interrupt failed: HTTP {response.status}")
+                return "interrupted"
+            return "finished"
+
+    async def cancel_prompt(self, submission: PromptSubmission) -> Optional[str]:
+        """Stop a submitted prompt whose result is no longer wanted
+
+        Returns:
+            "deleted", "interrupted", "finished", or None if the backend could not be reached
+        """
+        prompt_id = submission.prompt_id
+        try:
+            action = await self._stop_prompt(prompt_id)
+        except Exception as e:
+            self._cancel_stats["failed"] += 1
+            logger.warning(f"Cancel prompt {prompt_id} on {self.base_url} failed: {e}")
+            return None
+
+        self._cancel_stats[action] += 1
+        if action == "finished":
+            logger.info(f"Prompt {prompt_id} already finished, nothing to cancel")
+            return action
+
+        # A deleted prompt saves a whole run, an interrupted one what was left of it
+        reclaimed = 0.0
+        estimate = self._execution_estimates.get(submission.workflow_name)
+        if estimate is not None:
+            if action == "deleted":
+                reclaimed = estimate
+            else:
+                # Counting from submission when the start is unknown underestimates, never overestimates
+                started_at = self._prompt_started_at.get(prompt_id, submission.created_at)
+                reclaimed = max(0.0, estimate - (time.time() - started_at))
+        self._cancel_stats["reclaimed_gpu_seconds"] += reclaimed
+        reclaimed_str = f"about {reclaimed:.1f}" if estimate is not None else "unknown (no finished run yet)"
+        logger.info(f"Cancelled prompt {prompt_id} on {self.base_url} ({action}), reclaimed GPU seconds: {reclaimed_str}")
+        return action
+
+    async def _cancel_abandoned(self, submission: PromptSubmission):
+        """Stop the prompt of a cancelled waiter, the cancel request is not dropped by a second cancellation"""
+        if submission.prompt_id is None or self._closed:
+            return
+        task = asyncio.create_task(self.cancel_prompt(submission))
+        self._cancel_tasks.add(task)
+        task.add_done_callback(self._cancel_tasks.discard)
+        try:
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            pass
+
+    async def reattach(self, submission: PromptSubmission, timeout: Optional[float] = None) -> ExecuteResult:
+        """Wait for a prompt submitted by a previous process and transfer its result files
+
+        Its progress messages went to a client that no longer exists, so it is followed
+        through `/queue` and `/history`.
+        """
+        prompt_id = submission.prompt_id
+        poller = self._get_history_poller()
+        try:
+            state, prompt_history = await poller.lookup(prompt_id)
+            if state == "unknown":
+                return ExecuteResult(status="error", prompt_id=prompt_id, msg=f"Prompt is neither queued nor in the history of {self.base_url}, the backend may have restarted")
+            if prompt_history is None:
+                try:
+                    prompt_history = await asyncio.wait_for(poller.watch(prompt_id), timeout=timeout)
+                finally:
+                    poller.unwatch(prompt_id)
+
+            result = self._build_result_from_history(prompt_id, prompt_history, submission.output_id_2_var)
+            result.duration = time.time() - submission.created_at
+            result = await self.transfer_result_files(result)
+            self._cache_result(submission, result)
+            return result
+        except asyncio.TimeoutError:
+            return ExecuteResult(status="timeout", prompt_id=prompt_id, msg=f"Re-attached prompt did not finish within {timeout} seconds")
+        except Exception as e:
+            logger.error(f"Re-attach prompt {prompt_id} failed: {e}")
+            return ExecuteResult(status="error", prompt_id=prompt_id, msg=str(e))
+
+    def _build_result_from_history(self, prompt_id: str, prompt_history: Dict[str, Any], output_id_2_var: Optional[Dict[str, str]] = None) -> ExecuteResult:
+        """Build execution result from a /history entry"""
+        result = ExecuteResult(
+            status="processing",
+            prompt_id=prompt_id
+        )
+
+        # Get base URL
+        base_url = self.base_url
+
+        status = prompt_history.get("status")
+        if status and status.get("status_str") == "error":
+            result.status = "error"
+            messages = status.get("messages")
+            if messages:
+                errors = [
+                    body.get("exception_message")
+                    for type, body in messages
+                    if type == "execution_error"
+                ]
+                error_message = "\n".join(errors)
+            else:
+                error_message = "Unknown error"
+            result.msg = error_message
+            return result
+        
+        result.outputs = prompt_history.get("outputs", {})
+        result.status = "completed"
+
+        # Collect all images, videos, audios and texts outputs by file extension
+        output_id_2_images = {}
+        output_id_2_videos = {}
+        output_id_2_audios = {}
+        output_id_2_texts = {}
+        
+        for node_id, node_output in result.outputs.items():
+            images, videos, audios = self._split_media_by_suffix(node_output, base_url)
+            if images:
+                output_id_2_images[node_id] = images
+            if videos:
+                output_id_2_videos[node_id] = videos
+            if audios:
+                output_id_2_audios[node_id] = audios
+            
+            # Collect text outputs
+            if "text" in node_output:
+                texts = node_output["text"]
+                if isinstance(texts, str):
+                    texts = [texts]
+                elif not isinstance(texts, list):
+                    texts = [str(texts)]
+                output_id_2_texts[node_id] = texts
+
+        # If there is a mapping, map by variable name
+        if output_id_2_images:
+            result.images_by_var = self._map_outputs_by_var(output_id_2_var or {}, output_id_2_images)
+            result.images = self._extend_flat_list_from_dict(result.images_by_var)
+
+        if output_id_2_videos:
+            result.videos_by_var = self._map_outputs_by_var(output_id_2_var or {}, output_id_2_videos)
+            result.videos = self._extend_flat_list_from_dict(result.videos_by_var)
+
+        if output_id_2_audios:
+            result.audios_by_var = self._map_outputs_by_var(output_id_2_var or {}, output_id_2_audios)
+            result.audios = self._extend_flat_list_from_dict(result.audios_by_var)
+
+        # Process texts/texts_by_var
+        if output_id_2_texts:
+            result.texts_by_var = self._map_outputs_by_var(output_id_2_var or {}, output_id_2_texts)
+            result.texts = self._extend_flat_list_from_dict(result.texts_by_var)
+
+        return result
+
+    def get_compiled_workflow(self, workflow_file: str) -> CompiledWorkflow:
+        """Get compiled workflow template (cached until the file changes)"""
+        return workflow_template_cache.get(workflow_file)
+
     def get_workflow_metadata(self, workflow_file: str) -> Optional[WorkflowMetadata]:
         """Get workflow metadata (using new parser)"""
-        parser = WorkflowParser()
-        return parser.parse_workflow_file(workflow_file)
+        return self.get_compiled_workflow(workflow_file).metadata
 
     def _split_media_by_suffix(self, node_output: Dict[str, Any], base_url: str) -> Tuple[List[str], List[str], List[str]]:
         """Split media by file extension into images/videos/audios"""
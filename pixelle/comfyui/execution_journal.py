@@ -0,0 +1,249 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+Durable journal of submitted prompts, to re-attach to unfinished work after a restart
+"""
+
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from pixelle.logger import logger
+from pixelle.settings import settings
+from pixelle.comfyui.models import ExecuteResult
+from pixelle.utils.os_util import get_data_path
+
+EXECUTION_JOURNAL_ENABLED = settings.execution_journal_enabled
+EXECUTION_JOURNAL_MAX_AGE = settings.execution_journal_max_age
+EXECUTION_JOURNAL_PATH = get_data_path("execution_journal.db")
+
+# Backend name of RunningHub tasks, local backends are recorded by base URL
+RUNNINGHUB_BACKEND = "runninghub"
+SUBMITTED = "submitted"
+LOST = "lost"
+# Completed by a re-attached execution, the result of a deterministic graph is handed to the next identical request
+RECOVERED = "recovered"
+
+
+def hash_params(params: Optional[Dict[str, Any]]) -> str:
+    canonical = json.dumps(params or {}, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class JournalEntry:
+    """One submitted prompt (or RunningHub task)"""
+    id: int
+    workflow_file: str
+    workflow_name: str
+    params_hash: str
+    graph_hash: Optional[str]
+    backend: str
+    prompt_id: str
+    output_id_2_var: Dict[str, str] = field(default_factory=dict)
+    state: str = SUBMITTED
+    created_at: float = 0.0
+
+
+class ExecutionJournal:
+    """SQLite journal of submissions and their final state
+
+    A submission stays in the `submitted` state until its result is received. Entries
+    left `submitted` by a stopped or crashed process are re-attached on next start, their
+    completed results stay `recovered` until a request with an identical graph claims them.
+    Results of graphs with a randomized seed are never claimed, only looked up by prompt_id.
+    Entries older than `max_age` seconds are pruned.
+
+    Queries run on a single journal thread, in submission order, so the event loop never
+    waits for SQLite.
+    """
+
+    def __init__(self, db_path: str = EXECUTION_JOURNAL_PATH, enabled: bool = EXECUTION_JOURNAL_ENABLED,
+                 max_age: float = EXECUTION_JOURNAL_MAX_AGE):
+        self.db_path = db_path
+        self.enabled = enabled
+        self.max_age = max_age
+        self._conn: Optional[sqlite3.Connection] = None
+        self._thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="execution-journal")
+
+    async def _run(self, func, *args):
+        """Run a query on the journal thread, a cancelled caller does not drop a started write"""
+        return await asyncio.shield(asyncio.get_running_loop().run_in_executor(self._thread, func, *args))
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS executions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    workflow_file TEXT NOT NULL,
+                    workflow_name TEXT NOT NULL,
+                    params_hash TEXT NOT NULL,
+                    graph_hash TEXT,
+                    backend TEXT NOT NULL,
+                    prompt_id TEXT NOT NULL,
+                    output_id_2_var TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    result TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_executions_state ON executions (state)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_executions_prompt_id ON executions (prompt_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_executions_graph_hash ON executions (graph_hash)")
+            self._conn = conn
+        return self._conn
+
+    async def record(self, workflow_file: str, workflow_name: str, params: Optional[Dict[str, Any]], graph_hash: Optional[str],
+                     backend: str, prompt_id: str, output_id_2_var: Dict[str, str], created_at: float) -> Optional[int]:
+        """Record a submission, returns the entry id (None if disabled or failed)"""
+        if not self.enabled:
+            return None
+        return await self._run(self._record, workflow_file, workflow_name, params, graph_hash, backend, prompt_id,
+                               output_id_2_var, created_at)
+
+    def _record(self, workflow_file: str, workflow_name: str, params: Optional[Dict[str, Any]], graph_hash: Optional[str],
+                backend: str, prompt_id: str, output_id_2_var: Dict[str, str], created_at: float) -> Optional[int]:
+        try:
+            cursor = self._get_conn().execute(
+                "INSERT INTO executions (workflow_file, workflow_name, params_hash, graph_hash, backend, prompt_id, "
+                "output_id_2_var, state, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (workflow_file, workflow_name, hash_params(params), graph_hash, backend, prompt_id,
+                 json.dumps(output_id_2_var or {}), SUBMITTED, created_at, time.time()),
+            )
+            return cursor.lastrowid
+        except Exception as e:
+            logger.warning(f"Record execution {prompt_id} in journal failed: {e}")
+            return None
+
+    async def finish(self, entry_id: Optional[int], state: str, result: Optional[ExecuteResult] = None):
+        """Record the final state (and result) of a submission"""
+        if not self.enabled or entry_id is None:
+            return
+        await self._run(self._finish, entry_id, state, result)
+
+    def _finish(self, entry_id: int, state: str, result: Optional[ExecuteResult]):
+        try:
+            self._get_conn().execute(
+                "UPDATE executions SET state = ?, result = ?, updated_at = ? WHERE id = ?",
+                (state, result.model_dump_json() if result is not None else None, time.time(), entry_id),
+            )
+        except Exception as e:
+            logger.warning(f"Update execution {entry_id} in journal failed: {e}")
+
+    async def get_unfinished(self) -> List[JournalEntry]:
+        """Get submissions whose result was never received"""
+        if not self.enabled:
+            return []
+        return await self._run(self._get_unfinished)
+
+    def _get_unfinished(self) -> List[JournalEntry]:
+        try:
+            rows = self._get_conn().execute(
+                "SELECT id, workflow_file, workflow_name, params_hash, graph_hash, backend, prompt_id, "
+                "output_id_2_var, state, created_at FROM executions WHERE state = ? ORDER BY id",
+                (SUBMITTED,),
+            ).fetchall()
+        except Exception as e:
+            logger.warning(f"Read execution journal failed: {e}")
+            return []
+        return [
+            JournalEntry(
+                id=row[0], workflow_file=row[1], workflow_name=row[2], params_hash=row[3], graph_hash=row[4],
+                backend=row[5], prompt_id=row[6], output_id_2_var=json.loads(row[7]), state=row[8], created_at=row[9],
+            )
+            for row in rows
+        ]
+
+    async def claim_recovered(self, graph_hash: Optional[str]) -> Optional[ExecuteResult]:
+        """Take the recovered result of an identical graph, each recovered result is handed out once
+        
+        `graph_hash` is only set for graphs without randomized seed, None never matches.
+        """
+        if not self.enabled or not graph_hash:
+            return None
+        return await self._run(self._claim_recovered, graph_hash)
+
+    def _claim_recovered(self, graph_hash: str) -> Optional[ExecuteResult]:
+        try:
+            conn = self._get_conn()
+            rows = conn.execute(
+                "SELECT id, result FROM executions WHERE state = ? AND graph_hash = ? ORDER BY id",
+                (RECOVERED, graph_hash),
+            ).fetchall()
+            for entry_id, result in rows:
+                # Another request may claim the same entry concurrently
+                cursor = conn.execute(
+                    "UPDATE executions SET state = ?, updated_at = ? WHERE id = ? AND state = ?",
+                    ("completed", time.time(), entry_id, RECOVERED),
+                )
+                if cursor.rowcount == 1:
+                    return ExecuteResult.model_validate_json(result)
+        except Exception as e:
+            logger.warning(f"Claim recovered result of graph {graph_hash[:12]} failed: {e}")
+        return None
+
+    async def get_by_prompt_id(self, prompt_id: str) -> Optional[Tuple[str, Optional[ExecuteResult]]]:
+        """Get (state, result) of the latest submission of a prompt, None if unknown"""
+        if not self.enabled:
+            return None
+        return await self._run(self._get_by_prompt_id, prompt_id)
+
+    def _get_by_prompt_id(self, prompt_id: str) -> Optional[Tuple[str, Optional[ExecuteResult]]]:
+        try:
+            row = self._get_conn().execute(
+                "SELECT state, result FROM executions WHERE prompt_id = ? ORDER BY id DESC LIMIT 1",
+                (prompt_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            return row[0], ExecuteResult.model_validate_json(row[1]) if row[1] else None
+        except Exception as e:
+            logger.warning(f"Read execution {prompt_id} from journal failed: {e}")
+            return None
+
+    async def prune(self):
+        """Delete entries older than max_age"""
+        if not self.enabled or self.max_age <= 0:
+            return
+        await self._run(self._prune)
+
+    def _prune(self):
+        try:
+            self._get_conn().execute("DELETE FROM executions WHERE created_at < ?", (time.time() - self.max_age,))
+        except Exception as e:
+            logger.warning(f"Prune execution journal failed: {e}")
+
+    def close(self):
+        """Close the connection once pending queries ran"""
+        self._thread.submit(self._close).result()
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def get_stats(self) -> Dict[str, Any]:
+        if not self.enabled:
+            return {"enabled": False}
+        return await self._run(self._get_stats)
+
+    def _get_stats(self) -> Dict[str, Any]:
+        try:
+            rows = self._get_conn().execute("SELECT state, COUNT(*) FROM executions GROUP BY state").fetchall()
+        except Exception as e:
+            return {"enabled": True, "error": str(e)}
+        return {"enabled": True, "states": {state: count for state, count in rows}}
+
+
+# Global execution journal
+execution_journal = ExecutionJournal()
@@ -1,12 +1,24 @@
 # Copyright (C) 2025 AIDC-AI
 # This project is licensed under the MIT License (SPDX-License-identifier: MIT).
 
-from typing import Dict, Any
+import os
+import json
+import time
+import asyncio
+import hashlib
+import contextlib
+from dataclasses import dataclass
+from typing import Dict, Any, List, FrozenSet, Optional, Tuple
 
 from pixelle.comfyui.models import ExecuteResult
+from pixelle.comfyui.base_executor import ComfyUIExecutor, PromptSubmission
 from pixelle.comfyui.websocket_executor import WebSocketExecutor
 from pixelle.comfyui.http_executor import HttpExecutor
 from pixelle.comfyui.runninghub_executor import RunningHubExecutor
+from pixelle.comfyui.backend_pool import ComfyUIBackend, ComfyUIBackendPool
+from pixelle.comfyui.workflow_cache import workflow_template_cache
+from pixelle.comfyui.execution_journal import execution_journal, JournalEntry, RUNNINGHUB_BACKEND, LOST, RECOVERED
+from pixelle.logger import logger
 from pixelle.settings import settings
 from pixelle.utils.runninghub_util import is_runninghub_workflow
 
@@ -14,35 +26,114 @@ from pixelle.utils.runninghub_util import is_runninghub_workflow
 COMFYUI_EXECUTOR_TYPE = settings.comfyui_executor_type
 
 
+@dataclass
+class WorkflowRun:
+    """A workflow submitted through `ComfyUIClient.submit_workflow()`, pass it to `wait_for_result()`"""
+    executor: ComfyUIExecutor
+    submission: PromptSubmission
+    # Local ComfyUI backend the prompt was routed to, released once the result is received
+    backend: Optional[ComfyUIBackend] = None
+    # Entry of the submission in the execution journal
+    journal_id: Optional[int] = None
+
+
 class ComfyUIClient:
     """ComfyUI client Facade class, providing a unified external interface"""
     
-    def __init__(self, base_url: str = None, executor_type: str = None):
+    def __init__(self, base_url: str = None, executor_type: str = None, base_urls: List[str] = None):
         """
         Initialize ComfyUI client
         
         Args:
             base_url: ComfyUI service base URL
             executor_type: Executor type for local ComfyUI, 'websocket' or 'http'
+            base_urls: Multiple ComfyUI service base URLs, prompts are routed to the least-loaded one
         """
         self.base_url = base_url
+        if base_urls:
+            self.base_urls = [url.rstrip('/') for url in base_urls]
+        elif base_url:
+            self.base_urls = [base_url.rstrip('/')]
+        else:
+            self.base_urls = settings.get_comfyui_base_urls()
         self.executor_type = executor_type or COMFYUI_EXECUTOR_TYPE
-        self._executor = None
+        self._pool = None
+        self._runninghub_executor = None
+        # Single-flight: identical requests in progress share one execution
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Number of callers waiting for each shared execution
+        self._inflight_waiters: Dict[asyncio.Future, int] = {}
+        self._single_flight_stats = {
+            "executions": 0,
+            "coalesced": 0,
+            "bypassed": 0,
+        }
+        self._recovery_task: Optional[asyncio.Task] = None
+        self._closed = False
+    
+    def _create_executor(self, base_url: str):
+        """Create the executor instance of one local ComfyUI service"""
+        if self.executor_type == 'websocket':
+            return WebSocketExecutor(base_url)
+        elif self.executor_type == 'http':
+            return HttpExecutor(base_url)
+        else:
+            raise ValueError(f"Unsupported executor type: {self.executor_type}. Valid types: 'websocket', 'http'")
+    
+    def _get_pool(self) -> ComfyUIBackendPool:
+        """Get the pool of local ComfyUI backends"""
+        if self._pool is None:
+            self._pool = ComfyUIBackendPool(self.base_urls, self._create_executor)
+        return self._pool
         
     def _get_executor(self):
-        """Get the corresponding executor instance for local ComfyUI"""
-        if self._executor is None:
-            if self.executor_type == 'websocket':
-                self._executor = WebSocketExecutor(self.base_url)
-            elif self.executor_type == 'http':
-                self._executor = HttpExecutor(self.base_url)
-            else:
-                raise ValueError(f"Unsupported executor type: {self.executor_type}. Valid types: 'websocket', 'http'")
-        return self._executor
+        """Get the corresponding executor instance for local ComfyUI (the first backend)"""
+        return self._get_pool().backends[0].executor
+    
+    def _get_runninghub_executor(self) -> RunningHubExecutor:
+        """Get the RunningHub executor instance"""
+        if self._runninghub_executor is None:
+            self._runninghub_executor = RunningHubExecutor(self.base_url)
+        return self._runninghub_executor
+    
+    def _get_routing_hints(self, workflow_file: str, params: Dict[str, Any] = None) -> Tuple[Optional[str], FrozenSet[str]]:
+        """Get (workflow key, model file names) of a prompt for model-locality-aware routing"""
+        try:
+            compiled = workflow_template_cache.get(workflow_file)
+        except Exception:
+            # Let the executor report unreadable workflows
+            return None, frozenset()
+        return compiled.content_hash, compiled.get_model_names(params)
+    
+    @staticmethod
+    def _pin_workflow(workflow_file: str):
+        """Pin the compiled template of a local workflow for the rest of a call"""
+        if is_runninghub_workflow(workflow_file):
+            return contextlib.nullcontext()
+        return workflow_template_cache.pin(workflow_file)
+    
+    def _get_request_key(self, workflow_file: str, params: Dict[str, Any] = None) -> Optional[str]:
+        """Canonical hash of an execution request, None if identical requests may give different results
+        
+        RunningHub resolves seeds on its side, so its requests are never coalesced.
+        """
+        if is_runninghub_workflow(workflow_file):
+            return None
+        try:
+            compiled = workflow_template_cache.get(workflow_file)
+        except Exception:
+            return None
+        if compiled.has_random_seed(params):
+            return None
+        canonical = json.dumps(
+            {"workflow": os.path.abspath(workflow_file), "content_hash": compiled.content_hash, "params": params or {}},
+            sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str,
+        )
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
     
     async def execute_workflow(self, workflow_file: str, params: Dict[str, Any] = None) -> ExecuteResult:
         """
-        Execute workflow
+        Execute workflow, concurrent identical requests (no random seed) share one execution
         
         Args:
             workflow_file: Workflow file path
@@ -51,15 +142,187 @@ class ComfyUIClient:
         Returns:
             Execution result
         """
-        # Check if this is a RunningHub workflow by examining the file content
-        if is_runninghub_workflow(workflow_file):
-            # Use RunningHub executor for RunningHub workflows
-            runninghub_executor = RunningHubExecutor(self.base_url)
-            return await runninghub_executor.execute_workflow(workflow_file, params)
-        else:
-            # Use configured executor for local ComfyUI workflows
-            executor = self._get_executor()
-            return await executor.execute_workflow(workflow_file, params)
+        # The whole call uses the version of the workflow it started with
+        with self._pin_workflow(workflow_file):
+            request_key = self._get_request_key(workflow_file, params)
+            if request_key is None:
+                self._single_flight_stats["bypassed"] += 1
+                return await self._execute_workflow(workflow_file, params)
+        
+            execution = self._inflight.get(request_key)
+            if execution is not None:
+                self._single_flight_stats["coalesced"] += 1
+                logger.info(f"Identical request in progress, wait for its result: {workflow_file}")
+            else:
+                self._single_flight_stats["executions"] += 1
+                execution = asyncio.ensure_future(self._execute_workflow(workflow_file, params))
+                self._inflight[request_key] = execution
+                execution.add_done_callback(lambda _: self._inflight.pop(request_key, None))
+        
+            # A cancelled waiter must not cancel the execution shared with other waiters,
+            # the execution is only cancelled when its last waiter went away
+            self._inflight_waiters[execution] = self._inflight_waiters.get(execution, 0) + 1
+            try:
+                result = await asyncio.shield(execution)
+            except asyncio.CancelledError:
+                if self._inflight_waiters[execution] == 1 and not execution.done():
+                    logger.info(f"All waiters of the execution went away, cancel it: {workflow_file}")
+                    execution.cancel()
+                raise
+            finally:
+                self._inflight_waiters[execution] -= 1
+                if self._inflight_waiters[execution] == 0:
+                    del self._inflight_waiters[execution]
+            return result.model_copy(deep=True)
+    
+    async def _execute_workflow(self, workflow_file: str, params: Dict[str, Any] = None) -> ExecuteResult:
+        """Execute workflow on RunningHub or a local ComfyUI backend"""
+        run = await self.submit_workflow(workflow_file, params)
+        return await self.wait_for_result(run)
+    
+    async def submit_workflow(self, workflow_file: str, params: Dict[str, Any] = None) -> WorkflowRun:
+        """
+        Submit workflow without waiting for it
+        
+        Args:
+            workflow_file: Workflow file path
+            params: Workflow parameters
+            
+        Returns:
+            Submitted run, must be passed to `wait_for_result()`
+        """
+        # The version of the workflow when the submission started, also if its file is hot reloaded meanwhile
+        with self._pin_workflow(workflow_file):
+            # Check if this is a RunningHub workflow by examining the file content
+            if is_runninghub_workflow(workflow_file):
+                # Use RunningHub executor for RunningHub workflows
+                runninghub_executor = self._get_runninghub_executor()
+                submission = await runninghub_executor.submit_workflow(workflow_file, params)
+                run = WorkflowRun(executor=runninghub_executor, submission=submission)
+                await self._record_submission(run, RUNNINGHUB_BACKEND, params)
+                return run
+        
+            # Use configured executor of a ComfyUI backend for local workflows,
+            # preferring one that has the workflow's models loaded
+            pool = self._get_pool()
+            workflow_key, model_names = self._get_routing_hints(workflow_file, params)
+            backend = await pool.acquire(workflow_key, model_names)
+            try:
+                submission = await backend.executor.submit_workflow(workflow_file, params)
+            except BaseException:
+                pool.release(backend, submitted=False)
+                raise
+            if submission.prompt_id is None:
+                # Nothing was queued (error or cached result)
+                pool.release(backend, submitted=False)
+                return WorkflowRun(executor=backend.executor, submission=submission)
+            run = WorkflowRun(executor=backend.executor, submission=submission, backend=backend)
+            await self._record_submission(run, backend.base_url, params)
+            return run
+    
+    async def _record_submission(self, run: WorkflowRun, backend_name: str, params: Optional[Dict[str, Any]]):
+        """Record a queued prompt in the execution journal"""
+        submission = run.submission
+        if submission.prompt_id is None:
+            return
+        try:
+            run.journal_id = await execution_journal.record(
+                workflow_file=submission.workflow_file,
+                workflow_name=submission.workflow_name,
+                params=params,
+                graph_hash=submission.graph_hash,
+                backend=backend_name,
+                prompt_id=submission.prompt_id,
+                output_id_2_var=submission.output_id_2_var,
+                created_at=submission.created_at,
+            )
+        except asyncio.CancelledError:
+            # Nobody will wait for the queued prompt, stop it as a cancelled waiter would
+            if run.backend is not None:
+                self._get_pool().release(run.backend)
+                run.backend = None
+            await run.executor._cancel_abandoned(submission)
+            raise
+    
+    async def wait_for_result(self, run: WorkflowRun, timeout: Optional[float] = None) -> ExecuteResult:
+        """
+        Wait for a submitted workflow
+        
+        Args:
+            run: Run returned by `submit_workflow()`
+            timeout: Max seconds to wait, executor default if not set
+            
+        Returns:
+            Execution result
+        """
+        try:
+            result = await run.executor.wait_for_result(run.submission, timeout)
+        except asyncio.CancelledError:
+            # On shutdown the prompt is left running and re-attached on next start
+            if not self._closed:
+                await execution_journal.finish(run.journal_id, "cancelled")
+            raise
+        except Exception as e:
+            # Not re-attached on next start
+            await execution_journal.finish(run.journal_id, "error", ExecuteResult(status="error", prompt_id=run.submission.prompt_id, msg=str(e)))
+            raise
+        finally:
+            if run.backend is not None:
+                self._get_pool().release(run.backend)
+                run.backend = None
+        await execution_journal.finish(run.journal_id, result.status, result)
+        return result
+    
+    async def execute_batch(self, workflow_file: str, params_list: List[Dict[str, Any]]) -> List[ExecuteResult]:
+        """
+        Execute one workflow over many parameter sets
+        
+        Items are submitted in order, each one is waited for as soon as it is submitted, so
+        runs finishing free their backend slot or RunningHub task quota for the next items.
+        Identical items (no random seed) are executed once.
+        
+        Args:
+            workflow_file: Workflow file path
+            params_list: Parameter sets, one per item
+            
+        Returns:
+            Execution results, in the order of params_list
+        """
+        # All items use the version of the workflow the batch started with
+        with self._pin_workflow(workflow_file):
+            waits: Dict[int, asyncio.Future] = {}
+            first_index_of_key: Dict[str, int] = {}
+            same_as: Dict[int, int] = {}
+            try:
+                for index, params in enumerate(params_list):
+                    request_key = self._get_request_key(workflow_file, params)
+                    if request_key is not None and request_key in first_index_of_key:
+                        same_as[index] = first_index_of_key[request_key]
+                        continue
+                    if request_key is not None:
+                        first_index_of_key[request_key] = index
+                    run = await self.submit_workflow(workflow_file, params)
+                    waits[index] = asyncio.ensure_future(self.wait_for_result(run))
+                logger.info(f"Batch submitted: {len(waits)} executions for {len(params_list)} items of {workflow_file}")
+            
+                outcomes = await asyncio.gather(*waits.values(), return_exceptions=True)
+            except BaseException:
+                # Stop the runs nobody will wait for, their waiters release backends and task slots
+                for wait in waits.values():
+                    wait.cancel()
+                if waits:
+                    await asyncio.wait(waits.values())
+                raise
+        
+            results: Dict[int, ExecuteResult] = {}
+            for index, outcome in zip(waits.keys(), outcomes):
+                if isinstance(outcome, BaseException):
+                    logger.error(f"Batch item {index} failed: {outcome}")
+                    outcome = ExecuteResult(status="error", msg=str(outcome))
+                results[index] = outcome
+            for index, source_index in same_as.items():
+                results[index] = results[source_index].model_copy(deep=True)
+            return [results[index] for index in range(len(params_list))]
     
     
     def get_workflow_metadata(self, workflow_file: str):
@@ -74,6 +337,140 @@ class ComfyUIClient:
         """
         executor = self._get_executor()
         return executor.get_workflow_metadata(workflow_file)
+    
+    def start_recovery(self) -> asyncio.Task:
+        """Re-attach to unfinished executions of the journal in background"""
+        if self._recovery_task is None or self._recovery_task.done():
+            self._recovery_task = asyncio.create_task(self.recover_executions())
+        return self._recovery_task
+    
+    async def recover_executions(self) -> Dict[str, int]:
+        """
+        Re-attach to prompts submitted by a previous process that never received their result
+        
+        Finished outputs are collected (and deterministic results cached) instead of being recomputed:
+        the next request with an identical graph (no randomized seed) gets them, and they can be
+        looked up by prompt_id (`get_recorded_result`).
+        
+        Returns:
+            Number of re-attached executions per final status
+        """
+        await execution_journal.prune()
+        entries = await execution_journal.get_unfinished()
+        if not entries:
+            return {}
+        
+        logger.info(f"Re-attaching to {len(entries)} unfinished executions from the journal")
+        statuses: Dict[str, int] = {}
+        for status in await asyncio.gather(*(self._recover_execution(entry) for entry in entries)):
+            statuses[status] = statuses.get(status, 0) + 1
+        logger.info(f"Re-attached executions finished: {statuses}")
+        return statuses
+    
+    async def _recover_execution(self, entry: JournalEntry) -> str:
+        """Wait for one unfinished journal entry and record its result"""
+        executor = None
+        if entry.backend == RUNNINGHUB_BACKEND:
+            try:
+                executor = self._get_runninghub_executor()
+            except Exception as e:
+                logger.warning(f"RunningHub is not available: {e}")
+        else:
+            executor = next((backend.executor for backend in self._get_pool().backends if backend.base_url == entry.backend), None)
+        if executor is None:
+            logger.warning(f"Backend {entry.backend} of prompt {entry.prompt_id} is no longer configured, give it up")
+            await execution_journal.finish(entry.id, LOST)
+            return LOST
+        
+        submission = PromptSubmission(
+            workflow_file=entry.workflow_file,
+            workflow_name=entry.workflow_name,
+            prompt_id=entry.prompt_id,
+            output_id_2_var=entry.output_id_2_var,
+            graph_hash=entry.graph_hash,
+            created_at=entry.created_at,
+        )
+        timeout = None
+        if execution_journal.max_age > 0:
+            timeout = max(1.0, execution_journal.max_age - (time.time() - entry.created_at))
+        result = await executor.reattach(submission, timeout)
+        # Completed outputs wait in the journal for the retry of a deterministic graph or a lookup by prompt_id
+        await execution_journal.finish(entry.id, RECOVERED if result.status == "completed" else result.status, result)
+        logger.info(f"Re-attached prompt {entry.prompt_id} ({entry.workflow_name}) finished: {result.status}")
+        return result.status
+    
+    async def get_recorded_result(self, prompt_id: str) -> Optional[Tuple[str, Optional[ExecuteResult]]]:
+        """
+        Get the state and result of a submitted prompt from the execution journal, also across restarts
+        
+        Args:
+            prompt_id: Prompt id (or RunningHub task id) of the submission
+            
+        Returns:
+            (state, result), state is "submitted" while it runs (or is being re-attached); None if unknown
+        """
+        return await execution_journal.get_by_prompt_id(prompt_id)
+    
+    async def close(self):
+        """Close pooled sessions of all created executors, prompts in progress are left running"""
+        self._closed = True
+        if self._pool is not None:
+            await self._pool.close()
+        if self._runninghub_executor is not None:
+            await self._runninghub_executor.close()
+        if self._recovery_task is not None and not self._recovery_task.done():
+            self._recovery_task.cancel()
+    
+    def get_pool_stats(self) -> List[Dict[str, Any]]:
+        """
+        Get connection pool statistics of all created executors
+        
+        Returns:
+            List of pool statistics, one item per executor
+        """
+        stats = []
+        if self._pool is not None:
+            for backend in self._pool.backends:
+                stats.append({"executor": "comfyui", **backend.executor.get_pool_stats()})
+        if self._runninghub_executor is not None:
+            stats.append({"executor": "runninghub", **self._runninghub_executor.get_pool_stats()})
+        return stats
+    
+    def get_backend_stats(self) -> List[Dict[str, Any]]:
+        """
+        Get routing statistics of local ComfyUI backends
+        
+        Returns:
+            List of backend statistics (health, load, routed prompts)
+        """
+        if self._pool is None:
+            return []
+        return self._pool.get_stats()
+    
+    def get_affinity_stats(self) -> Dict[str, Any]:
+        """
+        Get model-locality routing statistics of local ComfyUI backends
+        
+        Returns:
+            Affinity hits, saturated fallbacks, cold routings and the hit rate
+        """
+        if self._pool is None:
+            return {}
+        return self._pool.get_affinity_stats()
+    
+    def get_single_flight_stats(self) -> Dict[str, int]:
+        """
+        Get single-flight statistics
+        
+        Returns:
+            Executions started, requests coalesced into an execution in progress,
+            requests bypassing single-flight (random seed or RunningHub) and executions in progress
+        """
+        return {**self._single_flight_stats, "inflight": len(self._inflight)}
+    
+    async def get_journal_stats(self) -> Dict[str, Any]:
+        """Get execution journal statistics"""
+        return await execution_journal.get_stats()
 
 
 # Create default client instance
@@ -95,6 +492,20 @@ async def execute_workflow(workflow_file: str, params: Dict[str, Any] = None) ->
     return await default_client.execute_workflow(workflow_file, params)
 
 
+async def execute_workflow_batch(workflow_file: str, params_list: List[Dict[str, Any]]) -> List[ExecuteResult]:
+    """
+    Convenient function to execute one workflow over many parameter sets
+    
+    Args:
+        workflow_file: Workflow file path
+        params_list: Parameter sets, one per item
+        
+    Returns:
+        Execution results, in the order of params_list
+    """
+    return await default_client.execute_batch(workflow_file, params_list)
+
+
 def get_workflow_metadata(workflow_file: str):
     """
     Convenient function to get workflow metadata
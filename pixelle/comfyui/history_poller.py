@@ -0,0 +1,230 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+Shared history poller of a ComfyUI backend
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+
+from pixelle.logger import logger
+
+if TYPE_CHECKING:
+    from pixelle.comfyui.base_executor import ComfyUIExecutor
+
+# First poll right after submit, then back off while the prompt is queued
+MIN_POLL_INTERVAL = 0.25
+MAX_POLL_INTERVAL = 5.0
+POLL_BACKOFF_FACTOR = 1.5
+# Poll interval while the prompt is running
+RUNNING_POLL_INTERVAL = 1.0
+# Min number of entries requested from /history in a batched call
+MIN_HISTORY_BATCH = 64
+
+
+@dataclass
+class _WatchedPrompt:
+    future: asyncio.Future
+    next_poll: float
+    interval: float = MIN_POLL_INTERVAL
+
+
+class HistoryPoller:
+    """Track all outstanding prompts of one backend with a single polling loop
+
+    Each tick issues one `/queue` call for every due prompt. Prompts that left the
+    queue are looked up with one `/history` call (falling back to `/history/{prompt_id}`
+    for entries outside the requested window) and their futures are resolved with the
+    history entry.
+    """
+
+    def __init__(self, executor: "ComfyUIExecutor"):
+        self.executor = executor
+        self.queue_remaining: Optional[int] = None
+        self.stats: Dict[str, int] = {
+            "ticks": 0,
+            "queue_requests": 0,
+            "history_requests": 0,
+            "resolved_prompts": 0,
+            "poll_errors": 0,
+        }
+        self._watched: Dict[str, _WatchedPrompt] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def watch(self, prompt_id: str) -> asyncio.Future:
+        """Start tracking a submitted prompt
+
+        Returns:
+            Future resolved with the `/history` entry of the prompt when it is finished
+        """
+        loop = asyncio.get_running_loop()
+        watched = self._watched.get(prompt_id)
+        if watched is None or watched.future.done():
+            watched = _WatchedPrompt(future=loop.create_future(), next_poll=loop.time() + MIN_POLL_INTERVAL)
+            self._watched[prompt_id] = watched
+
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        else:
+            self._wakeup.set()
+        return watched.future
+
+    def unwatch(self, prompt_id: str):
+        """Stop tracking a prompt"""
+        watched = self._watched.pop(prompt_id, None)
+        if watched is not None and not watched.future.done():
+            watched.future.cancel()
+
+    async def lookup(self, prompt_id: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """One-off check of a prompt
+
+        Returns:
+            ("finished", history entry), ("queued", None), or ("unknown", None)
+            if the backend knows nothing about it
+        """
+        histories = await self._fetch_histories([prompt_id])
+        if prompt_id in histories:
+            return "finished", histories[prompt_id]
+        running, pending = await self._fetch_queue()
+        if prompt_id in running or prompt_id in pending:
+            return "queued", None
+        # It may have finished between the two requests
+        histories = await self._fetch_histories([prompt_id])
+        if prompt_id in histories:
+            return "finished", histories[prompt_id]
+        return "unknown", None
+
+    async def close(self):
+        for prompt_id in list(self._watched.keys()):
+            self.unwatch(prompt_id)
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "watched_prompts": len(self._watched),
+            "queue_remaining": self.queue_remaining,
+            **self.stats,
+        }
+
+    async def _run(self):
+        """Polling loop, exits when no prompt is watched"""
+        loop = asyncio.get_running_loop()
+        while True:
+            # Drop prompts whose waiters went away (e.g. timeout)
+            for prompt_id in [pid for pid, w in self._watched.items() if w.future.done()]:
+                self._watched.pop(prompt_id, None)
+            if not self._watched:
+                break
+
+            next_poll = min(w.next_poll for w in self._watched.values())
+            delay = next_poll - loop.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            now = loop.time()
+            due = [pid for pid, w in self._watched.items() if w.next_poll <= now]
+            try:
+                await self._tick(due)
+            except Exception as e:
+                self.stats["poll_errors"] += 1
+                logger.warning(f"Poll history of {self.executor.base_url} failed: {e}")
+                for prompt_id in due:
+                    self._reschedule(prompt_id, max(RUNNING_POLL_INTERVAL, self._interval_of(prompt_id)))
+
+    def _interval_of(self, prompt_id: str) -> float:
+        watched = self._watched.get(prompt_id)
+        return watched.interval if watched else MIN_POLL_INTERVAL
+
+    def _reschedule(self, prompt_id: str, interval: float):
+        watched = self._watched.get(prompt_id)
+        if watched is not None:
+            watched.interval = interval
+            watched.next_poll = asyncio.get_running_loop().time() + interval
+
+    async def _tick(self, due: List[str]):
+        self.stats["ticks"] += 1
+        running, pending = await self._fetch_queue()
+
+        finished = []
+        for prompt_id in due:
+            if prompt_id in pending:
+                # Still queued: back off
+                self._reschedule(prompt_id, min(self._interval_of(prompt_id) * POLL_BACKOFF_FACTOR, MAX_POLL_INTERVAL))
+            elif prompt_id in running:
+                self.executor._mark_running(prompt_id)
+                self._reschedule(prompt_id, RUNNING_POLL_INTERVAL)
+            else:
+                finished.append(prompt_id)
+
+        if not finished:
+            return
+
+        histories = await self._fetch_histories(finished)
+        for prompt_id in finished:
+            prompt_history = histories.get(prompt_id)
+            watched = self._watched.get(prompt_id)
+            if watched is None:
+                continue
+            if prompt_history is None:
+                # Not in the queue nor in the history yet, retry soon
+                self._reschedule(prompt_id, RUNNING_POLL_INTERVAL)
+                continue
+            self._watched.pop(prompt_id, None)
+            if not watched.future.done():
+                watched.future.set_result(prompt_history)
+                self.stats["resolved_prompts"] += 1
+
+    async def _fetch_queue(self) -> tuple[Set[str], Set[str]]:
+        """Get (running, pending) prompt_ids from /queue"""
+        self.stats["queue_requests"] += 1
+        async with self.executor.get_comfyui_session() as session:
+            async with session.get(f"{self.executor.base_url}/queue") as response:
+                if response.status != 200:
+                    raise Exception(f"Get queue failed: HTTP {response.status}")
+                queue_data = await response.json()
+
+        # Queue items are [number, prompt_id, prompt, extra_data, outputs_to_execute]
+        running = {item[1] for item in queue_data.get("queue_running", []) if len(item) > 1}
+        pending = {item[1] for item in queue_data.get("queue_pending", []) if len(item) > 1}
+        self.queue_remaining = len(running) + len(pending)
+        return running, pending
+
+    async def _fetch_histories(self, prompt_ids: List[str]) -> Dict[str, Any]:
+        """Get history entries of finished prompts with as few requests as possible"""
+        histories: Dict[str, Any] = {}
+        async with self.executor.get_comfyui_session() as session:
+            if len(prompt_ids) > 1:
+                max_items = max(MIN_HISTORY_BATCH, len(prompt_ids) * 4)
+                self.stats["history_requests"] += 1
+                async with session.get(f"{self.executor.base_url}/history", params={"max_items": str(max_items)}) as response:
+                    if response.status == 200:
+                        history_data = await response.json()
+                        histories.update({pid: history_data[pid] for pid in prompt_ids if pid in history_data})
+
+            # Fall back to single lookups for entries outside the batched window
+            for prompt_id in prompt_ids:
+                if prompt_id in histories:
+                    continue
+                self.stats["history_requests"] += 1
+                async with session.get(f"{self.executor.base_url}/history/{prompt_id}") as response:
+                    if response.status != 200:
+                        continue
+                    history_data = await response.json()
+                    if prompt_id in history_data:
+                        histories[prompt_id] = history_data[prompt_id]
+        return histories
@@ -1,23 +1,19 @@
 # Copyright (C) 2025 AIDC-AI
 # This project is licensed under the MIT License (SPDX-License-identifier: MIT).
 
-import os
 import json
 import time
 import uuid
 import asyncio
 from typing import Optional, Dict, Any
 
-from pixelle.comfyui.base_executor import ComfyUIExecutor, COMFYUI_API_KEY, logger
+from pixelle.comfyui.base_executor import ComfyUIExecutor, PromptSubmission, logger
 from pixelle.comfyui.models import ExecuteResult
 
 
 class HttpExecutor(ComfyUIExecutor):
     """HTTP executor for ComfyUI"""
     
-    def __init__(self, base_url: str = None):
-        super().__init__(base_url)
-
     async def _queue_prompt(self, workflow: Dict[str, Any], client_id: str, prompt_ext_params: Optional[Dict[str, Any]] = None) -> str:
         """Submit workflow to queue"""
         prompt_data = {
@@ -50,6 +46,12 @@ class HttpExecutor(ComfyUIExecutor):
                 logger.info(f"Task submitted: {prompt_id}")
                 return prompt_id
 
+    def get_live_queue_remaining(self) -> Optional[int]:
+        # Only fresh while the poller is tracking prompts
+        if self._history_poller is not None and self._history_poller.get_stats()["watched_prompts"]:
+            return self._history_poller.queue_remaining
+        return None
+
     async def _wait_for_results(self, prompt_id: str, client_id: str, timeout: Optional[int] = None, output_id_2_var: Optional[Dict[str, str]] = None) -> ExecuteResult:
         """Wait for workflow execution result (HTTP way)"""
         start_time = time.time()
@@ -59,161 +61,73 @@ class HttpExecutor(ComfyUIExecutor):
             prompt_id=prompt_id
         )
 
-        # Get base URL
-        base_url = self.base_url
-
-        while True:
-            # Check timeout
-            if timeout is not None and timeout > 0:
-                duration = time.time() - start_time
-                if duration > timeout:
-                    logger.warning(f"Timeout: {duration} seconds")
-                    result.status = "timeout"
-                    result.duration = duration
-                    return result
-
-            # Use HTTP API to get history
-            history_url = f"{self.base_url}/history/{prompt_id}"
-            async with self.get_comfyui_session() as session:
-                async with session.get(history_url) as response:
-                    if response.status != 200:
-                        await asyncio.sleep(1.0)
-                        continue
-                    history_data = await response.json()
-                    if prompt_id not in history_data:
-                        await asyncio.sleep(1.0)
-                        continue
-                    
-                    prompt_history = history_data[prompt_id]
-                    status = prompt_history.get("status")
-                    if status and status.get("status_str") == "error":
-                        result.status = "error"
-                        messages = status.get("messages")
-                        if messages:
-                            errors = [
-                                body.get("exception_message")
-                                for type, body in messages
-                                if type == "execution_error"
-                            ]
-                            error_message = "\n".join(errors)
-                        else:
-                            error_message = "Unknown error"
-                        result.msg = error_message
-                        result.duration = time.time() - start_time
-                        return result
-                    
-                    if "outputs" in prompt_history:
-                        result.outputs = prompt_history["outputs"]
-                        result.status = "completed"
-
-                        # Collect all images, videos, audios and texts outputs by file extension
-                        output_id_2_images = {}
-                        output_id_2_videos = {}
-                        output_id_2_audios = {}
-                        output_id_2_texts = {}
-                        
-                        for node_id, node_output in prompt_history["outputs"].items():
-                            images, videos, audios = self._split_media_by_suffix(node_output, base_url)
-                            if images:
-                                output_id_2_images[node_id] = images
-                            if videos:
-                                output_id_2_videos[node_id] = videos
-                            if audios:
-                                output_id_2_audios[node_id] = audios
-                            
-                            # Collect text outputs
-                            if "text" in node_output:
-                                texts = node_output["text"]
-                                if isinstance(texts, str):
-                                    texts = [texts]
-                                elif not isinstance(texts, list):
-                                    texts = [str(texts)]
-                                output_id_2_texts[node_id] = texts
-
-                        # If there is a mapping, map by variable name
-                        if output_id_2_images:
-                            result.images_by_var = self._map_outputs_by_var(output_id_2_var or {}, output_id_2_images)
-                            result.images = self._extend_flat_list_from_dict(result.images_by_var)
-
-                        if output_id_2_videos:
-                            result.videos_by_var = self._map_outputs_by_var(output_id_2_var or {}, output_id_2_videos)
-                            result.videos = self._extend_flat_list_from_dict(result.videos_by_var)
-
-                        if output_id_2_audios:
-                            result.audios_by_var = self._map_outputs_by_var(output_id_2_var or {}, output_id_2_audios)
-                            result.audios = self._extend_flat_list_from_dict(result.audios_by_var)
-
-                        # Process texts/texts_by_var
-                        if output_id_2_texts:
-                            result.texts_by_var = self._map_outputs_by_var(output_id_2_var or {}, output_id_2_texts)
-                            result.texts = self._extend_flat_list_from_dict(result.texts_by_var)
+        # The shared poller checks all outstanding prompts of this backend in one request per tick
+        poller = self._get_history_poller()
+        try:
+            prompt_history = await asyncio.wait_for(
+                poller.watch(prompt_id),
+                timeout=timeout if timeout is not None and timeout > 0 else None
+            )
+        except asyncio.TimeoutError:
+            duration = time.time() - start_time
+            logger.warning(f"Timeout: {duration} seconds")
+            result.status = "timeout"
+            result.duration = duration
+            return result
+        finally:
+            poller.unwatch(prompt_id)
 
-                        # Set execution duration
-                        result.duration = time.time() - start_time
-                        return result
-            await asyncio.sleep(1.0)
+        result = self._build_result_from_history(prompt_id, prompt_history, output_id_2_var)
+        # Set execution duration
+        result.duration = time.time() - start_time
+        return result
 
-    async def execute_workflow(self, workflow_file: str, params: Dict[str, Any] = None) -> ExecuteResult:
-        """Execute workflow (HTTP way)"""
+    async def submit_workflow(self, workflow_file: str, params: Dict[str, Any] = None) -> PromptSubmission:
+        """Submit workflow to the ComfyUI queue (HTTP way)"""
         try:
-            if not os.path.exists(workflow_file):
-                logger.error(f"Workflow file does not exist: {workflow_file}")
-                return ExecuteResult(status="error", msg=f"Workflow file does not exist: {workflow_file}")
-            
-            # Get workflow metadata
-            metadata = self.get_workflow_metadata(workflow_file)
-            if not metadata:
-                return ExecuteResult(status="error", msg="Cannot parse workflow metadata")
-            
-            # Load workflow JSON
-            with open(workflow_file, 'r', encoding='utf-8') as f:
-                workflow_data = json.load(f)
-            
-            if not workflow_data:
-                return ExecuteResult(status="error", msg="Workflow data is missing")
-            
-            # Use new parameter mapping logic
-            if params:
-                workflow_data = await self._apply_params_to_workflow(workflow_data, metadata, params)
-            else:
-                # Even if no parameters are passed, default values need to be applied
-                workflow_data = await self._apply_params_to_workflow(workflow_data, metadata, {})
-            
-            # Replace any seed == 0 with a random 63-bit seed before submission
-            workflow_data, _ = self._randomize_seed_in_workflow(workflow_data)
-            
-            # Extract output node information from metadata
-            output_id_2_var = self._extract_output_nodes(metadata)
+            workflow_data, submission = await self._prepare_prompt(workflow_file, params)
+            if workflow_data is None:
+                return submission
             
             # Generate client ID
             client_id = str(uuid.uuid4())
-            
-            # Prepare extra parameters
-            prompt_ext_params = {}
-            if COMFYUI_API_KEY:
-                prompt_ext_params = {
-                    "extra_data": {
-                        "api_key_comfy_org": COMFYUI_API_KEY
-                    }
-                }
-            else:
-                logger.warning("COMFYUI_API_KEY is not set")
+            submission.context["client_id"] = client_id
             
             # Submit workflow to ComfyUI queue
             try:
-                prompt_id = await self._queue_prompt(workflow_data, client_id, prompt_ext_params)
+                submission.prompt_id = await self._queue_prompt(workflow_data, client_id, self._get_prompt_ext_params())
             except Exception as e:
                 error_message = f"Submit workflow failed: [{type(e)}] {str(e)}"
                 logger.error(error_message)
-                return ExecuteResult(status="error", msg=error_message)
+                submission.result = ExecuteResult(status="error", msg=error_message)
+            return submission
             
+        except Exception as e:
+            logger.error(f"Execute workflow failed: {str(e)}", exc_info=True)
+            return PromptSubmission(workflow_file=workflow_file, result=ExecuteResult(status="error", msg=str(e)))
+    
+    async def wait_for_result(self, submission: PromptSubmission, timeout: Optional[float] = None) -> ExecuteResult:
+        """Wait for a submitted workflow and transfer its result files (HTTP way)"""
+        if submission.result is not None:
+            return submission.result
+        try:
             # Wait for result
-            result = await self._wait_for_results(prompt_id, client_id, None, output_id_2_var)
+            result = await self._wait_for_results(
+                submission.prompt_id, submission.context.get("client_id"), timeout, submission.output_id_2_var
+            )
+            self._record_execution(submission, result.status == "completed")
             
             # Transfer result files
             result = await self.transfer_result_files(result)
+            self._cache_result(submission, result)
             return result
             
+        except asyncio.CancelledError:
+            # Nobody waits for the result anymore, stop burning GPU time on it
+            await self._cancel_abandoned(submission)
+            raise
         except Exception as e:
             logger.error(f"Execute workflow failed: {str(e)}", exc_info=True)
-            return ExecuteResult(status="error", msg=str(e)) 
\ No newline at end of file
+            return ExecuteResult(status="error", prompt_id=submission.prompt_id, msg=str(e))
+        finally:
+            self._prompt_started_at.pop(submission.prompt_id, None)
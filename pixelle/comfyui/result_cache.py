@@ -0,0 +1,101 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+Result cache of deterministic workflow executions
+"""
+
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from pixelle.logger import logger
+from pixelle.comfyui.models import ExecuteResult
+from pixelle.settings import settings
+
+RESULT_CACHE_TTL = settings.result_cache_ttl
+RESULT_CACHE_MAX_ENTRIES = settings.result_cache_max_entries
+
+
+def hash_workflow_graph(workflow_data: Dict[str, Any]) -> str:
+    """Canonical hash of a patched workflow graph (key order and whitespace independent)"""
+    canonical = json.dumps(workflow_data, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class _CachedResult:
+    result: ExecuteResult
+    expires_at: float
+
+
+class ExecutionResultCache:
+    """Map the hash of a patched workflow graph to its transferred execution result
+
+    Only completed results are stored, with TTL and LRU eviction. Executions whose
+    seeds were randomized are never looked up nor stored.
+    """
+
+    def __init__(self, ttl: float = RESULT_CACHE_TTL, max_entries: int = RESULT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _CachedResult]" = OrderedDict()
+        self._workflow_stats: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def _count(self, workflow_name: str, key: str):
+        stats = self._workflow_stats.setdefault(workflow_name, {"hits": 0, "misses": 0, "skipped": 0})
+        stats[key] += 1
+
+    def get(self, graph_hash: str, workflow_name: str) -> Optional[ExecuteResult]:
+        """Get the cached result of a graph, None on miss"""
+        if not self.enabled:
+            return None
+        entry = self._entries.get(graph_hash)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            self._entries.pop(graph_hash, None)
+            entry = None
+        if entry is None:
+            self._count(workflow_name, "misses")
+            return None
+
+        self._entries.move_to_end(graph_hash)
+        self._count(workflow_name, "hits")
+        logger.info(f"Execution result cache hit: {workflow_name} ({graph_hash[:12]})")
+        return entry.result.model_copy(deep=True)
+
+    def put(self, graph_hash: str, result: ExecuteResult, workflow_name: str):
+        """Store a completed result"""
+        if not self.enabled or result.status != "completed":
+            return
+        self._entries[graph_hash] = _CachedResult(
+            result=result.model_copy(deep=True),
+            expires_at=time.monotonic() + self.ttl,
+        )
+        self._entries.move_to_end(graph_hash)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def skip(self, workflow_name: str):
+        """Record an execution that can't be cached (seed randomized)"""
+        if self.enabled:
+            self._count(workflow_name, "skipped")
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "workflows": {name: dict(stats) for name, stats in self._workflow_stats.items()},
+        }
+
+
+# Global execution result cache, results are backend independent once transferred
+execution_result_cache = ExecutionResultCache()
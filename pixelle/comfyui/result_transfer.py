@@ -0,0 +1,120 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+Concurrent, streaming transfer of result files from ComfyUI to the storage backend
+"""
+
+import os
+import time
+import uuid
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, TYPE_CHECKING
+from urllib.parse import urlparse, parse_qs
+
+from pixelle.logger import logger
+from pixelle.settings import settings
+from pixelle.utils.file_uploader import upload_stream
+from pixelle.utils.file_util import get_ext_from_content_type
+
+if TYPE_CHECKING:
+    from pixelle.comfyui.base_executor import ComfyUIExecutor
+
+TRANSFER_CONCURRENCY = settings.comfyui_transfer_concurrency
+TRANSFER_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class TransferTiming:
+    """Timing of one transferred file"""
+    url: str
+    new_url: str
+    size: int
+    seconds: float
+
+
+def _guess_filename(url: str, content_type: str) -> str:
+    """File name of a result URL, `/view?filename=...` first, then URL path, then Content-Type"""
+    parsed_url = urlparse(url)
+    filename = parse_qs(parsed_url.query).get("filename", [""])[0]
+    if not filename:
+        filename = os.path.basename(parsed_url.path)
+    if os.path.splitext(filename)[1]:
+        return os.path.basename(filename)
+    return f"{uuid.uuid4().hex}{get_ext_from_content_type(content_type) or '.tmp'}"
+
+
+class ResultTransferPipeline:
+    """Relay result files of one execution to the storage backend
+
+    Each URL is transferred once, at most `concurrency` files at a time. The `/view`
+    response body is streamed straight into the storage backend, no temporary files.
+    """
+
+    def __init__(self, executor: "ComfyUIExecutor", concurrency: int = TRANSFER_CONCURRENCY):
+        self.executor = executor
+        self.timings: List[TransferTiming] = []
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(self, url: str) -> asyncio.Task:
+        """Start transferring a URL in background, a URL already submitted is not transferred again"""
+        task = self._tasks.get(url)
+        if task is None:
+            task = asyncio.create_task(self._transfer(url))
+            # Failures are raised by `transfer()`, don't warn about tasks nobody waited for
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._tasks[url] = task
+        return task
+
+    async def transfer(self, urls: Iterable[str]) -> Dict[str, str]:
+        """Transfer URLs (if not submitted yet) and wait for them
+
+        Returns:
+            Mapping of original URL to new URL
+        """
+        tasks = {url: self.submit(url) for url in urls}
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            self.cancel()
+            raise
+        return {url: task.result() for url, task in tasks.items()}
+
+    def cancel(self):
+        """Cancel pending transfers"""
+        for task in self._tasks.values():
+            if not task.done():
+                task.cancel()
+
+    async def _transfer(self, url: str) -> str:
+        async with self._semaphore:
+            start_time = time.perf_counter()
+            size = 0
+            async with self.executor.get_comfyui_session() as session:
+                async with session.get(url) as response:
+                    if response.status != 200:
+                        raise Exception(f"Download result file failed: HTTP {response.status} ({url})")
+                    filename = _guess_filename(url, response.headers.get("Content-Type", ""))
+
+                    async def relay_chunks():
+                        nonlocal size
+                        async for chunk in response.content.iter_chunked(TRANSFER_CHUNK_SIZE):
+                            size += len(chunk)
+                            yield chunk
+
+                    new_url = await upload_stream(relay_chunks(), filename)
+
+            timing = TransferTiming(url=url, new_url=new_url, size=size, seconds=time.perf_counter() - start_time)
+            self.timings.append(timing)
+            self.executor._record_transfer(timing)
+            logger.info(f"Transferred result file {filename} ({size} bytes) in {timing.seconds * 1000:.0f} ms: {new_url}")
+            return new_url
+
+    def summary(self) -> Optional[str]:
+        if not self.timings:
+            return None
+        total_size = sum(timing.size for timing in self.timings)
+        slowest = max(timing.seconds for timing in self.timings)
+        return f"{len(self.timings)} files, {total_size} bytes, slowest {slowest * 1000:.0f} ms"
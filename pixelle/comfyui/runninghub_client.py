@@ -2,18 +2,83 @@
 # This project is licensed under the MIT License (SPDX-License-identifier: MIT).
 
 import json
+import time
 import tempfile
-from typing import Optional, Dict, Any, List, Literal
+from typing import Optional, Dict, Any, List, Literal, Set
 from pathlib import Path
 import aiohttp
 import asyncio
 
 from pixelle.logger import logger
 from pixelle.settings import settings
+from pixelle.utils.network_util import release_stale_session
+
+RUNNINGHUB_POOL_LIMIT = settings.runninghub_pool_limit
+RUNNINGHUB_RATE_LIMIT = settings.runninghub_rate_limit
+RUNNINGHUB_MAX_CONCURRENT_TASKS = settings.runninghub_max_concurrent_tasks
+
+# Answer codes: too many requests, and account task queue full
+RATE_LIMITED_CODE = 429
+QUEUE_MAXED_CODE = 421
+# Rate-limited requests are retried (without counting as a failed attempt) at most this many times
+RATE_LIMIT_MAX_RETRIES = 8
+# Seconds to wait before creating a task again when the account queue is full
+QUEUE_RETRY_INTERVAL = 5.0
+
+
+class RunningHubAPIError(Exception):
+    """RunningHub answered with `code != 0`"""
+    
+    def __init__(self, code: Any, msg: str):
+        super().__init__(f"RunningHub API error: {msg}")
+        self.code = code
+        self.msg = msg
+
+
+class RateLimiter:
+    """Token bucket shared by all requests of a client, `rate` requests per second
+    
+    Can also be paused, e.g. when RunningHub answers that requests are too frequent.
+    Based on monotonic time only, so it works across event loops.
+    """
+    
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+    
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+    
+    async def acquire(self) -> float:
+        """Wait for a token, return the seconds waited"""
+        waited = 0.0
+        while True:
+            now = time.monotonic()
+            delay = self.paused_until - now
+            if delay <= 0 and self.rate > 0:
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            elif delay <= 0:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
 
 
 class RunningHubClient:
-    """RunningHub API client for workflow and file operations"""
+    """RunningHub API client for workflow and file operations
+    
+    Requests share one pooled session and a client-side rate limiter. Tasks are created
+    within the concurrent-task quota of the account: above it, `create_task` waits locally
+    until a task held by this client finishes. A slot is given back when a status query sees
+    the task finished or failed, when the task is cancelled, or with `release_task`.
+    """
     
     def __init__(self, api_key: str = None, base_url: str = None):
         self.api_key = api_key or settings.runninghub_api_key
@@ -23,14 +88,75 @@ class RunningHubClient:
         
         if not self.api_key:
             raise ValueError("RunningHub API key is required")
+        
+        # Pooled session, bound to the event loop it was created in
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._rate_limiter = RateLimiter(RUNNINGHUB_RATE_LIMIT)
+        
+        # Concurrent-task quota, created lazily in the loop creating tasks
+        self.max_concurrent_tasks = RUNNINGHUB_MAX_CONCURRENT_TASKS
+        self._task_slots: Optional[asyncio.Semaphore] = None
+        self._task_slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slot_task_ids: Set[str] = set()
+        self._tasks_creating = 0
+        
+        # Per endpoint: requests, errors, rate-limited answers and latency
+        self._endpoint_stats: Dict[str, Dict[str, float]] = {}
+        self._queue_stats: Dict[str, float] = {
+            "queue_full": 0,
+            "waited_seconds": 0.0,
+        }
     
-    async def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None, 
-                          files: Optional[Dict] = None, timeout: Optional[int] = None) -> Dict[str, Any]:
-        """Make HTTP request to RunningHub API with retry logic"""
-        url = f"{self.base_url}{endpoint}"
+    def _get_session(self) -> Optional[aiohttp.ClientSession]:
+        """Get the pooled session, None when called from another event loop than the one owning it
+        
+        Metadata may be fetched from a worker thread running its own loop, such calls use
+        a one-off session.
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed and not self._session_loop.is_closed():
+            return self._session if self._session_loop is loop else None
+        # The previous session belongs to a closed loop (e.g. an earlier `asyncio.run`)
+        release_stale_session(self._session, self._session_loop)
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=RUNNINGHUB_POOL_LIMIT, limit_per_host=RUNNINGHUB_POOL_LIMIT),
+        )
+        self._session_loop = loop
+        logger.info(f"Created pooled RunningHub session for {self.base_url} (limit={RUNNINGHUB_POOL_LIMIT})")
+        return self._session
+    
+    async def close(self):
+        """Close the pooled session"""
+        session = self._session
+        self._session = None
+        if session is not None and not session.closed:
+            await session.close()
+    
+    def _record_request(self, endpoint: str, seconds: float, error: bool = False, rate_limited: bool = False):
+        stats = self._endpoint_stats.setdefault(endpoint, {
+            "requests": 0, "errors": 0, "rate_limited": 0, "seconds": 0.0, "max_seconds": 0.0,
+        })
+        stats["requests"] += 1
+        stats["errors"] += int(error)
+        stats["rate_limited"] += int(rate_limited)
+        stats["seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+    
+    @staticmethod
+    def _get_retry_after(response: aiohttp.ClientResponse, default: float) -> float:
+        try:
+            return max(0.0, float(response.headers.get('Retry-After', default)))
+        except ValueError:
+            return default
+    
+    async def _send_request(self, session: aiohttp.ClientSession, method: str, url: str, endpoint: str,
+                            data: Optional[Dict], files: Optional[Dict], timeout: Optional[int],
+                            rate_limit_retries: int) -> Dict[str, Any]:
+        """Send one request, return the answer or raise RunningHubAPIError / Exception"""
         headers = {}
         
-        # Prepare request data
+        # Prepare request data, form data can't be sent twice so it is built for each attempt
         if files:
             # For file upload, don't set Content-Type (let aiohttp handle it)
             request_data = aiohttp.FormData()
@@ -44,32 +170,119 @@ class RunningHubClient:
             headers['Content-Type'] = 'application/json'
             request_data = json.dumps(data) if data else None
         
+        start = time.perf_counter()
+        try:
+            async with session.request(method, url, headers=headers, data=request_data,
+                                       timeout=aiohttp.ClientTimeout(total=timeout or self.timeout)) as response:
+                if response.status == 429:
+                    self._rate_limiter.pause(self._get_retry_after(response, min(2 ** rate_limit_retries, 30)))
+                    self._record_request(endpoint, time.perf_counter() - start, rate_limited=True)
+                    raise RunningHubAPIError(RATE_LIMITED_CODE, f"HTTP 429: {await response.text()}")
+                if response.status == 200:
+                    result = await response.json()
+                    if result.get('code') == 0:
+                        self._record_request(endpoint, time.perf_counter() - start)
+                        return result
+                    if result.get('code') == RATE_LIMITED_CODE:
+                        self._rate_limiter.pause(self._get_retry_after(response, min(2 ** rate_limit_retries, 30)))
+                        self._record_request(endpoint, time.perf_counter() - start, rate_limited=True)
+                    else:
+                        self._record_request(endpoint, time.perf_counter() - start, error=True)
+                    raise RunningHubAPIError(result.get('code'), result.get('msg', 'Unknown error'))
+                else:
+                    response_text = await response.text()
+                    self._record_request(endpoint, time.perf_counter() - start, error=True)
+                    raise Exception(f"HTTP {response.status}: {response_text}")
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            self._record_request(endpoint, time.perf_counter() - start, error=True)
+            raise
+    
+    async def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None, 
+                          files: Optional[Dict] = None, timeout: Optional[int] = None,
+                          retry_codes_excluded: tuple = ()) -> Dict[str, Any]:
+        """Make HTTP request to RunningHub API with rate limiting and retry logic
+        
+        Rate-limited answers pause all requests of this client and are retried without
+        counting as a failed attempt. Errors whose code is in `retry_codes_excluded` are
+        raised right away.
+        """
+        url = f"{self.base_url}{endpoint}"
+        
+        session = self._get_session()
+        one_off_session = None
+        if session is None:
+            one_off_session = session = aiohttp.ClientSession()
+        
         # Retry logic
         last_exception = None
-        for attempt in range(self.retry_count + 1):
-            try:
-                async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout or self.timeout)) as session:
-                    async with session.request(method, url, headers=headers, data=request_data) as response:
-                        if response.status == 200:
-                            result = await response.json()
-                            if result.get('code') == 0:
-                                return result
-                            else:
-                                raise Exception(f"RunningHub API error: {result.get('msg', 'Unknown error')}")
-                        else:
-                            response_text = await response.text()
-                            raise Exception(f"HTTP {response.status}: {response_text}")
-                            
-            except Exception as e:
-                last_exception = e
+        attempt = 0
+        rate_limit_retries = 0
+        try:
+            while True:
+                await self._rate_limiter.acquire()
+                try:
+                    return await self._send_request(session, method, url, endpoint, data, files, timeout, rate_limit_retries)
+                except RunningHubAPIError as e:
+                    last_exception = e
+                    if e.code == RATE_LIMITED_CODE and rate_limit_retries < RATE_LIMIT_MAX_RETRIES:
+                        rate_limit_retries += 1
+                        logger.warning(f"RunningHub rate limit reached on {endpoint}, retrying ({rate_limit_retries}/{RATE_LIMIT_MAX_RETRIES})")
+                        continue
+                    if e.code in retry_codes_excluded:
+                        raise
+                except Exception as e:
+                    last_exception = e
+                
                 if attempt < self.retry_count:
                     wait_time = 2 ** attempt  # Exponential backoff
-                    logger.warning(f"Request failed (attempt {attempt + 1}/{self.retry_count + 1}): {e}. Retrying in {wait_time}s...")
+                    logger.warning(f"Request failed (attempt {attempt + 1}/{self.retry_count + 1}): {last_exception}. Retrying in {wait_time}s...")
+                    attempt += 1
                     await asyncio.sleep(wait_time)
                 else:
-                    logger.error(f"Request failed after {self.retry_count + 1} attempts: {e}")
-        
-        raise last_exception
+                    logger.error(f"Request failed after {attempt + 1} attempts: {last_exception}")
+                    raise last_exception
+        finally:
+            if one_off_session is not None:
+                await one_off_session.close()
+    
+    def _get_task_slots(self) -> Optional[asyncio.Semaphore]:
+        if self.max_concurrent_tasks <= 0:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._task_slots is None or self._task_slots_loop is not loop:
+            self._task_slots = asyncio.Semaphore(self.max_concurrent_tasks)
+            self._task_slots_loop = loop
+            self._slot_task_ids.clear()
+        return self._task_slots
+    
+    def release_task(self, task_id: Optional[str]):
+        """Give back the quota slot of a finished (or abandoned) task created by this client, once per task"""
+        if task_id is not None and str(task_id) in self._slot_task_ids:
+            self._slot_task_ids.discard(str(task_id))
+            self._task_slots.release()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get request and task quota statistics of this client"""
+        return {
+            "session_open": self._session is not None and not self._session.closed,
+            "pool_limit": RUNNINGHUB_POOL_LIMIT,
+            "rate_limit": self._rate_limiter.rate,
+            "max_concurrent_tasks": self.max_concurrent_tasks,
+            "tasks_holding_slot": len(self._slot_task_ids),
+            "tasks_creating": self._tasks_creating,
+            "queue_full": self._queue_stats["queue_full"],
+            "queue_waited_seconds": round(self._queue_stats["waited_seconds"], 1),
+            "endpoints": {
+                endpoint: {
+                    "requests": stats["requests"],
+                    "errors": stats["errors"],
+                    "rate_limited": stats["rate_limited"],
+                    "avg_ms": round(stats["seconds"] / stats["requests"] * 1000, 1) if stats["requests"] else 0.0,
+                    "max_ms": round(stats["max_seconds"] * 1000, 1),
+                }
+                for endpoint, stats in self._endpoint_stats.items()
+            },
+        }
     
     async def get_workflow_json(self, workflow_id: str) -> Dict[str, Any]:
         """Get workflow JSON by workflow ID using getJsonApiFormat API
@@ -181,6 +394,9 @@ class RunningHubClient:
     async def create_task(self, workflow_id: str, node_info_list: List[Dict] = None) -> Dict[str, Any]:
         """Create workflow execution task
         
+        Waits locally while the concurrent-task quota of the account is used up, the
+        created task holds a slot until it is seen finished, is cancelled or is released.
+        
         Args:
             workflow_id: RunningHub workflow ID
             node_info_list: Node parameter modifications
@@ -198,16 +414,47 @@ class RunningHubClient:
         if node_info_list:
             data["nodeInfoList"] = node_info_list
         
+        task_slots = self._get_task_slots()
+        start = time.time()
+        acquired = False
+        self._tasks_creating += 1
         try:
-            result = await self._make_request("POST", "/task/openapi/create", data=data)
-            task_data = result.get('data', {})
-            
-            logger.info(f"Task created successfully: {task_data.get('taskId')}")
-            return task_data
-            
-        except Exception as e:
-            logger.error(f"Failed to create task for {workflow_id}: {e}")
+            if task_slots is not None:
+                await task_slots.acquire()
+                acquired = True
+                self._queue_stats["waited_seconds"] += time.time() - start
+            while True:
+                try:
+                    result = await self._make_request("POST", "/task/openapi/create", data=data,
+                                                      retry_codes_excluded=(QUEUE_MAXED_CODE,))
+                    break
+                except RunningHubAPIError as e:
+                    # Account queue is full: wait here instead of failing, until the request timeout
+                    if e.code != QUEUE_MAXED_CODE or time.time() - start + QUEUE_RETRY_INTERVAL > self.timeout:
+                        raise
+                    self._queue_stats["queue_full"] += 1
+                    self._queue_stats["waited_seconds"] += QUEUE_RETRY_INTERVAL
+                    logger.info(f"RunningHub task queue is full, creating task for {workflow_id} again in {QUEUE_RETRY_INTERVAL}s")
+                    await asyncio.sleep(QUEUE_RETRY_INTERVAL)
+        except BaseException as e:
+            if acquired:
+                task_slots.release()
+            if isinstance(e, Exception):
+                logger.error(f"Failed to create task for {workflow_id}: {e}")
             raise
+        finally:
+            self._tasks_creating -= 1
+        
+        task_data = result.get('data', {})
+        task_id = task_data.get('taskId')
+        if acquired:
+            if task_id:
+                self._slot_task_ids.add(str(task_id))
+            else:
+                task_slots.release()
+        
+        logger.info(f"Task created successfully: {task_id}")
+        return task_data
     
     async def query_task_status(self, task_id: str) -> Literal["QUEUED", "RUNNING", "FAILED", "SUCCESS"]:
         """Query task execution status
@@ -226,7 +473,11 @@ class RunningHubClient:
         try:
             result = await self._make_request("POST", "/task/openapi/status", data=data)
             # According to RunningHub API docs, the data field is a string: ["QUEUED","RUNNING","FAILED","SUCCESS"]
-            return result.get('data', 'FAILED')
+            task_status = result.get('data', 'FAILED')
+            if task_status not in ('QUEUED', 'RUNNING'):
+                # No longer counted by RunningHub, whoever polled it
+                self.release_task(task_id)
+            return task_status
             
         except Exception as e:
             logger.error(f"Failed to query task status for {task_id}: {e}")
@@ -254,6 +505,26 @@ class RunningHubClient:
             logger.error(f"Failed to query task result for {task_id}: {e}")
             raise
 
+    async def cancel_task(self, task_id: str) -> None:
+        """Cancel a queued or running task
+        
+        Args:
+            task_id: Task ID
+        """
+        data = {
+            "apiKey": self.api_key,
+            "taskId": task_id
+        }
+        
+        try:
+            await self._make_request("POST", "/task/openapi/cancel", data=data)
+            self.release_task(task_id)
+            logger.info(f"Task cancelled: {task_id}")
+            
+        except Exception as e:
+            logger.error(f"Failed to cancel task {task_id}: {e}")
+            raise
+
 
 # Global RunningHub client instance
 _runninghub_client = None
@@ -8,9 +8,10 @@ import asyncio
 from typing import Dict, Any, Optional, List
 from urllib.parse import urlparse
 
-from pixelle.comfyui.base_executor import ComfyUIExecutor, MEDIA_UPLOAD_NODE_TYPES
+from pixelle.comfyui.base_executor import ComfyUIExecutor, PromptSubmission, MEDIA_UPLOAD_NODE_TYPES
 from pixelle.comfyui.models import ExecuteResult
 from pixelle.comfyui.runninghub_client import get_runninghub_client
+from pixelle.comfyui.upload_cache import sha256_of_file
 from pixelle.logger import logger
 from pixelle.utils.file_util import download_files
 from pixelle.utils.os_util import get_data_path
@@ -25,34 +26,37 @@ class RunningHubExecutor(ComfyUIExecutor):
         super().__init__(base_url or settings.runninghub_base_url)
         self.client = get_runninghub_client()
     
-    async def execute_workflow(self, workflow_file: str, params: Dict[str, Any] = None) -> ExecuteResult:
-        """Execute workflow on RunningHub platform
+    async def submit_workflow(self, workflow_file: str, params: Dict[str, Any] = None) -> PromptSubmission:
+        """Create a task for the workflow on RunningHub platform
         
         Args:
             workflow_file: Local workflow file path (for RunningHub, this contains workflow_id)
             params: Workflow parameters
             
         Returns:
-            Execution result
+            Submission, its prompt_id is the RunningHub task ID
         """
+        submission = PromptSubmission(workflow_file=workflow_file)
         try:
-            start_time = asyncio.get_event_loop().time()
-            
             if not os.path.exists(workflow_file):
                 logger.error(f"Workflow file does not exist: {workflow_file}")
-                return ExecuteResult(status="error", msg=f"Workflow file does not exist: {workflow_file}")
+                submission.result = ExecuteResult(status="error", msg=f"Workflow file does not exist: {workflow_file}")
+                return submission
             
             # Get workflow metadata using workflow manager (handles RunningHub workflows)
             from pixelle.manager.workflow_manager import workflow_manager
             from pathlib import Path
-            metadata = workflow_manager.parse_workflow_metadata(Path(workflow_file))
+            metadata = await workflow_manager.parse_workflow_metadata(Path(workflow_file))
             if not metadata:
-                return ExecuteResult(status="error", msg="Cannot parse workflow metadata")
+                submission.result = ExecuteResult(status="error", msg="Cannot parse workflow metadata")
+                return submission
+            submission.workflow_name = metadata.title
             
             # For RunningHub workflows, get the workflow_id from metadata
             workflow_id = metadata.workflow_id
             if not workflow_id:
-                return ExecuteResult(status="error", msg="RunningHub workflow_id not found in metadata")
+                submission.result = ExecuteResult(status="error", msg="RunningHub workflow_id not found in metadata")
+                return submission
             
             logger.info(f"Starting RunningHub workflow execution: workflow_id={workflow_id}")
             
@@ -64,26 +68,67 @@ class RunningHubExecutor(ComfyUIExecutor):
             task_id = task_data.get('taskId')
             
             if not task_id:
-                return ExecuteResult(status="error", msg="Failed to create RunningHub task")
+                submission.result = ExecuteResult(status="error", msg="Failed to create RunningHub task")
+                return submission
             
             logger.info(f"RunningHub task created: {task_id}")
+            submission.prompt_id = task_id
             
             # Extract output node information from metadata
-            output_id_2_var = self._extract_output_nodes(metadata)
+            submission.output_id_2_var = self._extract_output_nodes(metadata)
+            return submission
             
+        except Exception as e:
+            logger.error(f"RunningHub workflow execution failed: {e}", exc_info=True)
+            submission.result = ExecuteResult(status="error", msg=f"RunningHub execution failed: {str(e)}")
+            return submission
+    
+    async def wait_for_result(self, submission: PromptSubmission, timeout: Optional[float] = None) -> ExecuteResult:
+        """Wait for a RunningHub task and return its result"""
+        if submission.result is not None:
+            return submission.result
+        try:
             # Wait for task completion
-            result = await self._wait_for_task_completion(task_id, output_id_2_var)
+            result = await self._wait_for_task_completion(submission.prompt_id, submission.output_id_2_var, timeout)
+            self._record_execution(submission, result.status == "completed")
             
             # Calculate execution time
-            end_time = asyncio.get_event_loop().time()
-            duration = end_time - start_time
-            result.duration = duration
-            
+            result.duration = time.time() - submission.created_at
             return result
             
+        except asyncio.CancelledError:
+            # Nobody waits for the result anymore, cancel the task
+            await self._cancel_abandoned(submission)
+            raise
         except Exception as e:
             logger.error(f"RunningHub workflow execution failed: {e}", exc_info=True)
-            return ExecuteResult(status="error", msg=f"RunningHub execution failed: {str(e)}")
+            return ExecuteResult(status="error", prompt_id=submission.prompt_id, msg=f"RunningHub execution failed: {str(e)}")
+        finally:
+            self._prompt_started_at.pop(submission.prompt_id, None)
+            # Already released when the task was seen finished or was cancelled, this covers
+            # tasks given up on (timeout, errors): their slot must not be held forever
+            self.client.release_task(submission.prompt_id)
+    
+    async def reattach(self, submission: PromptSubmission, timeout: Optional[float] = None) -> ExecuteResult:
+        """Wait for a task created by a previous process, tasks are polled by ID anyway"""
+        return await self.wait_for_result(submission, timeout)
+    
+    async def close(self):
+        """Stop polling and close the pooled RunningHub session"""
+        await super().close()
+        await self.client.close()
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get statistics of this executor and of its RunningHub client"""
+        return {**super().get_pool_stats(), "client": self.client.get_stats()}
+    
+    async def _stop_prompt(self, prompt_id: str) -> str:
+        """Cancel a RunningHub task that is queued or running"""
+        task_status = await self.client.query_task_status(prompt_id)
+        if task_status not in ('QUEUED', 'RUNNING'):
+            return "finished"
+        await self.client.cancel_task(prompt_id)
+        return "deleted" if task_status == 'QUEUED' else "interrupted"
     
     
     async def _convert_params_to_node_info_list(self, metadata, params: dict) -> List[dict]:
@@ -140,12 +185,24 @@ class RunningHubExecutor(ComfyUIExecutor):
             return param_value
     
     async def _upload_media_from_url(self, media_url: str) -> str:
-        """Upload media from URL to RunningHub"""
+        """Upload media from URL to RunningHub, media already uploaded (same URL or same content) is reused"""
+        cached_name = self._upload_cache.get_by_url(media_url)
+        if cached_name is not None:
+            logger.info(f"Media already uploaded to RunningHub, reuse: {cached_name}")
+            return cached_name
+        
         try:
             # Download the file first
             async with download_files(media_url) as temp_file_path:
+                content_hash = sha256_of_file(temp_file_path)
+                cached_name = self._upload_cache.get_by_hash(content_hash, media_url)
+                if cached_name is not None:
+                    logger.info(f"Media content already uploaded to RunningHub, reuse: {cached_name}")
+                    return cached_name
+                
                 # Upload to RunningHub and get fileName
                 result = await self.client.upload_file(temp_file_path)
+                self._upload_cache.put(content_hash, result, media_url)
                 return result
         except Exception as e:
             logger.error(f"Failed to upload media from URL {media_url}: {e}")
@@ -201,6 +258,8 @@ class RunningHubExecutor(ComfyUIExecutor):
                     )
                 
                 elif task_status in ['QUEUED', 'RUNNING']:
+                    if task_status == 'RUNNING':
+                        self._mark_running(task_id)
                     # Task still in progress - wait and check again
                     logger.info(f"Task {task_id} status: {task_status}, waiting...")
                     await asyncio.sleep(check_interval)
@@ -0,0 +1,164 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+Persistent cache of RunningHub workflows: the API-format JSON fetched from the cloud and its parsed metadata
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from pixelle.logger import logger
+from pixelle.settings import settings
+from pixelle.comfyui.workflow_parser import WorkflowParser, WorkflowMetadata
+from pixelle.utils.os_util import get_data_path
+
+# Next to the `_source` stubs in custom_workflows, hidden so it is not loaded as a workflow
+RUNNINGHUB_METADATA_CACHE_DIR = get_data_path("custom_workflows", ".runninghub")
+RUNNINGHUB_METADATA_CACHE_TTL = settings.runninghub_metadata_cache_ttl
+# Bump when the cache file layout or the parsed metadata changes, older entries are refetched
+CACHE_VERSION = 1
+# Workflow ids used as file name as is, others (from a workflow file, e.g. with `/` or `..`) are hashed
+SAFE_WORKFLOW_ID = re.compile(r'[A-Za-z0-9_-]{1,128}')
+
+
+class RunningHubMetadataCache:
+    """Cache of RunningHub workflows by workflow_id, on disk and in memory
+
+    Each entry is a JSON file holding the workflow in API format and its metadata parsed
+    for the tool name it was fetched for. Entries older than `ttl` seconds or written by
+    another cache version are ignored. `ttl` 0 disables the cache.
+    """
+
+    def __init__(self, cache_dir: str = RUNNINGHUB_METADATA_CACHE_DIR, ttl: float = RUNNINGHUB_METADATA_CACHE_TTL):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        # workflow_id -> cache file content
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _path(self, workflow_id: str) -> Path:
+        """Cache file of a workflow, always inside cache_dir"""
+        workflow_id = str(workflow_id)
+        if SAFE_WORKFLOW_ID.fullmatch(workflow_id):
+            return self.cache_dir / f"{workflow_id}.json"
+        return self.cache_dir / f"{hashlib.sha256(workflow_id.encode('utf-8')).hexdigest()}.json"
+
+    def _is_valid(self, entry: Dict[str, Any]) -> bool:
+        return entry.get("version") == CACHE_VERSION and time.time() - entry.get("fetched_at", 0) < self.ttl
+
+    def _read(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(workflow_id)
+        if entry is not None:
+            return entry
+        try:
+            with open(self._path(workflow_id), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Failed to read RunningHub metadata cache of {workflow_id}: {e}")
+            return None
+        with self._lock:
+            self._entries[workflow_id] = entry
+        return entry
+
+    def get(self, workflow_id: str, tool_name: str) -> Optional[WorkflowMetadata]:
+        """Get the metadata of a workflow for a tool name, None if not cached or outdated"""
+        if not self.enabled:
+            return None
+        entry = self._read(workflow_id)
+        if entry is None or not self._is_valid(entry):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        if entry["metadata"].get("title") == tool_name:
+            return WorkflowMetadata.model_validate(entry["metadata"])
+        # Same workflow under another tool name, parse the cached JSON again
+        return self._parse(workflow_id, entry["workflow"], tool_name)
+
+    def get_workflow_json(self, workflow_id: str) -> Optional[Dict[str, Any]]:
+        """Get the cached workflow in API format, None if not cached or outdated"""
+        if not self.enabled:
+            return None
+        entry = self._read(workflow_id)
+        if entry is None or not self._is_valid(entry):
+            return None
+        return entry["workflow"]
+
+    @staticmethod
+    def _parse(workflow_id: str, workflow_json: Dict[str, Any], tool_name: str) -> Optional[WorkflowMetadata]:
+        metadata = WorkflowParser().parse_workflow(workflow_json, tool_name)
+        if metadata:
+            metadata.workflow_id = workflow_id
+            metadata.is_runninghub = True
+        return metadata
+
+    def put(self, workflow_id: str, workflow_json: Dict[str, Any], tool_name: str) -> Optional[WorkflowMetadata]:
+        """Parse a freshly fetched workflow, cache it and return its metadata"""
+        metadata = self._parse(workflow_id, workflow_json, tool_name)
+        if metadata is None or not self.enabled:
+            return metadata
+
+        entry = {
+            "version": CACHE_VERSION,
+            "workflow_id": workflow_id,
+            "fetched_at": time.time(),
+            "metadata": metadata.model_dump(),
+            "workflow": workflow_json,
+        }
+        with self._lock:
+            self._entries[workflow_id] = entry
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Write then rename, so a concurrent reader never sees a partial file
+            path = self._path(workflow_id)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to write RunningHub metadata cache of {workflow_id}: {e}")
+        return metadata
+
+    def invalidate(self, workflow_id: Optional[str] = None):
+        """Drop the entry of a workflow (all entries if None), so it is fetched again"""
+        with self._lock:
+            if workflow_id is None:
+                self._entries.clear()
+                paths = list(self.cache_dir.glob("*.json")) if self.cache_dir.exists() else []
+            else:
+                self._entries.pop(workflow_id, None)
+                paths = [self._path(workflow_id)]
+        for path in paths:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Failed to remove RunningHub metadata cache {path}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Global RunningHub metadata cache
+runninghub_metadata_cache = RunningHubMetadataCache()
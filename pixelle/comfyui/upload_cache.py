@@ -0,0 +1,115 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+Dedup cache of media uploaded to a ComfyUI / RunningHub backend
+"""
+
+import time
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from pixelle.settings import settings
+
+UPLOAD_CACHE_TTL = settings.upload_cache_ttl
+UPLOAD_CACHE_MAX_ENTRIES = settings.upload_cache_max_entries
+
+
+def sha256_of_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_of_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class _UploadEntry:
+    name: str
+    expires_at: float
+
+
+class UploadCache:
+    """Map source URL and content SHA-256 to the uploaded file name, with TTL and LRU eviction
+
+    A URL hit skips both download and upload. A content hit (same bytes behind
+    another URL) skips the upload.
+    """
+
+    def __init__(self, ttl: float = UPLOAD_CACHE_TTL, max_entries: int = UPLOAD_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._by_url: "OrderedDict[str, _UploadEntry]" = OrderedDict()
+        self._by_hash: "OrderedDict[str, _UploadEntry]" = OrderedDict()
+        self.stats: Dict[str, int] = {
+            "url_hits": 0,
+            "hash_hits": 0,
+            "misses": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def _lookup(self, entries: "OrderedDict[str, _UploadEntry]", key: str) -> Optional[str]:
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            entries.pop(key, None)
+            return None
+        entries.move_to_end(key)
+        return entry.name
+
+    def _store(self, entries: "OrderedDict[str, _UploadEntry]", key: str, name: str):
+        entries[key] = _UploadEntry(name=name, expires_at=time.monotonic() + self.ttl)
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def get_by_url(self, url: str) -> Optional[str]:
+        """Get the uploaded file name of a source URL"""
+        if not self.enabled:
+            return None
+        name = self._lookup(self._by_url, url)
+        if name is not None:
+            self.stats["url_hits"] += 1
+        return name
+
+    def get_by_hash(self, content_hash: str, url: Optional[str] = None) -> Optional[str]:
+        """Get the uploaded file name of a content hash, remember the URL on hit"""
+        if not self.enabled:
+            return None
+        name = self._lookup(self._by_hash, content_hash)
+        if name is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hash_hits"] += 1
+        if url:
+            self._store(self._by_url, url, name)
+        return name
+
+    def put(self, content_hash: str, name: str, url: Optional[str] = None):
+        """Record an uploaded file"""
+        if not self.enabled or not name:
+            return
+        self._store(self._by_hash, content_hash, name)
+        if url:
+            self._store(self._by_url, url, name)
+
+    def clear(self):
+        self._by_url.clear()
+        self._by_hash.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "url_entries": len(self._by_url),
+            "hash_entries": len(self._by_hash),
+            **self.stats,
+        }
@@ -0,0 +1,221 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+Multiplexed WebSocket connection to a ComfyUI backend
+"""
+
+import json
+import uuid
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+import websockets
+
+from pixelle.logger import logger
+
+if TYPE_CHECKING:
+    from pixelle.comfyui.websocket_executor import WebSocketExecutor
+
+# Max number of unknown prompt_ids whose messages are buffered until they are registered
+MAX_ORPHAN_PROMPTS = 256
+# Max number of buffered messages per unknown prompt_id
+MAX_ORPHAN_MESSAGES = 1000
+# Reconnect backoff (seconds)
+RECONNECT_MIN_DELAY = 1.0
+RECONNECT_MAX_DELAY = 30.0
+
+
+class ComfyUIWebSocketDispatcher:
+    """One persistent, auto-reconnecting WebSocket per ComfyUI backend
+
+    All prompts are submitted with the dispatcher's client_id, so ComfyUI sends their
+    progress messages to this single connection. Messages are routed to per-prompt_id
+    queues. After a reconnect, registered prompts are reconciled through `/history`
+    and a synthetic `history` message is delivered for prompts that finished while
+    the connection was down.
+    """
+
+    def __init__(self, executor: "WebSocketExecutor"):
+        self.executor = executor
+        self.client_id = str(uuid.uuid4())
+        self.queue_remaining: Optional[int] = None
+        self.stats: Dict[str, int] = {
+            "connects": 0,
+            "disconnects": 0,
+            "messages": 0,
+            "routed_messages": 0,
+            "reconciled_prompts": 0,
+        }
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._orphans: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self._reconcile_tasks: set = set()
+        self._connected: Optional[asyncio.Event] = None
+        self._closed = False
+
+    @property
+    def connected(self) -> bool:
+        return self._connected is not None and self._connected.is_set()
+
+    async def ensure_connected(self, timeout: float = 10.0):
+        """Start the connection loop if needed and wait until the WebSocket is connected"""
+        if self._task is None or self._task.done():
+            self._closed = False
+            self._connected = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise Exception(f"WebSocket connection to {self.executor.ws_base_url} not established within {timeout} seconds")
+
+    def register(self, prompt_id: str) -> asyncio.Queue:
+        """Register a prompt and get the queue its messages are routed to"""
+        queue = self._queues.get(prompt_id)
+        if queue is None:
+            queue = asyncio.Queue()
+            self._queues[prompt_id] = queue
+            # Messages may arrive before the prompt is registered
+            for message in self._orphans.pop(prompt_id, []):
+                queue.put_nowait(message)
+        return queue
+
+    def unregister(self, prompt_id: str):
+        """Stop routing messages of a prompt"""
+        self._queues.pop(prompt_id, None)
+        self._orphans.pop(prompt_id, None)
+
+    async def close(self):
+        """Close the connection and stop reconnecting"""
+        self._closed = True
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "client_id": self.client_id,
+            "connected": self.connected,
+            "registered_prompts": len(self._queues),
+            "queue_remaining": self.queue_remaining,
+            **self.stats,
+        }
+
+    async def _run(self):
+        """Connection loop, reconnect with exponential backoff until closed"""
+        delay = RECONNECT_MIN_DELAY
+        ws_url = f"{self.executor.ws_base_url}?clientId={self.client_id}"
+        while not self._closed:
+            try:
+                additional_headers = await self.executor._get_ws_headers()
+                async with websockets.connect(ws_url, additional_headers=additional_headers) as websocket:
+                    self.stats["connects"] += 1
+                    logger.info(f"WebSocket connection established: {ws_url}")
+                    self._connected.set()
+                    delay = RECONNECT_MIN_DELAY
+
+                    if self._queues:
+                        task = asyncio.create_task(self._reconcile(list(self._queues.keys())))
+                        self._reconcile_tasks.add(task)
+                        task.add_done_callback(self._reconcile_tasks.discard)
+
+                    async for message in websocket:
+                        self._dispatch(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"WebSocket connection error ({ws_url}): {e}")
+            finally:
+                if self._connected.is_set():
+                    self.stats["disconnects"] += 1
+                self._connected.clear()
+
+            if self._closed:
+                break
+            logger.info(f"WebSocket reconnecting in {delay:.0f} seconds")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    def _dispatch(self, message_str: Any):
+        """Route a WebSocket message to the queue of its prompt"""
+        # Binary messages are previews, ignore them
+        if not isinstance(message_str, str):
+            return
+
+        self.stats["messages"] += 1
+        try:
+            message = json.loads(message_str)
+        except json.JSONDecodeError:
+            logger.debug(f"Ignore invalid WebSocket message: {message_str[:200]}")
+            return
+
+        msg_type = message.get('type')
+        data = message.get('data') or {}
+
+        if msg_type == 'status':
+            # For status message, record queue status
+            queue_remaining = data.get('status', {}).get('exec_info', {}).get('queue_remaining')
+            if queue_remaining is not None:
+                self.queue_remaining = queue_remaining
+            logger.debug(f'Queue status updated: remaining tasks {queue_remaining} ')
+            return
+
+        prompt_id = data.get('prompt_id')
+        if not prompt_id:
+            logger.debug(f'Received other WebSocket message: {message}')
+            return
+
+        queue = self._queues.get(prompt_id)
+        if queue is not None:
+            self.stats["routed_messages"] += 1
+            queue.put_nowait(message)
+            return
+
+        # Buffer messages of prompts that are not registered (yet)
+        buffered = self._orphans.get(prompt_id)
+        if buffered is None:
+            buffered = []
+            self._orphans[prompt_id] = buffered
+            while len(self._orphans) > MAX_ORPHAN_PROMPTS:
+                self._orphans.popitem(last=False)
+        if len(buffered) < MAX_ORPHAN_MESSAGES:
+            buffered.append(message)
+
+    @property
+    def generation(self) -> int:
+        """Connection generation, changes on every reconnect"""
+        return self.stats["connects"]
+
+    async def fetch_history(self, prompt_id: str) -> Optional[Dict[str, Any]]:
+        """Get the history entry of a prompt, None if it is not finished"""
+        history_url = f"{self.executor.base_url}/history/{prompt_id}"
+        async with self.executor.get_comfyui_session() as session:
+            async with session.get(history_url) as response:
+                if response.status != 200:
+                    return None
+                history_data = await response.json()
+        return history_data.get(prompt_id)
+
+    async def _reconcile(self, prompt_ids: List[str]):
+        """Recover prompts that finished while the connection was down"""
+        for prompt_id in prompt_ids:
+            if prompt_id not in self._queues:
+                continue
+            try:
+                prompt_history = await self.fetch_history(prompt_id)
+            except Exception as e:
+                logger.warning(f"Reconcile prompt {prompt_id} through history failed: {e}")
+                continue
+
+            queue = self._queues.get(prompt_id)
+            if prompt_history and queue is not None:
+                logger.info(f"Prompt {prompt_id} finished while WebSocket was disconnected, recovered from history")
+                self.stats["reconciled_prompts"] += 1
+                queue.put_nowait({
+                    "type": "history",
+                    "data": {"prompt_id": prompt_id, "history": prompt_history},
+                })
@@ -1,17 +1,16 @@
 # Copyright (C) 2025 AIDC-AI
 # This project is licensed under the MIT License (SPDX-License-identifier: MIT).
 
-import os
 import json
 import time
-import uuid
 import asyncio
 from typing import Optional, Dict, Any
 from urllib.parse import urlparse, urlunparse
-import websockets
 
-from pixelle.comfyui.base_executor import ComfyUIExecutor, COMFYUI_API_KEY, logger
+from pixelle.comfyui.base_executor import ComfyUIExecutor, PromptSubmission, logger
 from pixelle.comfyui.models import ExecuteResult
+from pixelle.comfyui.websocket_dispatcher import ComfyUIWebSocketDispatcher
+from pixelle.comfyui.result_transfer import ResultTransferPipeline
 
 
 class WebSocketExecutor(ComfyUIExecutor):
@@ -20,6 +19,7 @@ class WebSocketExecutor(ComfyUIExecutor):
     def __init__(self, base_url: str = None):
         super().__init__(base_url)
         self._parse_ws_url()
+        self._dispatcher: Optional[ComfyUIWebSocketDispatcher] = None
         
         logger.info(f"HTTP Base URL: {self.http_base_url}")
         logger.info(f"WebSocket Base URL: {self.ws_base_url}")
@@ -76,6 +76,60 @@ class WebSocketExecutor(ComfyUIExecutor):
                 logger.info(f"Task submitted: {prompt_id}")
                 return prompt_id
 
+    def _get_dispatcher(self) -> ComfyUIWebSocketDispatcher:
+        """Get the multiplexed WebSocket dispatcher of this backend"""
+        if self._dispatcher is None:
+            self._dispatcher = ComfyUIWebSocketDispatcher(self)
+        return self._dispatcher
+
+    async def _get_ws_headers(self) -> Dict[str, str]:
+        """Prepare extra headers for WebSocket connection, include cookies"""
+        additional_headers = {}
+        cookies = await self._parse_comfyui_cookies()
+        if cookies:
+            try:
+                if isinstance(cookies, dict):
+                    cookie_string = "; ".join([f"{k}={v}" for k, v in cookies.items()])
+                else:
+                    cookie_string = str(cookies)
+                
+                additional_headers["Cookie"] = cookie_string
+                logger.debug(f"WebSocket connection will use cookies: {cookie_string[:50]}...")
+            except Exception as e:
+                logger.warning(f"Parse WebSocket cookies failed: {e}")
+        return additional_headers
+
+    async def close(self):
+        """Close the multiplexed WebSocket and the pooled session"""
+        if self._dispatcher is not None:
+            await self._dispatcher.close()
+        await super().close()
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        stats = super().get_pool_stats()
+        if self._dispatcher is not None:
+            stats["websocket"] = self._dispatcher.get_stats()
+        return stats
+
+    def get_live_queue_remaining(self) -> Optional[int]:
+        # Status messages are pushed on every queue change while connected
+        if self._dispatcher is not None and self._dispatcher.connected:
+            return self._dispatcher.queue_remaining
+        return None
+
+    def _has_media_output(self, output: Dict[str, Any]) -> bool:
+        """Check if there are outputs we are interested in"""
+        return bool(output.get('images')
+                    or output.get('gifs')
+                    or output.get('audio')
+                    or output.get('text'))
+
+    def _start_output_transfer(self, pipeline: ResultTransferPipeline, output: Dict[str, Any]):
+        """Start transferring media files of an output node in background"""
+        images, videos, audios = self._split_media_by_suffix(output, self.http_base_url)
+        for url in images + videos + audios:
+            pipeline.submit(url)
+
     def _parse_ws_message(self, message: dict, prompt_id: str) -> tuple[bool, dict]:
         """
         Parse websocket message
@@ -165,213 +219,202 @@ class WebSocketExecutor(ComfyUIExecutor):
                 msg=f"Build execution result from collected WebSocket outputs failed: {str(e)}"
             )
 
-    async def execute_workflow(self, workflow_file: str, params: Dict[str, Any] = None) -> ExecuteResult:
-        """Execute workflow (WebSocket way)"""
+    async def submit_workflow(self, workflow_file: str, params: Dict[str, Any] = None) -> PromptSubmission:
+        """Submit workflow to the ComfyUI queue (WebSocket way)
+        
+        The prompt is registered on the multiplexed WebSocket right away, so its messages
+        are kept until `wait_for_result()` consumes them.
+        """
         try:
-            start_time = time.time()
-            
-            if not os.path.exists(workflow_file):
-                logger.error(f"Workflow file does not exist: {workflow_file}")
-                return ExecuteResult(status="error", msg=f"Workflow file does not exist: {workflow_file}")
-            
-            # Get workflow metadata
-            metadata = self.get_workflow_metadata(workflow_file)
-            if not metadata:
-                return ExecuteResult(status="error", msg="Cannot parse workflow metadata")
-            
-            # Load workflow JSON
-            with open(workflow_file, 'r', encoding='utf-8') as f:
-                workflow_data = json.load(f)
-            
-            if not workflow_data:
-                return ExecuteResult(status="error", msg="Workflow data is missing")
-            
-            # Use new parameter mapping logic
-            if params:
-                workflow_data = await self._apply_params_to_workflow(workflow_data, metadata, params)
-            else:
-                # Even if no parameters are passed, default values need to be applied
-                workflow_data = await self._apply_params_to_workflow(workflow_data, metadata, {})
-
-            # Replace any seed == 0 with a random 63-bit seed before submission
-            workflow_data, _ = self._randomize_seed_in_workflow(workflow_data)
-            
-            # Extract output node information from metadata
-            output_id_2_var = self._extract_output_nodes(metadata)
-            
-            # Generate client ID
-            client_id = str(uuid.uuid4())
-            
-            # Prepare extra parameters
-            prompt_ext_params = {}
-            if COMFYUI_API_KEY:
-                prompt_ext_params = {
-                    "extra_data": {
-                        "api_key_comfy_org": COMFYUI_API_KEY
-                    }
-                }
-            else:
-                logger.warning("COMFYUI_API_KEY is not set")
-            
-            # First establish WebSocket connection, then submit task
-            timeout = 30 * 60  # Default 30 minutes timeout
-            
-            # Build WebSocket URL
-            ws_url = f"{self.ws_base_url}?clientId={client_id}"
-            logger.info(f"WebSocket URL: {ws_url}")
-            logger.info(f"Prepare to connect websocket service")
-            
-            # For collecting nodes with outputs
-            collected_outputs = {}
-            prompt_id = None
+            workflow_data, submission = await self._prepare_prompt(workflow_file, params)
+            if workflow_data is None:
+                return submission
             
             try:
-                # Prepare extra headers for WebSocket connection, include cookies
-                additional_headers = {}
-                cookies = await self._parse_comfyui_cookies()
-                if cookies:
-                    try:
-                        if isinstance(cookies, dict):
-                            cookie_string = "; ".join([f"{k}={v}" for k, v in cookies.items()])
-                        else:
-                            cookie_string = str(cookies)
-                        
-                        additional_headers["Cookie"] = cookie_string
-                        logger.debug(f"WebSocket connection will use cookies: {cookie_string[:50]}...")
-                    except Exception as e:
-                        logger.warning(f"Parse WebSocket cookies failed: {e}")
+                # Ensure the shared WebSocket is connected, then submit task
+                dispatcher = self._get_dispatcher()
+                await dispatcher.ensure_connected()
+                
+                # All prompts share the client ID of the multiplexed connection
+                try:
+                    prompt_id = await self._queue_prompt(workflow_data, dispatcher.client_id, self._get_prompt_ext_params())
+                except Exception as e:
+                    error_message = f"Submit workflow failed: [{type(e)}] {str(e)}"
+                    logger.error(error_message)
+                    submission.result = ExecuteResult(status="error", msg=error_message)
+                    return submission
+                
+                logger.info(f"Workflow submitted, prompt_id: {prompt_id}, now wait for result")
+                submission.prompt_id = prompt_id
+                dispatcher.register(prompt_id)
+                submission.context["generation"] = dispatcher.generation
                 
-                # Establish WebSocket connection
-                async with websockets.connect(ws_url, additional_headers=additional_headers) as websocket:
-                    logger.info('WebSocket connection established, now submit workflow')
-                    
-                    # After connection established, immediately submit workflow
-                    try:
-                        prompt_id = await self._queue_prompt(workflow_data, client_id, prompt_ext_params)
-                    except Exception as e:
-                        error_message = f"Submit workflow failed: [{type(e)}] {str(e)}"
-                        logger.error(error_message)
-                        return ExecuteResult(status="error", msg=error_message)
-                    
-                    logger.info(f"Workflow submitted, prompt_id: {prompt_id}, now wait for result")
-                    
-                    while True:
-                        # Check timeout
-                        elapsed = time.time() - start_time
-                        if elapsed > timeout:
-                            logger.warning(f"WebSocket timeout ({timeout} seconds)")
-                            result = ExecuteResult(
-                                status="timeout",
-                                prompt_id=prompt_id,
-                                msg=f"WebSocket timeout ({timeout} seconds)",
-                                duration=elapsed
-                            )
-                            return result
-                        
-                        try:
-                            # Wait for message, set shorter timeout to check total timeout
-                            message_str = await asyncio.wait_for(websocket.recv(), timeout=3.0)
-                            
-                            if not isinstance(message_str, str):
-                                continue
-                                
-                            message = json.loads(message_str)
-                            
-                            # Print full message for target prompt_id for debugging
-                            if message.get('data', {}).get('prompt_id') == prompt_id:
-                                logger.debug(f'Received target WebSocket message (prompt_id: {prompt_id}): {json.dumps(message, ensure_ascii=False)}')
-                                
-                                # Process different types of messages
-                                msg_type = message.get('type')
-                                data = message.get('data', {})
-                                
-                                if msg_type == 'execution_cached':
-                                    # Process cached execution message
-                                    cached_nodes = data.get('nodes', [])
-                                    logger.debug(f"Detected cached execution, skip nodes: {cached_nodes}")
-                                    
-                                elif msg_type == 'executed':
-                                    # Collect nodes with outputs
-                                    node_id = data.get('node')
-                                    output = data.get('output')
-                                    if output and node_id:
-                                        # Check if there are outputs we are interested in
-                                        has_media = output.get('images') \
-                                            or output.get('gifs') \
-                                            or output.get('audio') \
-                                            or output.get('text')
-                                        if has_media:
-                                            logger.info(f"Collected outputs from node {node_id}")
-                                            collected_outputs[node_id] = output
-                                            
-                                elif msg_type == 'execution_error':
-                                    # Process execution error
-                                    error_message = data.get('exception_message', 'Unknown error')
-                                    logger.error(f"Execution error: {error_message}")
-                                    return ExecuteResult(
-                                        status="error",
-                                        prompt_id=prompt_id,
-                                        msg=error_message,
-                                        duration=time.time() - start_time
-                                    )
-                            else:
-                                # For status message, record queue status
-                                if message.get('type') == 'status':
-                                    queue_remaining = message.get('data', {}).get('status', {}).get('exec_info', {}).get('queue_remaining', 'unknown')
-                                    logger.debug(f'Queue status updated: remaining tasks {queue_remaining} ')
-                                else:
-                                    logger.debug(f'Received other WebSocket message: {message}')
-                            
-                            # Parse message
-                            invoke_completed, parsed_message = self._parse_ws_message(message, prompt_id)
-                            
-                            if invoke_completed:
-                                logger.info('WebSocket detected execution completed')
-                                
-                                # Set execution duration
-                                duration = time.time() - start_time
-                                
-                                # If there are collected outputs, use them to build result
-                                if collected_outputs:
-                                    result = self._build_result_from_collected_outputs(collected_outputs, prompt_id, output_id_2_var)
-                                    result.duration = duration
-                                    # Transfer result files
-                                    result = await self.transfer_result_files(result)
-                                    return result
-                                else:
-                                    # WebSocket way did not collect any outputs, return error
-                                    logger.warning("WebSocket did not collect any outputs")
-                                    result = ExecuteResult(
-                                        status="error",
-                                        prompt_id=prompt_id,
-                                        msg="WebSocket did not collect any outputs",
-                                        duration=duration
-                                    )
-                                    return result
-                                
-                        except asyncio.TimeoutError:
-                            # Wait for message timeout, continue loop to check total timeout
-                            continue
-                        except websockets.exceptions.ConnectionClosed:
-                            logger.warning("WebSocket connection closed")
-                            result = ExecuteResult(
-                                status="error",
-                                prompt_id=prompt_id,
-                                msg="WebSocket connection closed",
-                                duration=time.time() - start_time
-                            )
-                            return result
-                            
             except Exception as e:
                 logger.error(f"WebSocket connection or execution exception: {str(e)}")
-                result = ExecuteResult(
+                submission.result = ExecuteResult(
                     status="error",
-                    prompt_id=prompt_id,
+                    prompt_id=submission.prompt_id,
                     msg=f"WebSocket connection or execution exception: {str(e)}",
-                    duration=time.time() - start_time
+                    duration=time.time() - submission.created_at
                 )
-                return result
+            return submission
                 
         except Exception as e:
             logger.error(f"Execute workflow failed: {str(e)}", exc_info=True)
-            return ExecuteResult(status="error", msg=str(e)) 
\ No newline at end of file
+            return PromptSubmission(workflow_file=workflow_file, result=ExecuteResult(status="error", msg=str(e)))
+
+    async def wait_for_result(self, submission: PromptSubmission, timeout: Optional[float] = None) -> ExecuteResult:
+        """Wait for a submitted workflow through the multiplexed WebSocket and transfer its result files"""
+        if submission.result is not None:
+            return submission.result
+        
+        start_time = submission.created_at
+        timeout = timeout or 30 * 60  # Default 30 minutes timeout
+        prompt_id = submission.prompt_id
+        output_id_2_var = submission.output_id_2_var
+        
+        # For collecting nodes with outputs, their files are transferred as soon as each node finishes
+        collected_outputs = {}
+        transfer_pipeline = ResultTransferPipeline(self)
+        dispatcher = self._get_dispatcher()
+        queue = dispatcher.register(prompt_id)
+        generation = submission.context.get("generation", dispatcher.generation)
+        
+        try:
+            while True:
+                # Check timeout
+                elapsed = time.time() - start_time
+                if elapsed > timeout:
+                    logger.warning(f"WebSocket timeout ({timeout} seconds)")
+                    result = ExecuteResult(
+                        status="timeout",
+                        prompt_id=prompt_id,
+                        msg=f"WebSocket timeout ({timeout} seconds)",
+                        duration=elapsed
+                    )
+                    return result
+
+                try:
+                    # Wait for message, set shorter timeout to check total timeout
+                    message = await asyncio.wait_for(queue.get(), timeout=3.0)
+                except asyncio.TimeoutError:
+                    # Wait for message timeout, continue loop to check total timeout
+                    continue
+
+                # Print full message for target prompt_id for debugging
+                logger.debug(f'Received target WebSocket message (prompt_id: {prompt_id}): {json.dumps(message, ensure_ascii=False)}')
+
+                # Process different types of messages
+                msg_type = message.get('type')
+                data = message.get('data', {})
+
+                if msg_type == 'execution_start':
+                    self._mark_running(prompt_id)
+
+                elif msg_type == 'execution_cached':
+                    # Process cached execution message
+                    cached_nodes = data.get('nodes', [])
+                    logger.debug(f"Detected cached execution, skip nodes: {cached_nodes}")
+
+                elif msg_type == 'executed':
+                    # Collect nodes with outputs
+                    node_id = data.get('node')
+                    output = data.get('output')
+                    if output and node_id and self._has_media_output(output):
+                        logger.info(f"Collected outputs from node {node_id}")
+                        collected_outputs[node_id] = output
+                        self._start_output_transfer(transfer_pipeline, output)
+
+                elif msg_type == 'execution_error':
+                    # Process execution error
+                    error_message = data.get('exception_message', 'Unknown error')
+                    logger.error(f"Execution error: {error_message}")
+                    return ExecuteResult(
+                        status="error",
+                        prompt_id=prompt_id,
+                        msg=error_message,
+                        duration=time.time() - start_time
+                    )
+
+                elif msg_type == 'execution_interrupted':
+                    logger.warning(f"Execution interrupted: {prompt_id}")
+                    return ExecuteResult(
+                        status="error",
+                        prompt_id=prompt_id,
+                        msg="Execution interrupted",
+                        duration=time.time() - start_time
+                    )
+
+                elif msg_type == 'history':
+                    # Prompt finished while the connection was down, recovered from /history
+                    prompt_history = data.get('history', {})
+                    status = prompt_history.get('status') or {}
+                    if status.get('status_str') == 'error':
+                        messages = status.get('messages') or []
+                        errors = [body.get('exception_message') for type, body in messages if type == 'execution_error']
+                        return ExecuteResult(
+                            status="error",
+                            prompt_id=prompt_id,
+                            msg="\n".join(e for e in errors if e) or "Unknown error",
+                            duration=time.time() - start_time
+                        )
+                    for node_id, output in (prompt_history.get('outputs') or {}).items():
+                        if output and self._has_media_output(output):
+                            collected_outputs[node_id] = output
+                    message = {'type': 'executing', 'data': {'node': None, 'prompt_id': prompt_id}}
+
+                # Parse message
+                invoke_completed, parsed_message = self._parse_ws_message(message, prompt_id)
+
+                if invoke_completed:
+                    logger.info('WebSocket detected execution completed')
+
+                    # Messages may have been lost while reconnecting, take outputs from history
+                    if dispatcher.generation != generation and msg_type != 'history':
+                        try:
+                            prompt_history = await dispatcher.fetch_history(prompt_id) or {}
+                            for node_id, output in (prompt_history.get('outputs') or {}).items():
+                                if output and self._has_media_output(output):
+                                    collected_outputs[node_id] = output
+                        except Exception as e:
+                            logger.warning(f"Get outputs from history failed after reconnect: {e}")
+
+                    # Set execution duration
+                    duration = time.time() - start_time
+                    self._record_execution(submission, bool(collected_outputs))
+
+                    # If there are collected outputs, use them to build result
+                    if collected_outputs:
+                        result = self._build_result_from_collected_outputs(collected_outputs, prompt_id, output_id_2_var)
+                        result.duration = duration
+                        # Transfer result files, most of them were started on `executed` messages
+                        result = await self.transfer_result_files(result, transfer_pipeline)
+                        self._cache_result(submission, result)
+                        return result
+                    else:
+                        # WebSocket way did not collect any outputs, return error
+                        logger.warning("WebSocket did not collect any outputs")
+                        result = ExecuteResult(
+                            status="error",
+                            prompt_id=prompt_id,
+                            msg="WebSocket did not collect any outputs",
+                            duration=duration
+                        )
+                        return result
+        except asyncio.CancelledError:
+            # Nobody waits for the result anymore, stop burning GPU time on it
+            await self._cancel_abandoned(submission)
+            raise
+        except Exception as e:
+            logger.error(f"WebSocket connection or execution exception: {str(e)}")
+            return ExecuteResult(
+                status="error",
+                prompt_id=prompt_id,
+                msg=f"WebSocket connection or execution exception: {str(e)}",
+                duration=time.time() - start_time
+            )
+        finally:
+            dispatcher.unregister(prompt_id)
+            self._prompt_started_at.pop(prompt_id, None)
+            # Nothing left to wait for on success, drop in-flight transfers on error or timeout
+            transfer_pipeline.cancel()
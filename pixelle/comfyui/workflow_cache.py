@@ -0,0 +1,250 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+Compiled workflow template cache - parse each workflow file once, then patch per request
+"""
+
+import os
+import json
+import hashlib
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterator, Mapping, Optional, Tuple
+
+from pixelle.logger import logger
+from pixelle.comfyui.workflow_parser import WorkflowParser, WorkflowMetadata
+
+# Loader node inputs naming a model file, used to route prompts to backends with the models loaded
+MODEL_INPUT_FIELDS = frozenset({
+    "ckpt_name", "unet_name", "vae_name", "lora_name", "model_name",
+    "clip_name", "clip_name1", "clip_name2", "clip_name3",
+    "control_net_name", "upscale_model_name",
+})
+
+class FrozenDict(dict):
+    """Read-only dict of a compiled template, serialized by `json` like any dict"""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Compiled workflow templates are read-only, patch a graph from `CompiledWorkflow.instantiate()`")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    setdefault = pop = popitem = clear = update = _read_only
+
+    def __copy__(self) -> Dict[str, Any]:
+        return dict(self)
+
+    def __deepcopy__(self, memo) -> Dict[str, Any]:
+        return thaw(self)
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+def freeze(value: Any) -> Any:
+    """Deep read-only copy of a JSON value: dicts become FrozenDict, lists tuples"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Deep mutable copy of a (frozen) JSON value"""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+
+# Templates pinned by the call running in this context (and the tasks it started), by file path
+_pinned_templates: ContextVar[Mapping[str, "CompiledWorkflow"]] = ContextVar("pinned_workflow_templates", default=MappingProxyType({}))
+
+
+@dataclass(frozen=True)
+class CompiledWorkflow:
+    """Compiled workflow template
+    
+    The graph is shared by all requests, it is deep-frozen so an in-place patch raises
+    instead of leaking into later requests. Use `instantiate()` to get a graph that can be patched.
+    """
+    workflow_file: str
+    signature: Tuple[int, int]  # (mtime_ns, size)
+    content_hash: str
+    metadata: WorkflowMetadata
+    graph: Mapping[str, Any]
+    patch_plan: Tuple[Tuple[str, str], ...]  # (node_id, input_field) slots written by params
+    seed_node_ids: FrozenSet[str]  # Nodes having a `seed` input, may be randomized before submission
+    mutable_node_ids: FrozenSet[str]
+    model_slots: Mapping[Tuple[str, str], str]  # (node_id, input_field) -> model file name
+
+    def get_model_names(self, params: Optional[Dict[str, Any]] = None) -> FrozenSet[str]:
+        """Model files loaded by this workflow, taking model parameters of the request into account"""
+        model_names = dict(self.model_slots)
+        for mapping in self.metadata.mapping_info.param_mappings:
+            slot = (mapping.node_id, mapping.input_field)
+            value = (params or {}).get(mapping.param_name)
+            if slot in model_names and isinstance(value, str) and value:
+                model_names[slot] = value
+        return frozenset(model_names.values())
+
+    def has_random_seed(self, params: Optional[Dict[str, Any]] = None) -> bool:
+        """Whether a seed of this workflow will be 0 after applying params, i.e. randomized before submission"""
+        seeds = {node_id: self.graph[node_id]["inputs"].get("seed") for node_id in self.seed_node_ids}
+        for mapping in self.metadata.mapping_info.param_mappings:
+            if mapping.input_field != "seed" or mapping.node_id not in seeds:
+                continue
+            if params and mapping.param_name in params:
+                seeds[mapping.node_id] = params[mapping.param_name]
+            else:
+                param_info = self.metadata.params.get(mapping.param_name)
+                if param_info is not None and param_info.default is not None:
+                    seeds[mapping.node_id] = param_info.default
+        return any(str(seed).strip() == "0" for seed in seeds.values())
+
+    def instantiate(self) -> Dict[str, Any]:
+        """Build a graph for one request
+        
+        Nodes that may change (parameters and seeds) are mutable deep copies, the other nodes
+        stay shared and read-only.
+        """
+        workflow_data = dict(self.graph)
+        for node_id in self.mutable_node_ids:
+            if node_id in workflow_data:
+                workflow_data[node_id] = thaw(workflow_data[node_id])
+        return workflow_data
+
+
+def _get_file_signature(workflow_file: str) -> Tuple[int, int]:
+    stat = os.stat(workflow_file)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def compile_workflow(workflow_file: str, tool_name: Optional[str] = None) -> CompiledWorkflow:
+    """Read, parse and compile a workflow file"""
+    signature = _get_file_signature(workflow_file)
+    with open(workflow_file, 'rb') as f:
+        content = f.read()
+    workflow_data = json.loads(content)
+    
+    # Extract title from file name (remove suffix)
+    title = tool_name or Path(workflow_file).stem
+    metadata = WorkflowParser().parse_workflow(workflow_data, title)
+    
+    patch_plan = tuple(
+        (mapping.node_id, mapping.input_field)
+        for mapping in metadata.mapping_info.param_mappings
+    )
+    seed_node_ids = frozenset(
+        str(node_id)
+        for node_id, node in workflow_data.items()
+        if isinstance(node, dict) and isinstance(node.get("inputs"), dict) and "seed" in node["inputs"]
+    )
+    model_slots = {
+        (str(node_id), field): value
+        for node_id, node in workflow_data.items()
+        if isinstance(node, dict) and isinstance(node.get("inputs"), dict)
+        for field, value in node["inputs"].items()
+        if field in MODEL_INPUT_FIELDS and isinstance(value, str) and value
+    }
+    
+    return CompiledWorkflow(
+        workflow_file=workflow_file,
+        signature=signature,
+        content_hash=hashlib.sha256(content).hexdigest(),
+        metadata=metadata,
+        graph=freeze(workflow_data),
+        patch_plan=patch_plan,
+        seed_node_ids=seed_node_ids,
+        mutable_node_ids=frozenset(node_id for node_id, _ in patch_plan) | seed_node_ids,
+        model_slots=MappingProxyType(model_slots),
+    )
+
+
+class WorkflowTemplateCache:
+    """In-process cache of compiled workflows, keyed by file path and validated by mtime/size"""
+    
+    def __init__(self):
+        self._entries: Dict[str, CompiledWorkflow] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _key(workflow_file: str | Path) -> str:
+        return os.path.abspath(str(workflow_file))
+    
+    def get(self, workflow_file: str | Path) -> CompiledWorkflow:
+        """Get compiled workflow, (re)compile it if the file is new or changed
+        
+        Returns the pinned version instead within a `pin` of the file.
+        """
+        key = self._key(workflow_file)
+        pinned = _pinned_templates.get().get(key)
+        if pinned is not None:
+            return pinned
+        signature = _get_file_signature(key)
+        
+        entry = self._entries.get(key)
+        if entry is not None and entry.signature == signature:
+            self.hits += 1
+            return entry
+        
+        self.misses += 1
+        compiled = compile_workflow(key)
+        with self._lock:
+            self._entries[key] = compiled
+        logger.debug(f"Compiled workflow template: {key}")
+        return compiled
+    
+    @contextmanager
+    def pin(self, workflow_file: str | Path) -> Iterator[Optional[CompiledWorkflow]]:
+        """Keep the current version of a workflow for a call, even if its file is replaced meanwhile
+        
+        Within the block (and the tasks started from it), `get` returns this version, so a
+        hot reload cannot mix the new graph with a call started on the old one. Yields None
+        if the file cannot be compiled, the executor then reports the error.
+        """
+        key = self._key(workflow_file)
+        pinned = _pinned_templates.get()
+        if key in pinned:
+            yield pinned[key]
+            return
+        try:
+            compiled = self.get(key)
+        except Exception:
+            yield None
+            return
+        token = _pinned_templates.set(MappingProxyType({**pinned, key: compiled}))
+        try:
+            yield compiled
+        finally:
+            _pinned_templates.reset(token)
+    
+    def invalidate(self, workflow_file: str | Path):
+        """Drop cached entry of a workflow file"""
+        with self._lock:
+            if self._entries.pop(self._key(workflow_file), None) is not None:
+                logger.debug(f"Invalidated workflow template: {workflow_file}")
+    
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Global workflow template cache
+workflow_template_cache = WorkflowTemplateCache()
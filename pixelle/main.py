@@ -15,6 +15,10 @@ from pixelle.utils.os_util import get_src_path
 from pixelle.utils.openapi_util import create_custom_openapi_function
 from pixelle.mcp_core import mcp
 from pixelle.api.files_api import router as files_router
+from pixelle.api.stats_api import router as stats_router
+from pixelle.comfyui.facade import default_client as comfyui_client
+from pixelle.manager.workflow_manager import workflow_manager
+from pixelle.manager.workflow_watcher import workflow_watcher
 from pixelle.middleware import StaticCacheMiddleware, HTMLCDNReplaceMiddleware, AppJsMiddleware
 
 
@@ -38,7 +42,19 @@ async def combined_lifespan(app: FastAPI):
     async with mcp_app.lifespan(app):
         # start chainlit lifespan
         async with chainlit_lifespan(app):
-            yield
+            # load workflows as MCP tools in background, the port is bound without waiting for them
+            workflow_manager.start_loading()
+            # then hot reload workflow files changed on disk
+            workflow_watcher.start()
+            # re-attach to prompts left unfinished by the previous run
+            comfyui_client.start_recovery()
+            try:
+                yield
+            finally:
+                await workflow_watcher.stop()
+                await workflow_manager.stop_loading()
+                # close pooled ComfyUI sessions
+                await comfyui_client.close()
 
 
 # Create a fastapi application
@@ -81,10 +97,16 @@ app.add_middleware(
 # Load tools modules manually (avoid loading residual files from old installations)
 from pixelle.tools import i_crop
 from pixelle.tools import workflow_manager_tool
+from pixelle.tools import workflow_batch_tool
+if settings.workflow_job_mode:
+    from pixelle.tools import workflow_job_tool
 
 # Register files router
 app.include_router(files_router, prefix="/files")
 
+# Register stats router
+app.include_router(stats_router, prefix="/stats")
+
 # Mount MCP server to `/pixelle` path
 app.mount("/pixelle", mcp_app)
 
@@ -0,0 +1,224 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+Asynchronous workflow jobs: submit now, fetch the result later
+"""
+
+import os
+import time
+import uuid
+import shutil
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from pixelle.logger import logger
+from pixelle.settings import settings
+from pixelle.comfyui.facade import ComfyUIClient, default_client
+from pixelle.comfyui.models import ExecuteResult
+from pixelle.utils.os_util import get_data_path
+
+JOB_DIR = get_data_path("jobs")
+JOB_MAX_IN_MEMORY = settings.job_max_in_memory
+JOB_RESULT_TTL = settings.job_result_ttl
+
+
+@dataclass
+class Job:
+    """One workflow execution running in background"""
+    job_id: str
+    workflow_name: str
+    prompt_id: Optional[str] = None
+    # running, cancelled, or the status of the execution result
+    status: str = "running"
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    msg: Optional[str] = None
+    # None while running, and once spilled to disk
+    result: Optional[ExecuteResult] = None
+    spilled: bool = False
+    task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status != "running"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "workflow": self.workflow_name,
+            "status": self.status,
+            "prompt_id": self.prompt_id,
+            "elapsed": round((self.finished_at or time.time()) - self.created_at, 2),
+            "msg": self.msg,
+        }
+
+
+class JobManager:
+    """Track workflow jobs and keep their results
+
+    At most `max_in_memory` finished results are kept in memory, older ones are
+    spilled to JSON files under `job_dir`. Finished jobs are dropped after `ttl` seconds.
+    """
+
+    def __init__(self, client: ComfyUIClient = default_client, job_dir: str = JOB_DIR,
+                 max_in_memory: int = JOB_MAX_IN_MEMORY, ttl: float = JOB_RESULT_TTL):
+        self.client = client
+        self.job_dir = Path(job_dir)
+        self.max_in_memory = max(0, max_in_memory)
+        self.ttl = ttl
+        self._jobs: Dict[str, Job] = {}
+        # Finished jobs whose result is in memory, least recently finished first
+        self._in_memory: "OrderedDict[str, None]" = OrderedDict()
+        self._job_dir_ready = False
+
+    async def submit(self, workflow_file: str, params: Dict[str, Any] = None) -> Job:
+        """Submit a workflow, return once it is queued
+
+        The job is already finished when nothing was queued (submit error or cached result).
+        """
+        self._expire()
+        run = await self.client.submit_workflow(workflow_file, params)
+        job = Job(
+            job_id=uuid.uuid4().hex,
+            workflow_name=Path(workflow_file).stem,
+            prompt_id=run.submission.prompt_id,
+        )
+        self._jobs[job.job_id] = job
+
+        if run.submission.prompt_id is None:
+            self._finish(job, await self.client.wait_for_result(run))
+        else:
+            job.task = asyncio.create_task(self._wait(job, run))
+            # Let the task start waiting, so cancelling it always reaches the backend
+            await asyncio.sleep(0)
+            logger.info(f"Job {job.job_id} submitted: {job.workflow_name} (prompt_id={job.prompt_id})")
+        return job
+
+    async def _wait(self, job: Job, run):
+        try:
+            result = await self.client.wait_for_result(run)
+        except asyncio.CancelledError:
+            self._finish_cancelled(job)
+            raise
+        except Exception as e:
+            logger.error(f"Job {job.job_id} failed: {e}", exc_info=True)
+            result = ExecuteResult(status="error", prompt_id=job.prompt_id, msg=str(e))
+        self._finish(job, result)
+
+    def _finish(self, job: Job, result: ExecuteResult):
+        job.status = result.status
+        job.msg = result.msg
+        job.result = result
+        job.finished_at = time.time()
+        job.task = None
+        self._in_memory[job.job_id] = None
+        logger.info(f"Job {job.job_id} finished: {job.status}")
+
+        while len(self._in_memory) > self.max_in_memory:
+            job_id, _ = self._in_memory.popitem(last=False)
+            spilled_job = self._jobs.get(job_id)
+            if spilled_job is not None:
+                self._spill(spilled_job)
+
+    def _finish_cancelled(self, job: Job):
+        if not job.finished:
+            self._finish(job, ExecuteResult(status="cancelled", prompt_id=job.prompt_id, msg="Job cancelled"))
+
+    def _spill(self, job: Job):
+        """Move a finished result from memory to disk"""
+        if job.result is None:
+            return
+        try:
+            self._ensure_job_dir()
+            (self.job_dir / f"{job.job_id}.json").write_text(job.result.model_dump_json(), encoding="utf-8")
+            job.result = None
+            job.spilled = True
+        except Exception as e:
+            logger.warning(f"Failed to spill result of job {job.job_id}, keep it in memory: {e}")
+
+    def _ensure_job_dir(self):
+        if self._job_dir_ready:
+            return
+        # Jobs don't outlive the process, results spilled by a previous run can't be looked up anymore
+        if self.job_dir.exists():
+            shutil.rmtree(self.job_dir, ignore_errors=True)
+        self.job_dir.mkdir(parents=True, exist_ok=True)
+        self._job_dir_ready = True
+
+    def _expire(self):
+        """Drop finished jobs older than ttl"""
+        if self.ttl <= 0:
+            return
+        deadline = time.time() - self.ttl
+        for job in [job for job in self._jobs.values() if job.finished and job.finished_at < deadline]:
+            self._drop(job)
+
+    def _drop(self, job: Job):
+        self._jobs.pop(job.job_id, None)
+        self._in_memory.pop(job.job_id, None)
+        if job.spilled:
+            try:
+                os.remove(self.job_dir / f"{job.job_id}.json")
+            except OSError:
+                pass
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        self._expire()
+        return self._jobs.get(job_id)
+
+    def get_result(self, job_id: str) -> Optional[ExecuteResult]:
+        """Get the result of a finished job, None if unknown or still running"""
+        job = self.get_job(job_id)
+        if job is None or not job.finished:
+            return None
+        if job.result is not None:
+            return job.result
+        try:
+            return ExecuteResult.model_validate_json((self.job_dir / f"{job.job_id}.json").read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.error(f"Failed to read spilled result of job {job_id}: {e}")
+            return ExecuteResult(status="error", prompt_id=job.prompt_id, msg=f"Result of job {job_id} is lost: {e}")
+
+    def to_llm_result(self, job: Job) -> str:
+        """Convert a job to a result string readable by LLM"""
+        if not job.finished:
+            return (
+                f"Workflow submitted as job {job.job_id} and running in background. "
+                f"Call get_job_status or get_job_result with job_id={job.job_id} to get its result"
+            )
+        result = self.get_result(job.job_id)
+        if result is not None and result.status == "completed":
+            return result.to_llm_result()
+        return "Workflow execution failed: " + str(job.msg or job.status)
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a running job, None if unknown"""
+        job = self.get_job(job_id)
+        if job is None:
+            return None
+        if not job.finished and job.task is not None:
+            task = job.task
+            task.cancel()
+            await asyncio.wait([task])
+            # A task cancelled before it started never ran its handler
+            self._finish_cancelled(job)
+        return job
+
+    def get_stats(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for job in self._jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            "jobs": len(self._jobs),
+            "statuses": statuses,
+            "results_in_memory": len(self._in_memory),
+            "results_spilled": sum(1 for job in self._jobs.values() if job.spilled),
+        }
+
+
+# Global job manager
+job_manager = JobManager()
@@ -3,151 +3,109 @@
 
 from datetime import datetime
 import os
+import asyncio
+import concurrent.futures
 import time
 import re
 import json
 import tempfile
 from pathlib import Path
-from typing import Dict, Any, Optional
-from pydantic import Field
+from typing import Dict, Any, List, Optional
 from pixelle.logger import logger
 from pixelle.mcp_core import mcp
 from pixelle.utils.os_util import get_data_path
 from pixelle.comfyui.workflow_parser import WorkflowParser, WorkflowMetadata
-from pixelle.comfyui.facade import execute_workflow
-from pixelle.utils.runninghub_util import is_runninghub_workflow, fetch_runninghub_workflow_metadata
+from pixelle.comfyui.workflow_cache import workflow_template_cache
+from pixelle.settings import settings
+from pixelle.comfyui.runninghub_metadata_cache import runninghub_metadata_cache
+from pixelle.manager.workflow_manifest import WorkflowManifest, workflow_manifest
+from pixelle.manager.workflow_tool import WorkflowTool
+from pixelle.utils.runninghub_util import fetch_runninghub_workflow_metadata
 
 CUSTOM_WORKFLOW_DIR = get_data_path("custom_workflows")
 os.makedirs(CUSTOM_WORKFLOW_DIR, exist_ok=True)
+WORKFLOW_LOAD_CONCURRENCY = settings.workflow_load_concurrency
 
 class WorkflowManager:
     """Workflow manager, support dynamic loading and hot update"""
     
-    def __init__(self, workflows_dir: str = CUSTOM_WORKFLOW_DIR):
+    def __init__(self, workflows_dir: str = CUSTOM_WORKFLOW_DIR, manifest: WorkflowManifest = workflow_manifest):
         self.workflows_dir = Path(workflows_dir)
         self.loaded_workflows = {}
+        self.manifest = manifest
+        # Background loading of all workflows at server startup, see `start_loading()`
+        self._loading_task: Optional[asyncio.Task] = None
+        self._loading_status: Dict[str, Any] = {
+            "ready": False,
+            "total": 0,
+            "loaded": 0,
+            "failed": 0,
+            "seconds": None,
+        }
 
     
-    def parse_workflow_metadata(self, workflow_path: Path, tool_name: str = None) -> Optional[WorkflowMetadata]:
-        """Parse workflow metadata using new workflow parser"""
+    async def parse_workflow_metadata(self, workflow_path: Path, tool_name: str = None) -> Optional[WorkflowMetadata]:
+        """Parse workflow metadata using new workflow parser, RunningHub workflows are fetched on the running loop"""
+        metadata, _ = await self._parse_workflow(workflow_path, tool_name)
+        return metadata
+    
+    async def _parse_workflow(self, workflow_path: Path, tool_name: str = None) -> tuple[Optional[WorkflowMetadata], Optional[Dict[str, Any]]]:
+        """Parse workflow metadata, with the tool parameters schema if the workflow is unchanged since it was recorded in the manifest"""
         try:
-            # Check if this is a RunningHub workflow file
-            if is_runninghub_workflow(workflow_path):
-                # Import asyncio for running async function
-                import asyncio
-
-                tool_name = tool_name or workflow_path.stem
-                # Run the async function
-                try:
-                    loop = asyncio.get_running_loop()
-                    # If we're already in an async context, create a new task
-                    import concurrent.futures
-                    with concurrent.futures.ThreadPoolExecutor() as executor:
-                        future = executor.submit(asyncio.run, fetch_runninghub_workflow_metadata(workflow_path, tool_name))
-                        return future.result()
-                except RuntimeError:
-                    # No running loop, we can use asyncio.run
-                    return asyncio.run(fetch_runninghub_workflow_metadata(workflow_path, tool_name))
-            else:
-                # Standard ComfyUI workflow
-                parser = WorkflowParser()
-                metadata = parser.parse_workflow_file(str(workflow_path), tool_name)
-                return metadata
+            # Read and parse local files in a worker thread, None for RunningHub workflow files
+            metadata, parameters = await asyncio.to_thread(self._parse_local_workflow, workflow_path, tool_name)
+            if metadata is None:
+                return await fetch_runninghub_workflow_metadata(workflow_path, tool_name or workflow_path.stem), None
+            return metadata, parameters
         except Exception as e:
             logger.error(f"Failed to parse workflow metadata for {workflow_path}: {e}")
-            return None
-    
+            return None, None
     
-    def _generate_params_str(self, params: Dict[str, Any]) -> str:
-        """Generate function parameter string"""
-        # Separate required parameters and optional parameters, ensure parameter order is correct
-        required_params = []
-        optional_params = []
-        
-        for param_name, param in params.items():
-            # Directly use user-provided description
-            description = param.description or ''
-            
-            # Generate Field parameter list
-            field_args = [f"description={repr(description)}"]
-            if param.default is not None:
-                field_args.append(f"default={repr(param.default)}")
-            
-            # Generate complete parameter definition
-            param_str = f"{param_name}: {param.type} = Field({', '.join(field_args)})"
-            
-            # Classify parameters based on whether they have default values
-            if param.default is not None:
-                optional_params.append(param_str)
-            else:
-                required_params.append(param_str)
+    def _parse_local_workflow(self, workflow_path: Path, tool_name: str = None) -> tuple[Optional[WorkflowMetadata], Optional[Dict[str, Any]]]:
+        """Parse a standard ComfyUI workflow file, (None, None) if it is a RunningHub workflow file"""
+        if self._in_workflows_dir(workflow_path):
+            entry = self.manifest.get(workflow_path, tool_name)
+            if entry is not None:
+                if entry["runninghub"]:
+                    return None, None
+                return WorkflowMetadata.model_validate(entry["metadata"]), entry["parameters"]
         
-        # Required parameters first, optional parameters last
-        return ", ".join(required_params + optional_params)
+        with open(workflow_path, 'r', encoding='utf-8') as f:
+            workflow_data = json.load(f)
+        if workflow_data.get("_source") == "runninghub":
+            return None, None
+        return WorkflowParser().parse_workflow(workflow_data, tool_name or Path(workflow_path).stem), None
     
-    def _generate_workflow_function(self, title: str, params_str: str) -> tuple[str, str]:
-        """Generate the workflow execution function code
-        
-        Returns:
-            tuple: (function_code, workflow_path) - Function code and workflow path
-        """
-        final_workflow_path = os.path.join(CUSTOM_WORKFLOW_DIR, f"{title}.json")
-        
-        template = '''async def {title}({params_str}):
-    try:
-        # Get the passed parameters (excluding special parameters)
-        params = {{k: v for k, v in locals().items() if not k.startswith('_')}}
-        
-        # Execute the workflow - workflow_path is retrieved from the external environment
-        result = await execute_workflow(WORKFLOW_PATH, params)
-        
-        # Convert the result to a format friendly to LLM
-        if result.status == "completed":
-            return result.to_llm_result()
-        else:
-            return "Workflow execution failed: " + str(result.msg or result.status)
-            
-    except Exception as e:
-        logger.error("Workflow execution failed {title_safe}: " + str(e), exc_info=True)
-        return "Workflow execution exception: " + str(e)
-'''
-
-        function_code = template.format(
-            title=title,
-            params_str=params_str,
-            title_safe=repr(title)
-        )
-        
-        return function_code, final_workflow_path
-
-
-    def _register_workflow(self, title: str, workflow_handler, metadata: WorkflowMetadata) -> None:
+    def _in_workflows_dir(self, workflow_path: Path) -> bool:
+        return os.path.abspath(os.path.dirname(workflow_path)) == os.path.abspath(self.workflows_dir)
+    
+    def _register_workflow(self, title: str, tool: WorkflowTool, metadata: Dict[str, Any]) -> None:
         """Register and record workflow"""
         
-        # Register as MCP tool
-        mcp.tool(workflow_handler)
+        # Register as MCP tool, replaces the previous version of the tool if any
+        mcp.add_tool(tool)
         
         # Record workflow information
         self.loaded_workflows[title] = {
-            "function": workflow_handler,
-            "metadata": metadata.model_dump(),
+            "tool": tool,
+            "metadata": metadata,
             "loaded_at": datetime.now()
         }
         
-        logger.info(f"Successfully loaded workflow: {title}")
+        logger.debug(f"Successfully loaded workflow: {title}")
     
     def _save_workflow_if_needed(self, workflow_path: Path, title: str):
         """If needed, save workflow file to workflow directory"""
         target_workflow_path = self.workflows_dir / f"{title}.json"
         try:
-            # Ensure workflow directory exists
-            self.workflows_dir.mkdir(parents=True, exist_ok=True)
-
             # Skip if source and target file are the same
             if os.path.abspath(str(workflow_path)) == os.path.abspath(str(target_workflow_path)):
                 logger.debug(f"Workflow file already exists and path is the same, no need to copy: {target_workflow_path}")
                 return
 
+            # Ensure workflow directory exists
+            self.workflows_dir.mkdir(parents=True, exist_ok=True)
+
             # Copy workflow file to workflow directory
             import shutil
             shutil.copy2(workflow_path, target_workflow_path)
@@ -156,13 +114,13 @@ class WorkflowManager:
             logger.warning(f"Failed to save workflow file: {e}")
         
 
-    def load_workflow(self, workflow_path: Path | str, tool_name: str = None) -> Dict:
+    async def load_workflow(self, workflow_path: Path | str, tool_name: str = None, save_manifest: bool = True) -> Dict:
         """Load single workflow
         
         Args:
             workflow_path: Workflow file path
             tool_name: Tool name, priority higher than workflow file name
-            save_workflow_if_not_exists: Whether to save workflow file to workflow directory (if target file does not exist)
+            save_manifest: Whether to write the workflow manifest, False when loading many workflows at once
         """
         try:
             if isinstance(workflow_path, str):
@@ -176,8 +134,8 @@ class WorkflowManager:
                     "error": f"Workflow file does not exist: {workflow_path}"
                 }
             
-            # Use new parser to parse workflow metadata
-            metadata = self.parse_workflow_metadata(workflow_path, tool_name)
+            # Use new parser to parse workflow metadata, unchanged workflows come from the manifest
+            metadata, parameters = await self._parse_workflow(workflow_path, tool_name)
             if not metadata:
                 logger.error(f"Cannot parse workflow metadata: {workflow_path}")
                 return {
@@ -196,38 +154,30 @@ class WorkflowManager:
                     "error": f"Tool name '{title}' format is invalid. Only letters, digits, underscores, dots, and hyphens are allowed."
                 }
             
-            # Generate parameter string
-            params_str = self._generate_params_str(metadata.params)
-            
-            # Create tool handler function
-            exec_locals = {}
-            
-            # Generate workflow execution function
-            func_def, target_workflow_path = self._generate_workflow_function(title, params_str)
-            # Execute function definition, pass workflow path as variable to execution environment
-            exec(func_def, {
-                "metadata": metadata, 
-                "logger": logger, 
-                "Field": Field,
-                "execute_workflow": execute_workflow,
-                "WORKFLOW_PATH": target_workflow_path,
-            }, exec_locals)
-            
-            dynamic_function = exec_locals[title]
-            if metadata.description:
-                dynamic_function.__doc__ = metadata.description
+            # Build the tool from the parameters, the schema is reused from the manifest if unchanged
+            target_workflow_path = os.path.join(CUSTOM_WORKFLOW_DIR, f"{title}.json")
+            tool = WorkflowTool.from_params(title, metadata.description, target_workflow_path, metadata.params, parameters)
+            metadata_dict = metadata.model_dump()
             
             # Register and record workflow
-            self._register_workflow(title, dynamic_function, metadata)
+            self._register_workflow(title, tool, metadata_dict)
             
             # Save workflow file to workflow directory
             self._save_workflow_if_needed(workflow_path, title)
             
+            # Drop compiled template of the previous version (hot update)
+            workflow_template_cache.invalidate(target_workflow_path)
+            
+            # Record it, so it is not parsed again on next startup while the file is unchanged
+            self.manifest.put(self.workflows_dir / f"{title}.json", metadata_dict, tool.parameters)
+            if save_manifest:
+                self.manifest.save()
+            
             logger.debug(f"Workflow '{title}' successfully loaded as MCP tool")
             return {
                 "success": True,
                 "workflow": title,
-                "metadata": metadata.model_dump(),
+                "metadata": metadata_dict,
                 "message": f"Workflow '{title}' successfully loaded as MCP tool"
             }
             
@@ -255,6 +205,9 @@ class WorkflowManager:
             workflow_path = os.path.join(CUSTOM_WORKFLOW_DIR, f"{workflow_name}.json")
             if os.path.exists(workflow_path):
                 os.remove(workflow_path)
+            workflow_template_cache.invalidate(workflow_path)
+            self.manifest.remove(workflow_path)
+            self.manifest.save()
             
             # Delete from record
             del self.loaded_workflows[workflow_name]
@@ -275,8 +228,8 @@ class WorkflowManager:
             }
     
     
-    def load_all_workflows(self) -> Dict:
-        """Load all workflows"""
+    async def load_all_workflows(self) -> Dict:
+        """Load all workflows concurrently, each tool is registered as soon as its workflow is parsed"""
         results = {
             "success": [],
             "failed": []
@@ -285,19 +238,83 @@ class WorkflowManager:
         # Ensure directory exists
         self.workflows_dir.mkdir(parents=True, exist_ok=True)
         
-        # Load all JSON files
-        for json_file in self.workflows_dir.glob("*.json"):
-            result = self.load_workflow(json_file)
+        json_files = sorted(self.workflows_dir.glob("*.json"))
+        status = self._loading_status
+        status.update(ready=False, total=len(json_files), loaded=0, failed=0, seconds=None)
+        semaphore = asyncio.Semaphore(max(1, WORKFLOW_LOAD_CONCURRENCY))
+        timings = {}
+        manifest_hits = self.manifest.hits
+        start = time.perf_counter()
+        
+        async def load(json_file: Path):
+            async with semaphore:
+                file_start = time.perf_counter()
+                result = await self.load_workflow(json_file, save_manifest=False)
+                timings[json_file.name] = time.perf_counter() - file_start
             if result["success"]:
+                status["loaded"] += 1
                 results["success"].append(result["workflow"])
+                logger.info(f"Loaded workflow {result['workflow']} in {timings[json_file.name] * 1000:.0f} ms")
             else:
+                status["failed"] += 1
                 results["failed"].append({
                     "file": json_file.name,
                     "error": result["error"]
                 })
         
+        # Load all JSON files
+        await asyncio.gather(*(load(json_file) for json_file in json_files))
+        
+        self.manifest.prune(json_file.name for json_file in json_files)
+        await asyncio.to_thread(self.manifest.save)
+        
+        status.update(ready=True, seconds=round(time.perf_counter() - start, 3))
+        slowest = sorted(timings.items(), key=lambda item: item[1], reverse=True)[:3]
+        logger.info(
+            f"Loaded {status['loaded']} workflows ({status['failed']} failed, {self.manifest.hits - manifest_hits} unchanged) in {status['seconds']:.2f}s"
+            + (f", slowest: {', '.join(f'{name} {seconds * 1000:.0f} ms' for name, seconds in slowest)}" if slowest else "")
+        )
         return results
     
+    def start_loading(self) -> asyncio.Task:
+        """Load all workflows in background on the running loop, e.g. while the server starts accepting requests"""
+        if self._loading_task is None or self._loading_task.done():
+            self._loading_task = asyncio.create_task(self._load_in_background())
+        return self._loading_task
+    
+    async def _load_in_background(self):
+        try:
+            results = await self.load_all_workflows()
+            logger.info(f"Initial workflow load results: {results}")
+        except Exception as e:
+            logger.error(f"Initial workflow loading failed: {e}", exc_info=True)
+            self._loading_status["ready"] = True
+    
+    async def stop_loading(self):
+        """Cancel background loading (on shutdown)"""
+        task = self._loading_task
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.wait([task])
+    
+    @property
+    def ready(self) -> bool:
+        """Whether all workflows have been loaded (successfully or not)"""
+        return self._loading_status["ready"]
+    
+    async def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Wait for background loading to finish, return whether workflows are ready"""
+        task = self._loading_task
+        if task is not None and not task.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.ready
+    
+    def get_loading_status(self) -> Dict[str, Any]:
+        return dict(self._loading_status)
+    
     def get_workflow_status(self) -> Dict:
         """Get all workflow status"""
         return {
@@ -311,21 +328,26 @@ class WorkflowManager:
             }
         }
     
-    def reload_all_workflows(self) -> Dict:
-        """Manually reload all workflows"""
-        logger.info("Start manually reloading all workflows")
+    async def reload_all_workflows(self) -> Dict:
+        """Manually reload all workflows, all files are parsed and RunningHub workflows fetched again
         
-        # Clear all loaded workflows
-        for workflow_name in list(self.loaded_workflows.keys()):
-            try:
-                mcp.remove_tool(workflow_name)
-            except:
-                pass  # Ignore remove failure
+        Tools are replaced in place and only the ones whose file is gone are removed, so the
+        other tools stay available during the reload.
+        """
+        logger.info("Start manually reloading all workflows")
         
-        self.loaded_workflows.clear()
+        previous_workflows = set(self.loaded_workflows.keys())
+        workflow_template_cache.clear()
+        runninghub_metadata_cache.invalidate()
+        self.manifest.clear()
         
         # Reload all workflows
-        results = self.load_all_workflows()
+        results = await self.load_all_workflows()
+        
+        # Remove the workflows that no longer exist
+        for workflow_name in previous_workflows - set(results["success"]):
+            if not (self.workflows_dir / f"{workflow_name}.json").exists():
+                self._remove_workflow(workflow_name)
         
         logger.info(f"Manually reloading completed: success {len(results['success'])}, failed {len(results['failed'])}")
         
@@ -335,16 +357,94 @@ class WorkflowManager:
             "results": results
         }
     
+    def _remove_workflow(self, workflow_name: str):
+        """Remove a loaded workflow tool, its file is kept"""
+        try:
+            mcp.remove_tool(workflow_name)
+        except Exception:
+            pass  # Ignore remove failure
+        self.loaded_workflows.pop(workflow_name, None)
+        workflow_path = self.workflows_dir / f"{workflow_name}.json"
+        workflow_template_cache.invalidate(str(workflow_path))
+        self.manifest.remove(workflow_path)
+        logger.info(f"Removed workflow: {workflow_name}")
+    
+    async def apply_changes(self, changed_files: List[str], deleted_files: List[str]) -> Dict:
+        """Load the new or modified workflow files and remove the tools of deleted ones, by file name
+        
+        A modified workflow replaces its tool in one step, calls already running keep the
+        previous version. Files already loaded and unchanged since (e.g. saved by `load_workflow`
+        itself) are skipped.
+        """
+        results = {
+            "loaded": [],
+            "removed": [],
+            "failed": []
+        }
+        semaphore = asyncio.Semaphore(max(1, WORKFLOW_LOAD_CONCURRENCY))
+        
+        async def load(file_name: str):
+            workflow_path = self.workflows_dir / file_name
+            if workflow_path.stem in self.loaded_workflows and self.manifest.get(workflow_path) is not None:
+                return
+            async with semaphore:
+                result = await self.load_workflow(workflow_path, save_manifest=False)
+            if result["success"]:
+                results["loaded"].append(result["workflow"])
+            else:
+                # A broken file does not take the previous version of the tool down
+                results["failed"].append({
+                    "file": file_name,
+                    "error": result["error"]
+                })
+        
+        await asyncio.gather(*(load(file_name) for file_name in changed_files))
+        for file_name in deleted_files:
+            workflow_name = Path(file_name).stem
+            if workflow_name in self.loaded_workflows:
+                self._remove_workflow(workflow_name)
+                results["removed"].append(workflow_name)
+        await asyncio.to_thread(self.manifest.save)
+        
+        if results["loaded"] or results["removed"] or results["failed"]:
+            logger.info(
+                f"Workflows changed on disk: loaded {results['loaded']}, removed {results['removed']}, "
+                f"failed {[failure['file'] for failure in results['failed']]}"
+            )
+        return results
+    
+    # Sync wrappers, for the CLI only
 
+    @staticmethod
+    def _run_sync(coro):
+        """Run a coroutine to completion from sync code
+        
+        Inside a running event loop (sync code called from async code) the coroutine runs
+        on its own loop in a worker thread, async callers should await the coroutine instead.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coro).result()
+    
+    def load_workflow_sync(self, workflow_path: Path | str, tool_name: str = None) -> Dict:
+        """Sync version of `load_workflow`"""
+        return self._run_sync(self.load_workflow(workflow_path, tool_name))
+    
+    def load_all_workflows_sync(self) -> Dict:
+        """Sync version of `load_all_workflows`"""
+        return self._run_sync(self.load_all_workflows())
+    
+    def reload_all_workflows_sync(self) -> Dict:
+        """Sync version of `reload_all_workflows`"""
+        return self._run_sync(self.reload_all_workflows())
 
 
-
-# Create workflow manager instance
+# Create workflow manager instance, workflows are loaded by the server on startup (`start_loading()`)
+# or by the CLI (`load_all_workflows_sync()`)
 workflow_manager = WorkflowManager()
 
-# Initial load all workflows
-load_results = workflow_manager.load_all_workflows()
-logger.info(f"Initial workflow load results: {load_results}")
-
 # Export module-level variables and instance
 __all__ = ['workflow_manager', 'WorkflowManager', 'CUSTOM_WORKFLOW_DIR'] 
\ No newline at end of file
@@ -0,0 +1,184 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+Persistent manifest of the parsed workflows in custom_workflows, unchanged files are not parsed again on startup
+"""
+
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from pixelle.logger import logger
+from pixelle.settings import settings
+from pixelle.utils.os_util import get_data_path
+
+# Outside custom_workflows, so it is not loaded as a workflow
+WORKFLOW_MANIFEST_PATH = get_data_path("workflow_manifest.json")
+WORKFLOW_MANIFEST_ENABLED = settings.workflow_manifest_enabled
+# Bump when the manifest layout, the workflow parser or the generated tools change, older manifests are dropped
+MANIFEST_VERSION = 2
+
+
+def file_digest(path: Path | str) -> str:
+    """SHA-256 of a file content"""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class WorkflowManifest:
+    """Parsed metadata and tool parameters schema of each workflow file, by file name
+
+    An entry is used while the file keeps its size and mtime, or its content hash when only
+    the mtime changed (e.g. copied again). RunningHub entries only record the file, their
+    metadata is cached by `RunningHubMetadataCache`.
+    """
+
+    def __init__(self, path: str = WORKFLOW_MANIFEST_PATH, enabled: bool = WORKFLOW_MANIFEST_ENABLED):
+        self.path = Path(path)
+        self.enabled = enabled
+        # File name -> entry, read from disk on first use
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._dirty = False
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            if self._entries is not None:
+                return self._entries
+            self._entries = {}
+            if not self.enabled:
+                return self._entries
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    self._entries = data.get("workflows", {})
+                else:
+                    logger.info(f"Workflow manifest {self.path} is outdated, all workflows are parsed again")
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Failed to read workflow manifest {self.path}: {e}")
+            return self._entries
+
+    def get(self, workflow_path: Path | str, tool_name: str = None) -> Optional[Dict[str, Any]]:
+        """Get the entry of an unchanged workflow file loaded as `tool_name`, None if new or modified"""
+        if not self.enabled:
+            return None
+        workflow_path = Path(workflow_path)
+        tool_name = tool_name or workflow_path.stem
+        with self._lock:
+            entry = self._load().get(workflow_path.name)
+        if entry is None or entry.get("tool_name") != tool_name:
+            self.misses += 1
+            return None
+
+        try:
+            stat = workflow_path.stat()
+            if stat.st_size != entry["size"]:
+                self.misses += 1
+                return None
+            if stat.st_mtime_ns != entry["mtime_ns"]:
+                # Touched or copied again, still the same workflow if the content did not change
+                if file_digest(workflow_path) != entry["sha256"]:
+                    self.misses += 1
+                    return None
+                with self._lock:
+                    entry["mtime_ns"] = stat.st_mtime_ns
+                    self._dirty = True
+        except Exception:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, workflow_path: Path | str, metadata: Dict[str, Any], parameters: Dict[str, Any]):
+        """Record a loaded workflow file, its content is hashed unless it is unchanged since the last record"""
+        if not self.enabled:
+            return
+        workflow_path = Path(workflow_path)
+        try:
+            stat = workflow_path.stat()
+            with self._lock:
+                previous = self._load().get(workflow_path.name)
+            if previous is not None and (previous["size"], previous["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+                digest = previous["sha256"]
+            else:
+                digest = file_digest(workflow_path)
+        except Exception as e:
+            logger.warning(f"Failed to record workflow {workflow_path} in manifest: {e}")
+            return
+
+        entry = {
+            "tool_name": metadata["title"],
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest,
+            "runninghub": metadata["is_runninghub"],
+            "metadata": metadata,
+            "parameters": parameters,
+        }
+        with self._lock:
+            if previous != entry:
+                self._entries[workflow_path.name] = entry
+                self._dirty = True
+
+    def remove(self, workflow_path: Path | str):
+        with self._lock:
+            if self._load().pop(Path(workflow_path).name, None) is not None:
+                self._dirty = True
+
+    def prune(self, file_names: Iterable[str]):
+        """Drop the entries of files that no longer exist"""
+        keep = set(file_names)
+        with self._lock:
+            entries = self._load()
+            for name in [name for name in entries if name not in keep]:
+                del entries[name]
+                self._dirty = True
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._dirty = True
+
+    def items(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return dict(self._load())
+
+    def save(self):
+        """Write the manifest if it changed since the last save"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"version": MANIFEST_VERSION, "workflows": self._load()}
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                # Write then rename, so a concurrent reader (the CLI) never sees a partial file
+                tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except Exception as e:
+                logger.warning(f"Failed to write workflow manifest {self.path}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries or {}),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Global workflow manifest
+workflow_manifest = WorkflowManifest()
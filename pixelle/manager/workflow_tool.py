@@ -0,0 +1,143 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+MCP tools of workflows, built from the parsed workflow parameters instead of generated functions
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple, Type
+
+from fastmcp.tools.tool import Tool, ToolResult
+from pydantic import BaseModel, ConfigDict, Field, create_model
+
+from pixelle.logger import logger
+from pixelle.settings import settings
+from pixelle.comfyui.facade import execute_workflow
+from pixelle.comfyui.workflow_cache import workflow_template_cache
+from pixelle.comfyui.workflow_parser import WorkflowParam
+from pixelle.utils.runninghub_util import is_runninghub_workflow
+from pixelle.manager.job_manager import job_manager
+
+WORKFLOW_JOB_MODE = settings.workflow_job_mode
+
+# Parameter type in workflow metadata -> (Python type, JSON schema type)
+PARAM_TYPES: Dict[str, Tuple[type, str]] = {
+    "str": (str, "string"),
+    "int": (int, "integer"),
+    "float": (float, "number"),
+    "bool": (bool, "boolean"),
+}
+
+# (name, type, default) of each parameter, required ones first
+Signature = Tuple[Tuple[str, str, Any], ...]
+
+
+def _ordered_params(params: Dict[str, WorkflowParam]) -> list[WorkflowParam]:
+    """Required parameters (no default value) first, then optional ones"""
+    required = [param for param in params.values() if param.default is None]
+    optional = [param for param in params.values() if param.default is not None]
+    return required + optional
+
+
+def build_parameters_schema(params: Dict[str, WorkflowParam]) -> Dict[str, Any]:
+    """JSON schema of the tool arguments, the same FastMCP generated from the former tool functions"""
+    properties = {}
+    required = []
+    for param in _ordered_params(params):
+        prop = {}
+        if param.default is not None:
+            prop["default"] = param.default
+        else:
+            required.append(param.name)
+        prop["description"] = param.description or ''
+        prop["title"] = param.name.title().replace('_', ' ')
+        prop["type"] = PARAM_TYPES.get(param.type, PARAM_TYPES["str"])[1]
+        properties[param.name] = prop
+
+    schema: Dict[str, Any] = {"properties": properties}
+    if required:
+        schema["required"] = required
+    schema["type"] = "object"
+    return schema
+
+
+def _signature(schema: Dict[str, Any]) -> Signature:
+    json_types = {json_type: name for name, (_, json_type) in PARAM_TYPES.items()}
+    return tuple(
+        (name, json_types.get(prop.get("type"), "str"), prop.get("default"))
+        for name, prop in schema["properties"].items()
+    )
+
+
+@lru_cache(maxsize=1024)
+def _arguments_model(signature: Signature) -> Type[BaseModel]:
+    """Pydantic model validating tool arguments, shared by the tools with the same parameters
+
+    Fields are named by position and aliased by parameter name, so any parameter name works
+    (keywords, names of BaseModel attributes).
+    """
+    fields = {}
+    for index, (name, param_type, default) in enumerate(signature):
+        python_type = PARAM_TYPES.get(param_type, PARAM_TYPES["str"])[0]
+        fields[f"p{index}"] = (python_type, Field(... if default is None else default, alias=name))
+    return create_model(
+        "WorkflowArguments",
+        __config__=ConfigDict(populate_by_name=False, extra="ignore"),
+        **fields,
+    )
+
+
+async def run_workflow(title: str, workflow_path: str, params: Dict[str, Any]) -> str:
+    """Shared handler of all workflow tools, returns a result string readable by LLM"""
+    try:
+        if WORKFLOW_JOB_MODE:
+            # Submit the workflow as a background job, the result is fetched with get_job_result
+            job = await job_manager.submit(workflow_path, params)
+            return job_manager.to_llm_result(job)
+
+        result = await execute_workflow(workflow_path, params)
+        if result.status == "completed":
+            return result.to_llm_result()
+        return "Workflow execution failed: " + str(result.msg or result.status)
+    except Exception as e:
+        logger.error(f"Workflow execution failed {title!r}: {e}", exc_info=True)
+        return "Workflow execution exception: " + str(e)
+
+
+class WorkflowTool(Tool):
+    """MCP tool of a workflow, its arguments are validated against the workflow parameters"""
+
+    workflow_path: str
+
+    @classmethod
+    def from_params(cls, title: str, description: Optional[str], workflow_path: str,
+                    params: Dict[str, WorkflowParam], parameters: Optional[Dict[str, Any]] = None) -> "WorkflowTool":
+        """Build the tool of a workflow, `parameters` is a schema built before (e.g. from the manifest)"""
+        return cls(
+            name=title,
+            description=description,
+            parameters=parameters if parameters is not None else build_parameters_schema(params),
+            workflow_path=workflow_path,
+        )
+
+    def validate_arguments(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Workflow parameters of a call: required ones checked, values coerced, defaults applied
+
+        Raises:
+            pydantic.ValidationError: If the arguments do not match the parameters
+        """
+        model = _arguments_model(_signature(self.parameters))
+        return model.model_validate(arguments).model_dump(by_alias=True)
+
+    async def run(self, arguments: Dict[str, Any]) -> ToolResult:
+        params = self.validate_arguments(arguments)
+        if is_runninghub_workflow(self.workflow_path):
+            return ToolResult(content=await run_workflow(self.name, self.workflow_path, params))
+        
+        # The call executes the version of the workflow it started with, even if it is hot reloaded meanwhile
+        with workflow_template_cache.pin(self.workflow_path) as compiled:
+            if compiled is not None and build_parameters_schema(compiled.metadata.params) != self.parameters:
+                # The file changed, the tool with the new parameters is about to replace this one
+                return ToolResult(content=f"Workflow '{self.name}' was just changed and is being reloaded, call it again")
+            return ToolResult(content=await run_workflow(self.name, self.workflow_path, params))
@@ -0,0 +1,145 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+Watch custom_workflows and hot reload only the workflows whose file was added, modified or deleted
+"""
+
+import os
+import asyncio
+from typing import Dict, Optional, Tuple
+
+from pixelle.logger import logger
+from pixelle.settings import settings
+from pixelle.manager.workflow_manager import WorkflowManager, workflow_manager
+
+WORKFLOW_WATCH_ENABLED = settings.workflow_watch_enabled
+WORKFLOW_WATCH_INTERVAL = settings.workflow_watch_interval
+WORKFLOW_WATCH_DEBOUNCE = settings.workflow_watch_debounce
+# With watchdog, the directory is still rescanned this often in case an event was missed
+WATCHDOG_RESCAN_INTERVAL = 60.0
+
+# File name -> (size, mtime_ns)
+Snapshot = Dict[str, Tuple[int, int]]
+
+
+class WorkflowWatcher:
+    """Apply changes of the workflow directory to the loaded workflows
+
+    The directory is polled every `interval` seconds, or woken up by file system events
+    if `watchdog` is installed. Changes are applied once the directory has been quiet for
+    `debounce` seconds, so a burst of copies is loaded at once and half-written files are
+    not parsed.
+    """
+
+    def __init__(self, manager: WorkflowManager = workflow_manager,
+                 interval: float = WORKFLOW_WATCH_INTERVAL, debounce: float = WORKFLOW_WATCH_DEBOUNCE):
+        self.manager = manager
+        self.interval = interval
+        self.debounce = debounce
+        self._task: Optional[asyncio.Task] = None
+        self._changed: Optional[asyncio.Event] = None
+        self._observer = None
+
+    def _snapshot(self) -> Snapshot:
+        snapshot = {}
+        try:
+            with os.scandir(self.manager.workflows_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".json") and entry.is_file():
+                        stat = entry.stat()
+                        snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            pass
+        return snapshot
+
+    def start(self) -> Optional[asyncio.Task]:
+        """Start watching on the running loop, after the initial workflow loading"""
+        if not WORKFLOW_WATCH_ENABLED:
+            return None
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        task = self._task
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.wait([task])
+
+    def _start_observer(self) -> bool:
+        """Wake the watcher up on file system events, False if watchdog is not installed"""
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            return False
+
+        loop = asyncio.get_running_loop()
+        changed = self._changed
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                loop.call_soon_threadsafe(changed.set)
+
+        try:
+            self._observer = Observer()
+            self._observer.schedule(Handler(), str(self.manager.workflows_dir), recursive=False)
+            self._observer.daemon = True
+            self._observer.start()
+        except Exception as e:
+            logger.warning(f"Failed to watch {self.manager.workflows_dir} with watchdog, polling instead: {e}")
+            self._observer = None
+            return False
+        return True
+
+    def _stop_observer(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+
+    async def _wait_for_quiet(self, snapshot: Snapshot) -> Snapshot:
+        """Wait until the directory did not change for `debounce` seconds"""
+        while True:
+            await asyncio.sleep(self.debounce)
+            latest = await asyncio.to_thread(self._snapshot)
+            if latest == snapshot:
+                return snapshot
+            snapshot = latest
+
+    async def _run(self):
+        self._changed = asyncio.Event()
+        # Taken before the initial loading finishes, so files changed meanwhile are picked up
+        snapshot = await asyncio.to_thread(self._snapshot)
+        await self.manager.wait_until_ready()
+
+        timeout = self.interval
+        if self._start_observer():
+            timeout = max(self.interval, WATCHDOG_RESCAN_INTERVAL)
+        logger.info(f"Watching {self.manager.workflows_dir} for workflow changes ({'watchdog' if self._observer else 'polling'})")
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._changed.clear()
+
+                current = await asyncio.to_thread(self._snapshot)
+                if current == snapshot:
+                    continue
+                current = await self._wait_for_quiet(current)
+
+                changed_files = sorted(name for name, state in current.items() if snapshot.get(name) != state)
+                deleted_files = sorted(name for name in snapshot if name not in current)
+                snapshot = current
+                try:
+                    await self.manager.apply_changes(changed_files, deleted_files)
+                except Exception as e:
+                    logger.error(f"Failed to apply workflow changes: {e}", exc_info=True)
+        finally:
+            self._stop_observer()
+
+
+# Global workflow watcher, started by the server on startup
+workflow_watcher = WorkflowWatcher()
@@ -32,15 +32,62 @@ class Settings(BaseSettings):
     
     # ComfyUI integration configuration
     comfyui_base_url: str = "http://localhost:8188"
+    # Optional comma-separated list of ComfyUI backends, overrides comfyui_base_url when set
+    comfyui_base_urls: str = ""
     comfyui_api_key: str = ""
     comfyui_cookies: str = ""
     comfyui_executor_type: str = "http"
+    # ComfyUI connection pool configuration
+    comfyui_pool_limit: int = 100
+    comfyui_pool_limit_per_host: int = 30
+    comfyui_keepalive_timeout: float = 60.0
+    comfyui_dns_cache_ttl: int = 300
+    # Spill large input media to a temp file before uploading, for proxies that reject chunked requests
+    comfyui_upload_require_content_length: bool = False
+    # Max number of result files transferred at the same time per execution
+    comfyui_transfer_concurrency: int = 4
+    # Multi-backend routing configuration
+    comfyui_queue_probe_interval: float = 2.0
+    comfyui_backend_retry_interval: float = 10.0
+    # Prefer a backend that recently loaded the workflow's models while its queue is shorter than this, 0 disables
+    comfyui_affinity_max_queue: int = 2
+    # Dedup cache of uploaded input media (per backend), ttl in seconds, 0 disables
+    upload_cache_ttl: int = 3600
+    upload_cache_max_entries: int = 1024
+    # Result cache of deterministic executions (same patched graph, no randomized seed), ttl in seconds, 0 disables
+    result_cache_ttl: int = 3600
+    result_cache_max_entries: int = 256
+    # SQLite journal of submitted prompts, unfinished ones are re-attached on startup and their outputs handed to
+    # the next request with an identical deterministic graph (or looked up by prompt_id); seconds an entry is kept
+    execution_journal_enabled: bool = True
+    execution_journal_max_age: int = 86400
+    # Asynchronous job mode: workflow tools return a job id once the prompt is queued
+    workflow_job_mode: bool = False
+    # Max number of finished job results kept in memory (older ones are spilled to disk), seconds a finished job is kept
+    job_max_in_memory: int = 256
+    job_result_ttl: int = 86400
+    # Max number of workflows parsed / fetched from RunningHub at the same time when loading all workflows
+    workflow_load_concurrency: int = 16
+    # Manifest of parsed workflows (data/workflow_manifest.json), unchanged workflow files are not parsed again on startup
+    workflow_manifest_enabled: bool = True
+    # Hot reload of changed workflow files: polling interval and seconds the directory must be quiet before applying changes
+    workflow_watch_enabled: bool = True
+    workflow_watch_interval: float = 2.0
+    workflow_watch_debounce: float = 1.0
     
     # RunningHub configuration
     runninghub_base_url: str = "https://www.runninghub.ai"
     runninghub_api_key: str = ""
     runninghub_timeout: int = 3600
     runninghub_retry_count: int = 0
+    # Max connections of the pooled RunningHub session
+    runninghub_pool_limit: int = 32
+    # Client-side limit of API requests per second, 0 disables (rate-limit answers are honoured anyway)
+    runninghub_rate_limit: float = 0.0
+    # Concurrent-task quota of the account, tasks above it wait locally; 0 relies on RunningHub's queue-full answer
+    runninghub_max_concurrent_tasks: int = 0
+    # Seconds the workflow JSON fetched from RunningHub (and its parsed metadata) is cached on disk, 0 disables
+    runninghub_metadata_cache_ttl: int = 86400
     
     # Chainlit configuration
     chainlit_auth_secret: str = "changeme-generate-a-secure-secret-key"
@@ -125,6 +172,14 @@ class Settings(BaseSettings):
         
         return models
 
+    def get_comfyui_base_urls(self) -> list[str]:
+        """Get list of configured ComfyUI backends"""
+        if self.comfyui_base_urls:
+            urls = [u.strip().rstrip('/') for u in self.comfyui_base_urls.split(",") if u.strip()]
+            if urls:
+                return urls
+        return [self.comfyui_base_url.rstrip('/')]
+
     def get_read_url(self) -> str:
         if self.public_read_url:
             return self.public_read_url
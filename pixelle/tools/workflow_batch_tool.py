@@ -0,0 +1,80 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+import json
+import os
+from typing import Any, Dict, List
+from pydantic import Field, ValidationError
+
+from pixelle.logger import logger
+from pixelle.mcp_core import mcp
+from pixelle.manager.workflow_manager import workflow_manager, CUSTOM_WORKFLOW_DIR
+from pixelle.comfyui.facade import execute_workflow_batch
+
+# Max number of parameter sets of one batch
+MAX_BATCH_SIZE = 64
+
+
+@mcp.tool(name="batch_execute_workflow_tool")
+async def batch_execute_workflow_tool(
+    workflow_name: str = Field(description="The name of the workflow tool to run, e.g. the tool name without any prefix"),
+    params_list: List[Dict[str, Any]] = Field(description=f"Parameter sets, each one is the arguments of a single call of the workflow tool. At most {MAX_BATCH_SIZE} items"),
+):
+    """
+    Run one workflow tool over many parameter sets in a single call.
+
+    Use this tool instead of calling the same workflow tool repeatedly, e.g. to
+    generate several variants of a prompt, sweep a parameter, or process a list of images.
+    All items are queued at once and run concurrently. Results are returned in the
+    same order as params_list, each item with its own status.
+    """
+    def error(msg: str):
+        return json.dumps({ "success": False, "error": msg })
+
+    workflow = workflow_manager.loaded_workflows.get(workflow_name)
+    if workflow is None:
+        if not workflow_manager.ready:
+            return error(f"Workflow '{workflow_name}' is not loaded yet, workflows are still loading, try again shortly")
+        return error(f"Workflow '{workflow_name}' does not exist")
+    if not params_list:
+        return error("params_list is empty")
+    if len(params_list) > MAX_BATCH_SIZE:
+        return error(f"Too many parameter sets: {len(params_list)}, at most {MAX_BATCH_SIZE}")
+
+    # Each item is validated like a single call of the workflow tool
+    tool = workflow["tool"]
+    known_params = set(workflow["metadata"].get("params", {}).keys())
+    validated_params_list = []
+    for index, params in enumerate(params_list):
+        unknown_params = set(params.keys()) - known_params
+        if unknown_params:
+            return error(f"Unknown parameters in item {index}: {sorted(unknown_params)}")
+        try:
+            validated_params_list.append(tool.validate_arguments(params))
+        except ValidationError as e:
+            details = "; ".join(f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors())
+            return error(f"Invalid parameters in item {index}: {details}")
+
+    try:
+        workflow_file = os.path.join(CUSTOM_WORKFLOW_DIR, f"{workflow_name}.json")
+        results = await execute_workflow_batch(workflow_file, validated_params_list)
+    except Exception as e:
+        logger.error(f"Failed to execute workflow batch: {e}", exc_info=True)
+        return error(f"Failed to execute workflow batch: {str(e)}")
+
+    items = [
+        {
+            "index": index,
+            "status": result.status,
+            "result": result.to_llm_result(),
+        }
+        for index, result in enumerate(results)
+    ]
+    succeeded = sum(1 for result in results if result.status == "completed")
+    return json.dumps({
+        "success": succeeded > 0,
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "items": items,
+    }, ensure_ascii=False)
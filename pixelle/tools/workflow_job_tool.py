@@ -0,0 +1,80 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+import json
+from pydantic import Field
+
+from pixelle.mcp_core import mcp
+from pixelle.manager.job_manager import job_manager
+
+
+def _error(msg: str):
+    return json.dumps({ "success": False, "error": msg })
+
+
+async def _recorded(prompt_id: str, with_result: bool):
+    """Status (and result) of a prompt from the execution journal, e.g. of a job from before a restart"""
+    recorded = await job_manager.client.get_recorded_result(prompt_id)
+    if recorded is None:
+        return _error(f"Job '{prompt_id}' does not exist or has expired")
+    state, result = recorded
+    status = "running" if state == "submitted" else (result.status if result is not None else state)
+    response = { "success": status in ("running", "completed"), "prompt_id": prompt_id, "status": status }
+    if with_result:
+        response["result"] = result.to_llm_result() if result is not None else "Job is still running, try again later"
+    return json.dumps(response, ensure_ascii=False)
+
+
+@mcp.tool(name="get_job_status")
+async def get_job_status(
+    job_id: str = Field(description="The job id returned by a workflow tool"),
+):
+    """
+    Get the status of a workflow job.
+
+    Workflow tools return a job id instead of their result, the job runs in background.
+    Status is "running" until it finishes, then "completed", "error" or "cancelled".
+    Once it is no longer running, call get_job_result to get the generated media.
+    After a server restart, pass the prompt_id of the job instead of its job id.
+    """
+    job = job_manager.get_job(job_id)
+    if job is None:
+        return await _recorded(job_id, with_result=False)
+    return json.dumps({ "success": True, **job.to_dict() }, ensure_ascii=False)
+
+
+@mcp.tool(name="get_job_result")
+async def get_job_result(
+    job_id: str = Field(description="The job id returned by a workflow tool"),
+):
+    """
+    Get the result of a workflow job: the generated images, videos, audios or texts.
+
+    Returns the current status instead if the job is still running, call it again later.
+    After a server restart, pass the prompt_id of the job instead of its job id.
+    """
+    job = job_manager.get_job(job_id)
+    if job is None:
+        return await _recorded(job_id, with_result=True)
+    if not job.finished:
+        return json.dumps({ "success": True, **job.to_dict(), "result": "Job is still running, try again later" }, ensure_ascii=False)
+
+    result = job_manager.get_result(job_id)
+    return json.dumps({
+        "success": result.status == "completed",
+        **job.to_dict(),
+        "result": result.to_llm_result(),
+    }, ensure_ascii=False)
+
+
+@mcp.tool(name="cancel_job")
+async def cancel_job(
+    job_id: str = Field(description="The job id returned by a workflow tool"),
+):
+    """
+    Cancel a running workflow job, e.g. when the user no longer needs its result.
+    """
+    job = await job_manager.cancel(job_id)
+    if job is None:
+        return _error(f"Job '{job_id}' does not exist or has expired")
+    return json.dumps({ "success": job.status == "cancelled", **job.to_dict() }, ensure_ascii=False)
@@ -62,7 +62,7 @@ async def save_workflow_tool(
             # Handle URL - use existing download logic
             logger.info(f"Processing workflow from URL: {workflow_source}")
             async with download_files(workflow_source) as temp_workflow_path:
-                return workflow_manager.load_workflow(temp_workflow_path, tool_name=tool_name)
+                return await workflow_manager.load_workflow(temp_workflow_path, tool_name=tool_name)
         else:
             # Handle RunningHub workflow_id
             logger.info(f"Processing workflow from RunningHub workflow_id: {workflow_source}")
@@ -71,7 +71,7 @@ async def save_workflow_tool(
                 return error(result["error"])
             
             # Load the workflow using the created file
-            return workflow_manager.load_workflow(result["workflow_file_path"], tool_name=tool_name)
+            return await workflow_manager.load_workflow(result["workflow_file_path"], tool_name=tool_name)
             
     except Exception as e:
         logger.error(f"Failed to save workflow: {e}", exc_info=True)
@@ -92,8 +92,9 @@ def _is_url(source: str) -> bool:
 async def reload_workflows_tool():
     """
     Reload all MCP tools that were generated by workflows.
+    RunningHub workflows are fetched again from the cloud.
     """
-    return workflow_manager.reload_all_workflows()
+    return await workflow_manager.reload_all_workflows()
         
 @mcp.tool(name="list_workflows_tool")
 async def list_workflows_tool():
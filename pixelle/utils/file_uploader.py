@@ -2,9 +2,10 @@
 # This project is licensed under the MIT License (SPDX-License-identifier: MIT).
 
 import os
+import aiofiles
 import requests
 from pathlib import Path
-from typing import Union, Optional, Tuple
+from typing import AsyncIterable, Union, Optional, Tuple
 from urllib.parse import urlparse
 import uuid
 
@@ -51,6 +52,35 @@ class LocalFileUploader:
             logger.error(f"File save failed: {e}")
             raise Exception(f"File upload failed: {str(e)}")
     
+    async def upload_stream(self, chunks: AsyncIterable[bytes], filename: str) -> str:
+        """
+        Write a stream of bytes chunks to storage directory, without buffering the whole file
+        
+        Args:
+            chunks: async iterable of file content chunks
+            filename: file name, its extension is kept
+            
+        Returns:
+            str: file access URL
+        """
+        file_id = self._generate_file_id(filename)
+        file_path = self.storage_path / file_id
+        try:
+            async with aiofiles.open(file_path, 'wb') as f:
+                async for chunk in chunks:
+                    await f.write(chunk)
+        except BaseException as e:
+            # Also when cancelled, a truncated file must not stay reachable
+            file_path.unlink(missing_ok=True)
+            if not isinstance(e, Exception):
+                raise
+            logger.error(f"File save failed: {e}")
+            raise Exception(f"File upload failed: {str(e)}")
+        
+        file_url = self._get_file_url(file_id)
+        logger.debug(f"File saved successfully: {file_url}")
+        return file_url
+    
     def _generate_file_id(self, filename: str) -> str:
         """generate file id, keep consistent with LocalStorage"""
         ext = Path(filename).suffix
@@ -157,4 +187,18 @@ def upload(data: Union[bytes, str, Path], filename: Optional[str] = None) -> str
     Returns:
         str: file access URL
     """
-    return default_uploader.upload(data, filename) 
\ No newline at end of file
+    return default_uploader.upload(data, filename)
+
+
+async def upload_stream(chunks: AsyncIterable[bytes], filename: str) -> str:
+    """
+    unified interface for uploading a stream of bytes chunks
+    
+    Args:
+        chunks: async iterable of file content chunks
+        filename: file name, its extension is kept
+        
+    Returns:
+        str: file access URL
+    """
+    return await default_uploader.upload_stream(chunks, filename)
@@ -1,6 +1,8 @@
+import asyncio
+import aiohttp
 import requests
 from urllib.parse import urljoin
-from typing import List
+from typing import List, Optional
 
 
 def check_url_status(url: str, timeout: int = 5) -> bool:
@@ -97,3 +99,27 @@ def get_ollama_models(base_url: str) -> List[str]:
     return []
 
 
+def release_stale_session(session: Optional[aiohttp.ClientSession], loop: Optional[asyncio.AbstractEventLoop]):
+    """Release a pooled session that is replaced because it belongs to another event loop
+
+    A session of a loop still running is closed in that loop. A session of a closed loop can
+    no longer be awaited: it is detached and its connector is marked closed and drops its
+    connections, whose sockets are closed when collected.
+    """
+    if session is None or session.closed:
+        return
+    if loop is not None and not loop.is_closed():
+        try:
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+            return
+        except RuntimeError:
+            # Closed meanwhile
+            pass
+    connector = session.connector
+    session.detach()
+    if connector is not None:
+        try:
+            # Synchronous part of `connector.close()`, the rest needs the loop
+            connector._close()
+        except Exception:
+            pass
@@ -5,11 +5,7 @@
 RunningHub utility functions - centralized logic for RunningHub workflow handling
 """
 
-import json
 import os
-import tempfile
-import asyncio
-import concurrent.futures
 from pathlib import Path
 from typing import Optional, Dict, Any
 
@@ -100,12 +96,16 @@ async def validate_runninghub_workflow_id(workflow_id: str) -> bool:
         return False
 
 
-async def fetch_runninghub_workflow_metadata(workflow_file: str | Path, tool_name: str = None):
+async def fetch_runninghub_workflow_metadata(workflow_file: str | Path, tool_name: str = None, refresh: bool = False):
     """Fetch and parse RunningHub workflow metadata by fetching from API
     
+    The fetched workflow and its metadata are cached on disk, a cached entry is used
+    unless `refresh` is set.
+    
     Args:
         workflow_file: Path to the RunningHub workflow file
         tool_name: Optional tool name for metadata
+        refresh: Fetch the workflow again even if it is cached
         
     Returns:
         Optional[WorkflowMetadata]: Parsed metadata or None if failed
@@ -117,49 +117,23 @@ async def fetch_runninghub_workflow_metadata(workflow_file: str | Path, tool_nam
             return None
         
         workflow_id = data["workflow_id"]
+        tool_name = tool_name or Path(workflow_file).stem
+        
+        from pixelle.comfyui.runninghub_metadata_cache import runninghub_metadata_cache
+        if not refresh:
+            metadata = runninghub_metadata_cache.get(workflow_id, tool_name)
+            if metadata is not None:
+                return metadata
+        
         logger.info(f"Parsing RunningHub workflow metadata for workflow_id: {workflow_id}")
         
         # Get RunningHub client and fetch actual workflow
-        async def fetch_and_parse():
-            from pixelle.comfyui.runninghub_client import get_runninghub_client
-            from pixelle.comfyui.workflow_parser import WorkflowParser
-            
-            client = get_runninghub_client()
-            workflow_json = await client.get_workflow_json(workflow_id)
-            
-            # Create temporary file with the actual workflow
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False, encoding='utf-8') as f:
-                json.dump(workflow_json, f, ensure_ascii=False, indent=2)
-                temp_file_path = f.name
-            
-            try:
-                # Parse using standard workflow parser
-                parser = WorkflowParser()
-                metadata = parser.parse_workflow_file(temp_file_path, tool_name)
-                
-                # Add RunningHub-specific metadata
-                if metadata:
-                    metadata.workflow_id = workflow_id
-                    metadata.is_runninghub = True
-                
-                return metadata
-            finally:
-                # Clean up temporary file
-                try:
-                    os.unlink(temp_file_path)
-                except Exception as cleanup_error:
-                    logger.warning(f"Failed to cleanup temporary file {temp_file_path}: {cleanup_error}")
-        
-        # Run the async function
-        try:
-            loop = asyncio.get_running_loop()
-            # If we're already in an async context, create a new task
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(asyncio.run, fetch_and_parse())
-                return future.result()
-        except RuntimeError:
-            # No running loop, we can use asyncio.run
-            return asyncio.run(fetch_and_parse())
+        from pixelle.comfyui.runninghub_client import get_runninghub_client
+        client = get_runninghub_client()
+        workflow_json = await client.get_workflow_json(workflow_id)
+        
+        # Parse and cache it
+        return runninghub_metadata_cache.put(workflow_id, workflow_json, tool_name)
             
     except Exception as e:
         logger.error(f"Failed to fetch RunningHub workflow metadata: {e}")
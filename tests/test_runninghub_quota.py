@@ -0,0 +1,62 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+RunningHub concurrent-task quota against the stand-in RunningHub server of the benchmarks
+"""
+
+import sys
+import socket
+import asyncio
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.fake_runninghub import FakeRunningHub, FakeRunningHubConfig  # noqa: E402
+
+MAX_CONCURRENT_TASKS = 2
+BATCH_SIZE = 5
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_batch_larger_than_task_quota(tmp_path, monkeypatch):
+    """A batch with more items than the quota completes, and gives every slot back"""
+    port = _free_port()
+    # Pixelle reads its settings on import
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("RUNNINGHUB_BASE_URL", f"http://127.0.0.1:{port}")
+    monkeypatch.setenv("RUNNINGHUB_API_KEY", "test")
+    monkeypatch.setenv("RUNNINGHUB_MAX_CONCURRENT_TASKS", str(MAX_CONCURRENT_TASKS))
+    monkeypatch.setenv("LOCAL_STORAGE_PATH", str(tmp_path / "files"))
+    monkeypatch.setenv("EXECUTION_JOURNAL_ENABLED", "false")
+    monkeypatch.setenv("RESULT_CACHE_TTL", "0")
+
+    from pixelle.comfyui.facade import ComfyUIClient
+    from pixelle.comfyui.runninghub_client import get_runninghub_client
+    from pixelle.utils.runninghub_util import create_runninghub_workflow_file
+
+    async def run():
+        server = FakeRunningHub(FakeRunningHubConfig(task_duration=0.2, max_tasks=MAX_CONCURRENT_TASKS, output_size=1024))
+        await server.start(port=port)
+        client = ComfyUIClient()
+        try:
+            workflow_file = create_runninghub_workflow_file("1000000000000000001", "quota_workflow", output_dir=str(tmp_path))
+            params_list = [{"prompt": f"item {index}"} for index in range(BATCH_SIZE)]
+            results = await asyncio.wait_for(client.execute_batch(workflow_file, params_list), timeout=60)
+            return results, get_runninghub_client().get_stats(), server.get_stats()
+        finally:
+            await client.close()
+            await server.stop()
+
+    results, client_stats, server_stats = asyncio.run(run())
+    assert [result.status for result in results] == ["completed"] * BATCH_SIZE
+    assert client_stats["max_concurrent_tasks"] == MAX_CONCURRENT_TASKS
+    assert client_stats["tasks_holding_slot"] == 0
+    assert server_stats["tasks"] == {"SUCCESS": BATCH_SIZE}
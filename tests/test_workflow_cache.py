@@ -0,0 +1,71 @@
+# Copyright (C) 2025 AIDC-AI
+# This project is licensed under the MIT License (SPDX-License-identifier: MIT).
+
+"""
+Compiled workflow templates are shared by executions and never patched in place
+"""
+
+import sys
+import json
+import socket
+import asyncio
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.fake_comfyui import FakeComfyUI, FakeComfyUIConfig, make_workflow  # noqa: E402
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_executions_leave_compiled_graph_unchanged(tmp_path, monkeypatch):
+    """Two executions with different parameters and a randomized seed patch their own graph only"""
+    port = _free_port()
+    # Pixelle reads its settings on import
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("LOCAL_STORAGE_PATH", str(tmp_path / "files"))
+    monkeypatch.setenv("EXECUTION_JOURNAL_ENABLED", "false")
+    monkeypatch.setenv("RESULT_CACHE_TTL", "0")
+
+    from pixelle.comfyui.http_executor import HttpExecutor
+    from pixelle.comfyui.workflow_cache import workflow_template_cache
+
+    workflow_file = str(tmp_path / "cache_workflow.json")
+    make_workflow(workflow_file)
+    compiled = workflow_template_cache.get(workflow_file)
+    graph_before = json.dumps(dict(compiled.graph), sort_keys=True)
+
+    async def run():
+        server = FakeComfyUI(FakeComfyUIConfig(exec_time=0.05, workers=0, output_size=1024))
+        await server.start(port=port)
+        executor = HttpExecutor(f"http://127.0.0.1:{port}")
+        try:
+            return [
+                await executor.execute_workflow(workflow_file, {"prompt": prompt})
+                for prompt in ("first", "second")
+            ]
+        finally:
+            await executor.close()
+            await server.stop()
+
+    results = asyncio.run(run())
+    assert [result.status for result in results] == ["completed", "completed"]
+    assert workflow_template_cache.get(workflow_file) is compiled
+    assert json.dumps(dict(compiled.graph), sort_keys=True) == graph_before
+    assert compiled.graph["3"]["inputs"]["seed"] == 0
+
+    # Shared nodes are read-only, patched nodes are copies
+    graph = compiled.instantiate()
+    with pytest.raises(TypeError):
+        graph["1"]["inputs"]["ckpt_name"] = "other.safetensors"
+    graph["2"]["inputs"]["text"] = "patched"
+    graph["3"]["inputs"]["model"][0] = "9"
+    assert json.dumps(dict(compiled.graph), sort_keys=True) == graph_before